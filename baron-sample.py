@@ -1,153 +1,31 @@
 # coding: utf-8
 
-import base64
 import datetime
-import hmac
-from io import StringIO
-import time
-import urllib.request
-import requests
-from dotenv import load_dotenv
-import os
-from hashlib import sha1 as sha
 import json
+import logging
 
+import requests
 
-load_dotenv("local.env")
+from baron import get_default_client, sign_request
+from baron.metrics import redact_url, registry
+from baron.reports import (
+    request_geocodecity, request_geocodeip, request_lightning_count,
+    request_marine_zone_forecast_all, request_metar, request_metar_nearest,
+    request_ndfd_hourly, request_storm_vector, request_tile)
 
 
-host = "http://api.velocityweather.com/v1"
-access_key = os.getenv("BARON_KEY")
-if access_key is None:
-    raise ValueError("Missing BARON_KEY in local.env file")
-access_key_secret = os.getenv("BARON_SECRET")
-if access_key_secret is None:
-    raise ValueError("Missing BARON_SECRET in local.env file")
+log = logging.getLogger('baron-sample')
 
 
-def sign_old(string_to_sign, secret):
-    """ Returns the signature for string_to_sign
+def log_response(title, url, response):
     """
-    signature_bytes = base64.urlsafe_b64encode(
-        hmac.new(secret.encode('utf-8'), string_to_sign.encode('utf-8'), sha).digest())
-    signature = signature_bytes.decode('utf-8')
-
-    return signature.replace('/', '_').replace('+', '-').rstrip('=')
-
-
-def sign(string_to_sign, secret):
-    hmac_sha1 = hmac.new(
-        # Convert secret to bytes using UTF-8
-        secret.encode('utf-8'),
-        # Convert input string to bytes using UTF-8
-        string_to_sign.encode('utf-8'),
-        sha                        # Use SHA1 hash algorithm
-    )
-
-    # Get the binary digest
-    hmac_digest = hmac_sha1.digest()
-
-    # Encode to base64
-    base64_encoded = base64.b64encode(hmac_digest).decode('utf-8')
-
-    # Replace characters to make URL safe
-    signature = base64_encoded.replace('/', '_').replace('+', '-')
-
-    return signature
-
-
-def sign_request(url, key, secret):
-    """ Returns signed url
+    Logs a one-line summary of a response at INFO; headers and body only go
+    to DEBUG, so a normal run never dumps them.
     """
-
-    ts = str(int(time.time()))
-    sig = sign(key + ":" + ts, secret)
-    q = '?' if url.find("?") == -1 else '&'
-    url += "%ssig=%s&ts=%s" % (q, sig, ts)
-    return url
-
-
-def request_marine_zone_forecast_all():
-
-    uri = "/reports/forecast/marine/us/all.json"
-    url = "%s/%s%s" % (host, access_key, uri)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_pointquery_nws_watches_warning_all():
-
-    uri = "/reports/alert/all-poly/point.json?lat=29.70&lon=-80.41"
-    url = "%s/%s%s" % (host, access_key, uri)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_lightning_count():
-
-    uri = "/reports/lightning/count/region.json?w_lon=-160&e_lon=0&n_lat=-2&s_lat=-70"
-    url = "%s/%s%s" % (host, access_key, uri)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_storm_vector(sitecode):
-
-    uri = "/reports/stormvector/station/%s.json" % (sitecode)
-    url = "%s/%s%s" % (host, access_key, uri)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_geocodeip():
-    uri = "/reports/geocode/ipaddress.json"
-    url = "%s/%s%s" % (host, access_key, uri)
-    url = sign_request(url, access_key, access_key_secret)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_geocodecity(cityname):
-    uri = "/reports/geocode/city.json?name=%s" % (cityname)
-    url = "%s/%s%s" % (host, access_key, uri)
-    url = sign_request(url, access_key, access_key_secret)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_metar_nearest(lat, lon):
-
-    uri = "/reports/metar/nearest.json?lat=%s&lon=%s&within_radius=500&max_age=75" % (
-        lat, lon)
-    url = "%s/%s%s" % (host, access_key, uri)
-    url = sign_request(url, access_key, access_key_secret)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_metar(station_id):
-
-    uri = "/reports/metar/station/%s.json" % station_id
-    url = "%s/%s%s" % (host, access_key, uri)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_ndfd_hourly(lat, lon, utc_datetime):
-
-    datetime_str = utc_datetime.replace(microsecond=0).isoformat() + 'Z'
-    uri = "/reports/ndfd/hourly.json?lat=%s&lon=%s&utc=%s" % (
-        lat, lon, datetime_str)
-    url = "%s/%s%s" % (host, access_key, uri)
-    return sign_request(url, access_key, access_key_secret)
-
-
-def request_tile(product, product_config, z, x, y):
-    url = "%s/%s/meta/tiles/product-instances/%s/%s" % (
-        host, access_key, product, product_config)
-    meta_url = sign_request(url, access_key, access_key_secret)
-
-    response = urllib.request.urlopen(meta_url).read()
-    data = json.loads(response)
-    if not data:
-        return
-
-    meta_date = data[0]['time']
-    url = "%s/%s/tms/1.0.0/%s+%s+%s/%d/%d/%d.png" % (
-        host, access_key, product, product_config, meta_date, z, x, y)
-    return sign_request(url, access_key, access_key_secret)
+    log.info("%s: %s -> HTTP %d, %d bytes", title, redact_url(url),
+             response.status_code, len(response.content))
+    log.debug("headers: %s", json.dumps(dict(response.headers), indent=4, sort_keys=True))
+    log.debug("content: %s", response.text)
 
 
 def point_query(product, product_config, lon, lat):
@@ -156,31 +34,20 @@ def point_query(product, product_config, lon, lat):
     (and most recent 'valid_time' if it's a forecast product).
     """
 
-    # Get the list of product instances.
-    url = '{host}/{key}/meta/tiles/product-instances/{product}/{product_config}'.format(
-        host=host,
-        key=access_key,
-        product=product,
-        product_config=product_config
-    )
-    # request = urllib.Request(sign_request(url, access_key, access_key_secret))
-    try:
-        response = urllib.request.urlopen(url)
-    except urllib.error.HTTPError as e:
-        print('HTTP status code:', e.code)
-        print('content:')
-        print(e.read())
-        return
-    assert response.code == 200
-    data = json.loads(response.read())
+    # The pooled client is created, and credentials read from local.env, on
+    # first use.
+    client = get_default_client()
 
-    # Select the most recent product instance for this example.
-    product_instance = data[0]
+    # Select the most recent product instance for this example. It is served
+    # from the client's instance cache while fresh.
+    product_instance = client.get_latest_instance(product, product_config)
+    if product_instance is None:
+        return
 
     # Query our lon, lat point.
     url = '{host}/{key}/point/{product}/{product_config}/{product_instance}.{file_type}?lon={lon}&lat={lat}'.format(
-        host=host,
-        key=access_key,
+        host=client.base,
+        key=client.key,
         product=product,
         product_config=product_config,
         product_instance=product_instance['time'],
@@ -195,26 +62,15 @@ def point_query(product, product_config, lon, lat):
     except KeyError:
         pass
 
-    # request = urllib.Request(sign_request(url, access_key, access_key_secret))
+    url = sign_request(url, client.key, client.secret)
     try:
-        response = urllib.request.urlopen(url)
-    except urllib.error.HTTPError as e:
-        print('HTTP status code:', e.code)
-        print('content:')
-        print(e.read())
+        response = client.get(url)
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        log_response('Point query failed', url, e.response)
         return
-    assert response.code == 200
-
-    content = response.read()
-    charset = response.headers.getparam('charset')
-    if charset:
-        content = content.decode(charset)
-    content = json.loads(content)
 
-    print('headers:')
-    print(json.dumps(response.headers.dict, indent=4, sort_keys=True))
-    print('content:')
-    print(json.dumps(content, indent=4, sort_keys=True, ensure_ascii=False))
+    log_response('Point query', url, response)
 
 
 def request_wms(product, product_config, image_size_in_pixels, image_bounds):
@@ -251,26 +107,12 @@ def request_wms(product, product_config, image_size_in_pixels, image_bounds):
     # WMS-style API to retrieve product instances which may be more suitable to your
     # needs. See our documentation for details.
 
-    # For this example, we use the optional parameter "page_size" to limit the
-    # list of product instances to the most recent instance.
-    meta_url = '{}/{}/meta/tiles/product-instances/{}/{}?page_size=1'.format(
-        host, access_key, product, product_config)
-    meta_url = sign_request(meta_url, access_key, access_key_secret)
-
-    # request = urllib.Request(meta_url)
-    try:
-        response = urllib.request.urlopen(meta_url)
-    except urllib.error.HTTPError as e:
-        print('HTTP status code:', e.code)
-        print('content:')
-        print(e.read())
+    # The client asks for the most recent instance only (page_size=1) and caches
+    # it, so repeated requests for the same product skip the metadata call.
+    client = get_default_client()
+    product_instance_time = client.get_instance_time(product, product_config)
+    if product_instance_time is None:
         return
-    assert response.code == 200
-
-    # Decode the product instance response and get the most recent product instance time,
-    # to be used in the WMS image request.
-    content = json.loads(response.read())
-    product_instance_time = content[0]['time']
 
     # WMS uses EPSG codes, while our product configuration code uses 'Geodetic' or
     # 'Mercator'. We map between the two here to prepare for the WMS CRS query parameter.
@@ -281,8 +123,8 @@ def request_wms(product, product_config, image_size_in_pixels, image_bounds):
     image_bounds = ','.join(str(x) for x in image_bounds)
 
     wms_url = '{}/{}/wms/{}/{}?VERSION=1.3.0&SERVICE=WMS&REQUEST=GetMap&CRS={}&LAYERS={}&BBOX={}&WIDTH={}&HEIGHT={}&TIME={}'.format(
-        host,
-        access_key,
+        client.base,
+        client.key,
         product,
         product_config,
         epsg_code,
@@ -292,22 +134,19 @@ def request_wms(product, product_config, image_size_in_pixels, image_bounds):
         image_size_in_pixels[1],
         product_instance_time
     )
-    wms_url = sign_request(wms_url, access_key, access_key_secret)
-    print(wms_url)
+    wms_url = sign_request(wms_url, client.key, client.secret)
+    log.info('WMS: %s', redact_url(wms_url))
 
-    # request = urllib.Request(wms_url)
     try:
-        response = urllib.request.urlopen(wms_url)
-    except urllib.error.HTTPError as e:
-        print('HTTP status code:', e.code)
-        print('content:')
-        print(e.read())
+        response = client.get(wms_url)
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        log_response('WMS request failed', wms_url, e.response)
         return
-    assert response.code == 200
 
-    content = response.read()
+    content = response.content
     filename = './wms_img_{}_{}.png'.format(product, product_config)
-    print('Read {} bytes, saving as {}'.format(len(content), filename))
+    log.info('Read %d bytes, saving as %s', len(content), filename)
     with open(filename, 'wb') as f:
         f.write(content)
 
@@ -316,8 +155,8 @@ def point_query_region(product, product_config, region_bounds):
     """
     Queries a specific region for weather data using a given product and configuration.
 
-    This function retrieves weather data for a specified region by making two API requests:
-    1. Fetches metadata to determine the most recent product instance time.
+    This function retrieves weather data for a specified region in two steps:
+    1. Looks up the most recent product instance time (cached by the client).
     2. Uses the product instance time to query the weather data for the specified region.
 
     Args:
@@ -327,32 +166,23 @@ def point_query_region(product, product_config, region_bounds):
             in the format [west_longitude, north_latitude, east_longitude, south_latitude].
 
     Returns:
-        None: The function prints the response headers and content in JSON format.
+        None: The function logs a summary of the response; headers and
+            content are logged at DEBUG level.
 
     Raises:
         AssertionError: If the response status code is not 200.
         requests.exceptions.RequestException: If there is an issue with the HTTP request.
 
     Notes:
-        - The function assumes the existence of `host`, `access_key`, and `access_key_secret` variables
-          for API authentication.
+        - Credentials are read from local.env by `get_default_client` on first use.
         - The `sign_request` function is used to sign the API requests.
-        - The response content is printed in a formatted JSON structure for readability.
+        - Both requests go through the shared pooled client transport.
+        - Run with logging at DEBUG level to see the response headers and content.
     """
-    meta_url = f'{host}/{access_key}/meta/tiles/product-instances/{product}/{product_config}?page_size=1'
-    meta_url = sign_request(meta_url, access_key, access_key_secret)
-
-    try:
-        response = requests.get(meta_url)
-    except requests.exceptions.RequestException as e:
-        print('Request failed:', e)
+    client = get_default_client()
+    product_instance_time = client.get_instance_time(product, product_config)
+    if product_instance_time is None:
         return
-    assert response.status_code == 200
-
-    # Decode the product instance response and get the most recent product instance time,
-    # to be used in the WMS image request.
-    content = json.loads(response.text)
-    product_instance_time = content[0]['time']
 
     w_lon = region_bounds[0]
     n_lat = region_bounds[1]
@@ -360,33 +190,26 @@ def point_query_region(product, product_config, region_bounds):
     s_lat = region_bounds[3]
     query_region = f'w_lon={w_lon}&n_lat={n_lat}&e_lon={e_lon}&s_lat={s_lat}'
 
-    url = f'{host}/{access_key}/point/region/{product}/{product_config}/{product_instance_time}.json?{query_region}'
-    url = sign_request(url, access_key, access_key_secret)
+    url = f'{client.base}/{client.key}/point/region/{product}/{product_config}/{product_instance_time}.json?{query_region}'
+    url = sign_request(url, client.key, client.secret)
 
     headers = {
-        'Accept': 'application/json',
-        'Accept-Encoding': 'gzip'
+        'Accept': 'application/json'
     }
 
     try:
-        response = requests.get(url, headers=headers)
-        print(f'Response status code: {response.status_code}')
-        print(f'Response headers: {response.headers}')
-        print(f'Response content: {response.content}')
+        response = client.get(url, headers=headers)
     except requests.exceptions.RequestException as e:
-        print('Request failed:', e)
+        log.warning('Request failed: %s', redact_url(str(e)))
         return
     assert response.status_code == 200
 
-    content = json.loads(response.text)
-
-    print('headers:')
-    print(json.dumps(str(response.headers), indent=4, sort_keys=True))
-    print('content:')
-    print(json.dumps(content, indent=4, sort_keys=True, ensure_ascii=False))
+    log_response('Point query region', url, response)
 
 
 def main():
+    client = get_default_client()
+
     # texas_bound_box = [-106.645646, 36.500704, -93.508292, 25.837164]
     texas_bound_box = [25.837164, -106.645646, 36.500704, -93.508292]
     arkansas_bound_box = [-94.724121, 32.512896, -89.428711, 36.576877]
@@ -395,7 +218,7 @@ def main():
     whole_world_bound_box = [-90, -180, 90, 180]
     tx_panhandle_bound_box = [-103.05, 34.65, -99.99, 36.53]
 
-    print("WMS...2: Fire Tracker US")
+    log.info("WMS...2: Fire Tracker US")
     request_wms('flash-flood-risk', 'Standard-Geodetic',
                 [2048, 1024], texas_bound_box)
 
@@ -413,7 +236,7 @@ def main():
     # print
     # exit(0)
 
-    print("WMS...1: Standard Radar")
+    log.info("WMS...1: Standard Radar")
     # Request the whole world in the EPSG:4326 projection. Note that the proportions for
     # the image size in pixels and the image bounds are identical (2:1).
 
@@ -421,16 +244,16 @@ def main():
     request_wms('C39-0x0302-0', 'Standard-Geodetic',
                 [2048, 1024], texas_bound_box)
 
-    print("Point Query Region...1: Standard Radar")
+    log.info("Point Query Region...1: Standard Radar")
     point_query_region('C39-0x0302-0', 'Standard-Geodetic', temp_bound_box)
 
-    print("WMS...1-1: Standard Radar")
+    log.info("WMS...1-1: Standard Radar")
     # Request the whole world in the EPSG:3857 projection. Note that the proportions for
     # the image size in pixels and the image bounds are identical (1:1).
     request_wms('C39-0x0302-0', 'Standard-Mercator',
                 [2048, 2048], [-20037508.342789244, -20037508.342789244, 20037508.342789244, 20037508.342789244])
 
-    print("WMS...2: Fire Tracker US")
+    log.info("WMS...2: Fire Tracker US")
     request_wms('fire-tracker-us', 'Standard-Geodetic',
                 [2048, 1024], texas_bound_box)
 
@@ -438,63 +261,42 @@ def main():
     #             [2048, 1024], [-90, -180, 90, 180])
 
     url = request_metar_nearest("38", "-96")
-    print("*** request METAR nearest ***")
-    print(url)
-    print(urllib.request.urlopen(url).read())
-    print
+    log_response("request METAR nearest", url, client.get(url))
 
     url = request_metar("egll")
-    print("*** request METAR ***")
-    print(url)
-    print(urllib.request.urlopen(url).read())
-    print()
+    log_response("request METAR", url, client.get(url))
 
     exit(0)
 
     url = request_lightning_count()
-    print("*** lightning count ***")
-    print(url)
-    print(urllib.request.urlopen(url).read())
-    print()
+    log_response("lightning count", url, client.get(url))
 
     forecast_time = datetime.datetime.utcnow() + datetime.timedelta(hours=4)
     url = request_ndfd_hourly(34.730301, -86.586098, forecast_time)
-    print("*** request NDFD hourly ***")
-    print(url)
-    print(urllib.request.urlopen(url).read())
-    print()
+    log_response("request NDFD hourly", url, client.get(url))
 
     url = request_tile("C39-0x0302-0", "Standard-Mercator", 1, 0, 1)
-    print("*** request tile ***")
-    print(url)
-    print('Tile is %d bytes' % len(urllib.request.urlopen(url).read()))
-    print
+    log_response("request tile", url, client.get(url))
 
     url = request_storm_vector("mhx")
-    print("*** request storm vectors ***")
-    print(url)
-    print('JSON for storm vectors is %d bytes' %
-          len(urllib.request.urlopen(url).read()))
-    print()
+    log_response("request storm vectors", url, client.get(url))
 
     url = request_geocodeip()
-    print("*** geocode IP address ***")
-    print(url)
-    print(urllib.request.urlopen(url).read())
-    print()
+    log_response("geocode IP address", url, client.get(url))
 
     url = request_geocodecity("Hunt")
-    print("*** geocode city name ***")
-    print(url)
-    print(urllib.request.urlopen(url).read())
-    print()
+    log_response("geocode city name", url, client.get(url))
 
     url = request_marine_zone_forecast_all()
-    print("*** Marine zone forecast -- all ***")
-    print(url)
-    print(urllib.request.urlopen(url).read())
-    print
+    log_response("Marine zone forecast -- all", url, client.get(url))
 
 
 if __name__ == '__main__':
-    main()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    try:
+        main()
+    finally:
+        # Run with BARON_METRICS=1 to get per-endpoint latency, bytes and
+        # cache hit rates as well.
+        if registry.enabled:
+            print(registry.exposition())
@@ -0,0 +1,36 @@
+import importlib
+
+# Names exported by the package, resolved on first access so that
+# "import baron" does not pay for requests, NumPy or the geo stack.
+_EXPORTS = {
+    'APIClient': 'client',
+    'get_default_client': 'client',
+    'InstanceCache': 'cache',
+    'Signer': 'signing',
+    'sign': 'signing',
+    'sign_request': 'signing',
+    'Transport': 'transport',
+}
+
+_SUBMODULES = {
+    'aio', 'batch', 'cache', 'client', 'cube', 'geotiff', 'incremental', 'join', 'pipeline',
+    'points', 'raster', 'rastercache', 'ratelimit', 'region', 'replay', 'reports', 'signing',
+    'storage', 'sweep', 'tiles', 'transport', 'wms',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module('.' + name, __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | _SUBMODULES)
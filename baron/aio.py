@@ -0,0 +1,211 @@
+import asyncio
+import json
+import logging
+import time
+
+import aiohttp
+
+from .cache import InstanceCache
+from .metrics import redact_url, registry
+from .signing import Signer
+from .transport import RETRY_STATUSES
+
+
+log = logging.getLogger(__name__)
+
+
+def _retry_after(response):
+    """ Returns the Retry-After delay in seconds, or None if absent or not numeric
+    """
+    value = response.headers.get('Retry-After')
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class AsyncAPIClient(object):
+    """
+    asyncio version of APIClient for fanning out many requests at once.
+
+    Connections are pooled by one aiohttp.ClientSession; limit_per_host caps
+    the number of sockets opened to the API host. 429 and 5xx responses are
+    retried with exponential backoff, honouring Retry-After when the server
+    sends it. Each retry is re-signed so the timestamp never goes stale.
+    Latest instances are cached in an InstanceCache, which may be shared
+    with a synchronous APIClient. An optional RateLimiter smooths requests
+    under the provider quota.
+
+    Use as an async context manager, or call close() when done:
+
+        async with AsyncAPIClient(key, secret, base=host) as client:
+            async for bbox, content in client.point_query_region_many(
+                    product, product_config, bboxes, concurrency=8):
+                ...
+    """
+
+    def __init__(self, key, secret, base="http://localhost:80/v1",
+                 limit_per_host=10, timeout=30, retries=3, backoff_factor=0.5,
+                 instance_cache=None, limiter=None):
+        self.base = base
+        self.key = key
+        self.secret = secret
+        self.signer = Signer(key, secret)
+        self.instance_cache = instance_cache or InstanceCache()
+        self.limiter = limiter
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self._session = None
+
+    def make_url(self, api):
+        url = "%s/%s%s" % (self.base, self.key, api)
+        return self.signer.sign_url(url)
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.limit_per_host),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={'Accept-Encoding': 'gzip, deflate'},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _backoff(self, attempt):
+        return self.backoff_factor * (2 ** attempt)
+
+    async def fetch_json(self, api, headers=None):
+        """
+        Signs and fetches an API path, returning the decoded JSON body or
+        None if the request fails after all retries or the body is not
+        valid JSON.
+        """
+        for attempt in range(self.retries + 1):
+            if self.limiter is not None:
+                await self.limiter.aacquire()
+            url = self.make_url(api)
+            start = time.perf_counter()
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        if registry.enabled:
+                            registry.observe_request(url, response.status,
+                                                     time.perf_counter() - start,
+                                                     retries=int(attempt > 0))
+                        delay = _retry_after(response)
+                        if delay is None:
+                            delay = self._backoff(attempt)
+                    else:
+                        body = await response.read()
+                        if registry.enabled:
+                            registry.observe_request(url, response.status,
+                                                     time.perf_counter() - start,
+                                                     response.content_length, len(body),
+                                                     retries=int(attempt > 0))
+                        response.raise_for_status()
+                        body = body.strip()
+                        return json.loads(body.decode(response.get_encoding())) if body else None
+            except aiohttp.ClientResponseError as e:
+                log.warning("[VelocityWeather] Request failed: %s", redact_url(str(e)))
+                return None
+            except ValueError as e:
+                # A body that is not JSON, or not in its declared encoding
+                # (UnicodeDecodeError is a ValueError too).
+                log.warning("[VelocityWeather] Invalid JSON response from %s: %s",
+                            redact_url(url), e)
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if registry.enabled:
+                    registry.observe_request(url, type(e).__name__, time.perf_counter() - start,
+                                             retries=int(attempt > 0))
+                if attempt < self.retries:
+                    await asyncio.sleep(self._backoff(attempt))
+                    continue
+                log.warning("[VelocityWeather] Request failed: %s", redact_url(repr(e)))
+                return None
+            # The response has been released by now, so waiting out the
+            # throttle does not hold a connection of the pool.
+            await asyncio.sleep(delay)
+
+    async def _fetch_latest_instance(self, product, product_config):
+        data = await self.fetch_json(
+            f"/meta/tiles/product-instances/{product}/{product_config}?page_size=1")
+        if not data:
+            return None
+        return data[0]
+
+    async def get_latest_instance(self, product, product_config):
+        return await self.instance_cache.aget(
+            product, product_config, self._fetch_latest_instance)
+
+    async def get_instance_time(self, product, product_config):
+        instance = await self.get_latest_instance(product, product_config)
+        if not instance:
+            return None
+        return instance['time']
+
+    async def point_query_region(self, product, product_config, region_bounds,
+                                 product_instance_time=None):
+        """
+        Queries a region as APIClient.point_query_region does. Pass
+        product_instance_time to skip the metadata round trip.
+        """
+        if product_instance_time is None:
+            product_instance_time = await self.get_instance_time(product, product_config)
+            if product_instance_time is None:
+                return None
+
+        w_lon, n_lat, e_lon, s_lat = region_bounds[:4]
+        query_region = f'w_lon={w_lon}&n_lat={n_lat}&e_lon={e_lon}&s_lat={s_lat}'
+
+        return await self.fetch_json(
+            f'/point/region/{product}/{product_config}/{product_instance_time}.json?{query_region}',
+            headers={'Accept': 'application/json'})
+
+    async def point_query_region_many(self, product, product_config, bboxes, concurrency=8):
+        """
+        Queries many regions concurrently, yielding (bbox, content) pairs as
+        each cell completes rather than in input order.
+
+        The latest product instance time is looked up once and shared by
+        every cell so the whole sweep reads one consistent instance.
+
+        Args:
+            product (str): The product identifier for the weather data.
+            product_config (str): The configuration identifier for the product.
+            bboxes (iterable): Region bounds, each as
+                [west_longitude, north_latitude, east_longitude, south_latitude].
+            concurrency (int): Maximum number of region requests in flight.
+        """
+        product_instance_time = await self.get_instance_time(product, product_config)
+        if product_instance_time is None:
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def query(bbox):
+            async with semaphore:
+                content = await self.point_query_region(
+                    product, product_config, bbox, product_instance_time)
+            return bbox, content
+
+        tasks = [asyncio.ensure_future(query(bbox)) for bbox in bboxes]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,302 @@
+import datetime
+import functools
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .client import get_default_client
+from .metrics import redact_url
+from .reports import request_metar, request_metar_nearest, request_ndfd_hourly
+
+
+log = logging.getLogger(__name__)
+
+# The NDFD CONUS grid: a Lambert conformal projection on a sphere, with
+# 2145 x 1377 points 2539.703 m apart; NDFD_ORIGIN is the (lon, lat) of
+# grid point (0, 0), its south west corner. Points nearest to the same grid
+# point get the same forecast, so each occupied cell is fetched once.
+NDFD_CRS = ('+proj=lcc +lat_0=25 +lon_0=-95 +lat_1=25 +lat_2=25 +x_0=0 +y_0=0 '
+            '+R=6371200 +units=m +no_defs')
+NDFD_ORIGIN = (-121.554001, 20.191999)
+NDFD_SPACING = 2539.703
+
+METAR_FIELDS = ('temperature', 'dew_point', 'relative_humidity', 'wind_speed',
+                'wind_direction', 'pressure', 'visibility')
+NDFD_FIELDS = ('temperature', 'dew_point', 'wind_speed', 'wind_direction',
+               'precipitation_probability', 'sky_cover')
+
+
+@functools.lru_cache(maxsize=None)
+def _ndfd_transformers():
+    from pyproj import Transformer
+
+    forward = Transformer.from_crs(4326, NDFD_CRS, always_xy=True)
+    inverse = Transformer.from_crs(NDFD_CRS, 4326, always_xy=True)
+    return forward, inverse, forward.transform(*NDFD_ORIGIN)
+
+
+def snap_to_grid(longitude, latitude):
+    """
+    Snaps points to the nearest point of the NDFD CONUS grid, in its
+    Lambert conformal projection. Points outside CONUS snap to the grid's
+    extension and still get distinct cells.
+
+    Returns:
+        tuple: (int64 cell keys, (row << 32) | column, and the longitudes
+            and latitudes of the grid points)
+    """
+    forward, inverse, (x0, y0) = _ndfd_transformers()
+    x, y = forward.transform(np.asarray(longitude, dtype=np.float64),
+                             np.asarray(latitude, dtype=np.float64))
+    column = np.rint((np.asarray(x) - x0) / NDFD_SPACING).astype(np.int64)
+    row = np.rint((np.asarray(y) - y0) / NDFD_SPACING).astype(np.int64)
+    cell_lon, cell_lat = inverse.transform(x0 + column * NDFD_SPACING, y0 + row * NDFD_SPACING)
+    keys = (row << 32) | (column & 0xFFFFFFFF)
+    return keys, np.round(cell_lon, 5), np.round(cell_lat, 5)
+
+
+def _records(body, name):
+    """ Returns the list of records under body[name]['data'], accepting a single record too """
+    if not body:
+        return []
+    data = body.get(name, body) if isinstance(body, dict) else body
+    if isinstance(data, dict):
+        data = data.get('data', data)
+    if isinstance(data, dict):
+        data = [data]
+    return [record for record in data or [] if isinstance(record, dict)]
+
+
+def _value(field):
+    if isinstance(field, dict):
+        field = field.get('value')
+    try:
+        return float(field)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def parse_metar(body):
+    """ Returns the first observation of a /reports/metar response as a flat dict, or None
+    """
+    records = _records(body, 'metars')
+    if not records:
+        return None
+    record = records[0]
+    station = record.get('station') or {}
+    coordinates = station.get('coordinates') or (math.nan, math.nan)
+    row = {
+        'station': station.get('id'),
+        'name': station.get('name'),
+        'station_longitude': _value(coordinates[0]),
+        'station_latitude': _value(coordinates[1]),
+        'issue_time': record.get('issue_time'),
+        'raw_text': record.get('raw_text'),
+    }
+    for field in METAR_FIELDS:
+        row[field] = _value(record.get(field))
+    return row
+
+
+def parse_ndfd_hourly(body, utc_datetime=None):
+    """
+    Returns the /reports/ndfd/hourly forecast valid at utc_datetime as a
+    flat dict, or the first one when utc_datetime is None or not covered.
+    None if the response holds no forecast.
+    """
+    records = _records(body, 'ndfd_hourly')
+    if not records:
+        return None
+    record = records[0]
+    if utc_datetime is not None:
+        utc = utc_datetime.strftime('%Y-%m-%dT%H:%M:%SZ')
+        for candidate in records:
+            if candidate.get('valid_begin', '') <= utc < candidate.get('valid_end', ''):
+                record = candidate
+                break
+    row = {
+        'valid_begin': record.get('valid_begin'),
+        'valid_end': record.get('valid_end'),
+    }
+    for field in NDFD_FIELDS:
+        row[field] = _value(record.get(field))
+    return row
+
+
+def _fetch(client, url, parse):
+    import requests
+
+    try:
+        response = client.get(url, headers={'Accept': 'application/json'})
+        response.raise_for_status()
+        return parse(response.json())
+    except (requests.RequestException, ValueError) as e:
+        log.warning("[VelocityWeather] Report request failed: %s", redact_url(str(e)))
+        return None
+
+
+def _fetch_all(keys, load, cache, workers):
+    """
+    Returns load(endpoint, key) for every (endpoint, key) in keys, fetching
+    each distinct key once, concurrently, through cache.
+    """
+    unique = list(dict.fromkeys(keys))
+    if not unique:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(unique))) as executor:
+        rows = dict(zip(unique, executor.map(lambda key: cache.get(key[0], key[1], load), unique)))
+    return [rows[key] for key in keys]
+
+
+def _table(rows, columns, times, strings, extra):
+    """ Returns a DataFrame with one row per query, float NaN where a report is missing
+    """
+    import pandas as pd
+
+    data = dict(extra)
+    for column in columns:
+        values = [row.get(column) if row else None for row in rows]
+        if column in times:
+            data[column] = pd.to_datetime(values, utc=True, errors='coerce')
+        elif column in strings:
+            data[column] = pd.array(values, dtype='string')
+        else:
+            data[column] = np.array([math.nan if v is None else v for v in values],
+                                    dtype=np.float64)
+    return pd.DataFrame(data)
+
+
+METAR_COLUMNS = ('station', 'name', 'station_longitude', 'station_latitude',
+                 'issue_time') + METAR_FIELDS + ('raw_text',)
+
+
+def batch_metar(station_ids, client=None, workers=16, cache=None):
+    """
+    Fetches the latest METAR of many stations concurrently, each distinct
+    station once.
+
+    Args:
+        station_ids (list): ICAO station ids, e.g. ['KAUS', 'KDFW'].
+        client (APIClient): Defaults to get_default_client().
+        workers (int): Requests in flight at once; keep it within the
+            client's pool_size.
+        cache (InstanceCache): Short-TTL report cache shared between calls,
+            defaults to client.report_cache.
+
+    Returns:
+        pandas.DataFrame: One row per station id in input order, with the
+            observation values as float64 in the units the API reports and
+            NaN where a station has no report.
+    """
+    client = client or get_default_client()
+    cache = cache or client.report_cache
+    station_ids = [str(station).upper() for station in station_ids]
+
+    def load(endpoint, station):
+        return _fetch(client, request_metar(station, client=client), parse_metar)
+
+    rows = _fetch_all([('metar/station', station) for station in station_ids],
+                      load, cache, workers)
+    table = _table(rows, METAR_COLUMNS, ('issue_time',), ('station', 'name', 'raw_text'),
+                   {'query': station_ids})
+    table['query'] = table['query'].astype('string')
+    return table
+
+
+def _first_points(keys, longitude, latitude):
+    """ Returns {cell key: (lat, lon)} of the first input point in each cell """
+    first = {}
+    for key, lon, lat in zip(keys.tolist(), np.asarray(longitude, dtype=np.float64).tolist(),
+                             np.asarray(latitude, dtype=np.float64).tolist()):
+        first.setdefault(key, (lat, lon))
+    return first
+
+
+def batch_metar_nearest(latitude, longitude, within_radius=500, max_age=75, client=None,
+                        workers=16, cache=None):
+    """
+    Fetches the nearest METAR to many points concurrently. Points are
+    snapped to the NDFD grid first and each occupied cell is queried once,
+    at the first input point that falls in it; the other points of the
+    cell share its answer.
+
+    Args:
+        latitude (array-like): Point latitudes.
+        longitude (array-like): Point longitudes.
+        within_radius (float): Search radius passed to the API.
+        max_age (int): Maximum report age in minutes passed to the API.
+
+    Returns:
+        pandas.DataFrame: One row per point in input order; see batch_metar.
+    """
+    client = client or get_default_client()
+    cache = cache or client.report_cache
+    keys, _, _ = snap_to_grid(longitude, latitude)
+    queries = _first_points(keys, longitude, latitude)
+
+    def load(endpoint, query):
+        key, radius, age = query
+        lat, lon = queries[key]
+        url = request_metar_nearest(lat, lon, radius, age, client=client)
+        return _fetch(client, url, parse_metar)
+
+    # The search parameters change the answer, so they are part of the key.
+    rows = _fetch_all([('metar/nearest', (key, within_radius, max_age))
+                       for key in keys.tolist()], load, cache, workers)
+    return _table(rows, METAR_COLUMNS, ('issue_time',), ('station', 'name', 'raw_text'), {
+        'latitude': np.asarray(latitude, dtype=np.float64),
+        'longitude': np.asarray(longitude, dtype=np.float64),
+        'cell': keys,
+    })
+
+
+NDFD_COLUMNS = ('valid_begin', 'valid_end') + NDFD_FIELDS
+
+
+def batch_ndfd_hourly(latitude, longitude, utc_datetime, client=None, workers=16, cache=None):
+    """
+    Fetches NDFD hourly forecasts for many points concurrently. Points are
+    snapped to the NDFD grid and the forecast hour, so each (cell, hour)
+    is fetched once however many points fall in it, at the first input
+    point in the cell.
+
+    Args:
+        latitude (array-like): Point latitudes.
+        longitude (array-like): Point longitudes.
+        utc_datetime (datetime or list): Naive UTC forecast time, one for
+            all points or one per point.
+
+    Returns:
+        pandas.DataFrame: One row per point in input order with latitude,
+            longitude, cell, cell_longitude, cell_latitude (the NDFD grid
+            point), valid_begin, valid_end and the forecast values as
+            float64, NaN where the forecast is missing.
+    """
+    client = client or get_default_client()
+    cache = cache or client.report_cache
+    keys, cell_lon, cell_lat = snap_to_grid(longitude, latitude)
+    if isinstance(utc_datetime, datetime.datetime):
+        utc_datetime = [utc_datetime] * len(keys)
+    hours = [utc.replace(minute=0, second=0, microsecond=0) for utc in utc_datetime]
+    if len(hours) != len(keys):
+        raise ValueError("Expected one utc_datetime per point, got %d for %d points" % (
+            len(hours), len(keys)))
+    queries = _first_points(keys, longitude, latitude)
+
+    def load(endpoint, cell_hour):
+        key, hour = cell_hour
+        lat, lon = queries[key]
+        url = request_ndfd_hourly(lat, lon, hour, client=client)
+        return _fetch(client, url, lambda body: parse_ndfd_hourly(body, hour))
+
+    rows = _fetch_all([('ndfd/hourly', (key, hour)) for key, hour in zip(keys.tolist(), hours)],
+                      load, cache, workers)
+    return _table(rows, NDFD_COLUMNS, ('valid_begin', 'valid_end'), (), {
+        'latitude': np.asarray(latitude, dtype=np.float64),
+        'longitude': np.asarray(longitude, dtype=np.float64),
+        'cell': keys,
+        'cell_longitude': cell_lon,
+        'cell_latitude': cell_lat,
+    })
@@ -0,0 +1,174 @@
+import threading
+import time
+
+from .metrics import registry
+
+
+# Seconds a product's latest instance stays fresh, tuned to how often the
+# product publishes. Radar mosaics update every 2.5 minutes.
+DEFAULT_TTL = 60
+PRODUCT_TTLS = {
+    'C39-0x0302-0': 150,
+    'north-american-radar': 150,
+}
+
+# Seconds a fetched METAR or NDFD report stays fresh. METARs are issued
+# hourly and NDFD hourly forecasts are refreshed about as often.
+REPORT_TTL = 300
+
+
+class _Call(object):
+    """ A metadata request in flight that other threads can wait on
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class InstanceCache(object):
+    """
+    TTL cache of the latest product instance, keyed by (product, product_config).
+
+    Concurrent callers asking for the same key while it is being fetched
+    share one in-flight request (single-flight) instead of each making
+    their own metadata call. Failed or empty lookups are not cached.
+
+    Args:
+        ttl (float): Default time-to-live in seconds.
+        ttls (dict): Per-product overrides of ttl, defaults to PRODUCT_TTLS.
+        clock (callable): Monotonic clock, replaceable for testing.
+        name (str): Cache label reported to baron.metrics.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, ttls=None, clock=time.monotonic, name='instance'):
+        self.ttl = ttl
+        self.ttls = PRODUCT_TTLS if ttls is None else ttls
+        self.clock = clock
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = {}
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def ttl_for(self, product):
+        return self.ttls.get(product, self.ttl)
+
+    def _lookup(self, key):
+        # Must be called with self._lock held.
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > self.clock():
+            self.hits += 1
+            if registry.enabled:
+                registry.observe_cache(self.name, 'hit')
+            return entry
+        return None
+
+    def _count(self, result):
+        # Must be called with self._lock held.
+        if result == 'miss':
+            self.misses += 1
+        else:
+            self.coalesced += 1
+        if registry.enabled:
+            registry.observe_cache(self.name, result)
+
+    def _store(self, key, value):
+        if value:
+            self._entries[key] = (value, self.clock() + self.ttl_for(key[0]))
+
+    def get(self, product, product_config, load):
+        """
+        Returns the cached instance for (product, product_config), calling
+        load(product, product_config) on a miss.
+        """
+        key = (product, product_config)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[0]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count('miss' if leader else 'coalesced')
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = load(product, product_config)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._store(key, call.value)
+            call.event.set()
+        return call.value
+
+    async def aget(self, product, product_config, load):
+        """
+        asyncio variant of get(); load is a coroutine function. Tasks
+        asking for the same key share one in-flight request.
+        """
+        import asyncio
+
+        key = (product, product_config)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry[0]
+            task = self._tasks.get(key)
+            if task is None:
+                task = self._tasks[key] = asyncio.ensure_future(
+                    self._aload(key, load))
+                self._count('miss')
+            else:
+                self._count('coalesced')
+        return await asyncio.shield(task)
+
+    async def _aload(self, key, load):
+        try:
+            value = await load(*key)
+            with self._lock:
+                self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._tasks[key]
+
+    def invalidate(self, product=None, product_config=None):
+        """ Drops cached entries matching product and/or product_config, or all entries
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if product is not None and key[0] != product:
+                    continue
+                if product_config is not None and key[1] != product_config:
+                    continue
+                del self._entries[key]
+
+    def stats(self):
+        """
+        Returns the lookup counts. hit_rate is hits / lookups: coalesced
+        lookups waited on an upstream request, so they count against it
+        and are reported on their own.
+        """
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'lookups': lookups,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,301 @@
+import datetime
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import REPORT_TTL, InstanceCache
+from .metrics import redact_url
+from .signing import Signer
+from .transport import Transport
+
+
+log = logging.getLogger(__name__)
+
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+DEFAULT_HOST = "http://api.velocityweather.com/v1"
+ENV_FILE = "local.env"
+
+
+def parse_time(value):
+    return datetime.datetime.strptime(value, TIME_FORMAT)
+
+
+def format_time(value):
+    return value.strftime(TIME_FORMAT)
+
+
+def load_credentials(env_file=ENV_FILE):
+    """
+    Returns the (BARON_KEY, BARON_SECRET) pair from the environment, after
+    loading env_file with python-dotenv. Raises ValueError if either is
+    missing.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(env_file)
+    access_key = os.getenv("BARON_KEY")
+    if access_key is None:
+        raise ValueError(f"Missing BARON_KEY in {env_file} file")
+    access_key_secret = os.getenv("BARON_SECRET")
+    if access_key_secret is None:
+        raise ValueError(f"Missing BARON_SECRET in {env_file} file")
+    return access_key, access_key_secret
+
+
+class APIClient(object):
+    """
+    Velocity Weather API client.
+
+    All requests go through one pooled, keep-alive Transport. Extra keyword
+    arguments (pool_size, timeout, retries, backoff_factor, gzip, limiter)
+    are passed on to Transport when no transport is given.
+
+    The latest instance of each product is kept in an InstanceCache so that
+    repeated queries against the same product skip the metadata round trip.
+    report_cache holds the short-lived METAR and NDFD reports of
+    baron.batch; it belongs to the client, so clients with different
+    credentials or hosts never share reports.
+    """
+
+    def __init__(self, key, secret, base="http://localhost:80/v1",
+                 transport=None, instance_cache=None, report_cache=None, **transport_options):
+        self.base = base
+        self.key = key
+        self.secret = secret
+        self.signer = Signer(key, secret)
+        self.transport = transport or Transport(**transport_options)
+        self.instance_cache = instance_cache or InstanceCache()
+        self.report_cache = report_cache or InstanceCache(ttl=REPORT_TTL, ttls={}, name='reports')
+
+    @classmethod
+    def from_env(cls, env_file=ENV_FILE, base=DEFAULT_HOST, **options):
+        """ Returns a client for the credentials in env_file, see load_credentials
+        """
+        key, secret = load_credentials(env_file)
+        return cls(key, secret, base=base, **options)
+
+    def make_url(self, api):
+        url = "%s/%s%s" % (self.base, self.key, api)
+        return self.signer.sign_url(url)
+
+    def get(self, url, **kwargs):
+        """ Returns the requests.Response for an already signed url
+        """
+        return self.transport.get(url, **kwargs)
+
+    def fetch_json(self, api, **kwargs):
+        """
+        Signs and fetches an API path, returning the decoded JSON body or
+        None if the request fails.
+        """
+        import requests
+
+        try:
+            response = self.get(self.make_url(api), **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except requests.RequestException as e:
+            log.warning("[VelocityWeather] Request failed: %s", redact_url(str(e)))
+            return None
+
+    def close(self):
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def query_instances(self, product, configuration, before=None, newer_than=None,
+                        limit=10):
+        """
+        Returns one page of at most limit product instances, newest first,
+        optionally bounded to those older than before and/or newer than
+        newer_than.
+        """
+        api = "/meta/tiles/product-instances/{}/{}.json?limit={}".format(
+            product, configuration, limit)
+        if before:
+            api += "&older_than={}".format(before)
+        if newer_than:
+            api += "&newer_than={}".format(newer_than)
+
+        return self.get(self.make_url(api)).json()
+
+    def list_all_instances(self, product, configuration, page_size=100,
+                           before=None, newer_than=None, stop=None, max_pages=None):
+        """
+        Yields product instances newest first, paging back with older_than.
+
+        As soon as a page arrives the request for the next one is started in
+        the background, so the network round trip overlaps with the caller
+        consuming the current page. A caller that will stop early should
+        say so with stop or max_pages; otherwise the speculative request
+        for the next page is still made, and billed, after it stops.
+
+        Args:
+            page_size (int): Instances requested per page.
+            before (str): Only list instances older than this time.
+            newer_than (str): Only list instances newer than this time.
+            stop (callable): stop(instance) returns True for the first
+                instance not wanted; the listing ends before it and no
+                later page is requested.
+            max_pages (int): Request at most this many pages.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(self.query_instances, product, configuration,
+                                      before, newer_than, page_size)
+            pages = 1
+            while True:
+                instances = pending.result()
+                if not instances:
+                    return
+                end = len(instances)
+                if stop is not None:
+                    end = next((i for i, instance in enumerate(instances) if stop(instance)), end)
+                last = end < len(instances) or (max_pages is not None and pages >= max_pages)
+                if not last:
+                    # The server may cap page_size, so only an empty page
+                    # ends the listing.
+                    pending = executor.submit(self.query_instances, product, configuration,
+                                              instances[-1]['time'], newer_than, page_size)
+                    pages += 1
+                yield from instances[:end]
+                if last:
+                    return
+
+    def list_instances_between(self, product, configuration, start, end, windows=4,
+                               page_size=100):
+        """
+        Yields the product instances with start <= time <= end, newest first.
+
+        The range is split into windows equal time windows that are paged
+        concurrently, which turns one long serial backfill into windows
+        shorter ones running side by side.
+
+        Args:
+            start (str or datetime): Oldest instance time, e.g. '2025-05-08T00:00:00Z'.
+            end (str or datetime): Newest instance time.
+            windows (int): Number of windows listed in parallel.
+            page_size (int): Instances requested per page.
+        """
+        if isinstance(start, str):
+            start = parse_time(start)
+        if isinstance(end, str):
+            end = parse_time(end)
+
+        step = (end - start) / windows
+        bounds = [start + step * i for i in range(windows)] + [end + datetime.timedelta(seconds=1)]
+        # Newest window first, each covering lo <= time < hi. newer_than and
+        # older_than are exclusive, so the lower bound is widened by a second
+        # and the overlap filtered out below.
+        ranges = [(bounds[i], bounds[i + 1]) for i in reversed(range(windows))]
+
+        def list_window(window):
+            lo, hi = window
+            lo_text, hi_text = format_time(lo), format_time(hi)
+            return [instance for instance in self.list_all_instances(
+                        product, configuration, page_size, before=hi_text,
+                        newer_than=format_time(lo - datetime.timedelta(seconds=1)))
+                    if lo_text <= instance['time'] < hi_text]
+
+        with ThreadPoolExecutor(max_workers=windows) as executor:
+            for instances in executor.map(list_window, ranges):
+                yield from instances
+
+    def query_geotiff(self, product, configuration, time):
+
+        url = self.make_url(
+            "/geotiff/{}/{}/{}.json".format(product, configuration, time))
+
+        return self.get(url).json()
+
+    def _fetch_latest_instance(self, product, product_config):
+        data = self.fetch_json(
+            f"/meta/tiles/product-instances/{product}/{product_config}?page_size=1")
+        if not data:
+            return None
+        return data[0]
+
+    def get_latest_instance(self, product, product_config):
+        """
+        Returns the most recent product instance (a dict with 'time' and,
+        for forecast products, 'valid_times'), or None if no instance is
+        available. Served from instance_cache while fresh.
+        """
+        return self.instance_cache.get(
+            product, product_config, self._fetch_latest_instance)
+
+    def get_instance_time(self, product, product_config):
+        """
+        Returns the most recent product instance time for product and
+        product_config, or None if no instance is available.
+        """
+        instance = self.get_latest_instance(product, product_config)
+        if not instance:
+            return None
+        return instance['time']
+
+    def point_query_region(self, product, product_config, region_bounds,
+                           product_instance_time=None):
+        """
+        Queries a specific region for weather data using a given product and configuration.
+
+        Args:
+            product (str): The product identifier for the weather data.
+            product_config (str): The configuration identifier for the product.
+            region_bounds (list or tuple): The bounding coordinates of the region
+                in the format [west_longitude, north_latitude, east_longitude, south_latitude].
+
+            product_instance_time (str): Instance to query, defaults to the
+                latest one.
+
+        Returns:
+            list or None: The decoded region response, None if a request fails.
+        """
+        if product_instance_time is None:
+            product_instance_time = self.get_instance_time(product, product_config)
+            if product_instance_time is None:
+                return None
+
+        w_lon, n_lat, e_lon, s_lat = region_bounds[:4]
+        query_region = f'w_lon={w_lon}&n_lat={n_lat}&e_lon={e_lon}&s_lat={s_lat}'
+
+        return self.fetch_json(
+            f'/point/region/{product}/{product_config}/{product_instance_time}.json?{query_region}',
+            headers={'Accept': 'application/json'})
+
+    def download_geotiff(self, product, product_config, bbox, dest, checksum=None,
+                         product_instance_time=None):
+        """
+        Streams the GeoTIFF for bbox from product_instance_time, by default
+        the latest product instance, to dest, see baron.geotiff.download_geotiff.
+        """
+        from . import geotiff
+
+        return geotiff.download_geotiff(
+            self, product, product_config, bbox, dest, checksum=checksum,
+            product_instance_time=product_instance_time)
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client():
+    """
+    Returns the process-wide APIClient for the credentials in local.env,
+    created on first use rather than when baron is imported. Its requests
+    draw from the shared 'baron' RateLimiter, so they are throttled and
+    stop with QuotaExceeded at the quota (see baron.ratelimit.PROVIDERS).
+    """
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            from .ratelimit import get_limiter
+
+            _default_client = APIClient.from_env(limiter=get_limiter('baron'))
+        return _default_client
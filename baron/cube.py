@@ -0,0 +1,266 @@
+import json
+import os
+import threading
+
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.transform import Affine
+from rasterio.warp import Resampling, reproject, transform_bounds
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import transform as window_transform
+
+
+# Time slices stored per chunk file.
+CHUNK_SIZE = 24
+
+INDEX_FILE = 'index.json'
+
+
+class RasterCube(object):
+    """
+    Time series of product instances stacked on one common grid, stored as
+    memory-mapped .npy chunks plus a JSON index.
+
+    Each chunk file holds up to chunk_size float32 slices of shape
+    (height, width), with nodata stored as NaN. Appending an instance
+    writes a single slice into the open chunk, and reads go through
+    np.memmap, so the stack never has to fit in RAM. Use create() or
+    from_geotiff() to start a cube and open() to reuse one.
+
+    Args:
+        path (str): Directory of the cube.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self._index = json.load(f)
+        self.crs = CRS.from_wkt(self._index['crs'])
+        self.transform = Affine(*self._index['transform'])
+        self.height = self._index['height']
+        self.width = self._index['width']
+        self.chunk_size = self._index['chunk_size']
+        self.metadata = self._index.get('metadata', {})
+        self._chunks = {}
+
+    @classmethod
+    def create(cls, path, crs, transform, width, height, chunk_size=CHUNK_SIZE, metadata=None):
+        """
+        Creates an empty cube on the grid given by crs, transform, width and
+        height. metadata (e.g. product and product_config) is kept in the
+        index.
+        """
+        os.makedirs(path, exist_ok=True)
+        index = {
+            'crs': CRS.from_user_input(crs).to_wkt(),
+            'transform': list(transform)[:6],
+            'width': width,
+            'height': height,
+            'chunk_size': chunk_size,
+            'metadata': metadata or {},
+            'times': [],
+        }
+        cls._write_index(path, index)
+        return cls(path)
+
+    @classmethod
+    def from_geotiff(cls, path, geotiff, chunk_size=CHUNK_SIZE, metadata=None):
+        """ Creates an empty cube on the grid of an existing GeoTIFF
+        """
+        with rasterio.open(geotiff) as src:
+            return cls.create(path, src.crs, src.transform, src.width, src.height,
+                              chunk_size, metadata)
+
+    @classmethod
+    def open(cls, path):
+        return cls(path)
+
+    @staticmethod
+    def _write_index(path, index):
+        tmp = os.path.join(path, INDEX_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, os.path.join(path, INDEX_FILE))
+
+    @property
+    def times(self):
+        """ Returns the instance times in the cube, oldest first
+        """
+        return sorted(self._index['times'])
+
+    def _chunk(self, number, create=False):
+        chunk = self._chunks.get(number)
+        if chunk is None:
+            chunk_path = os.path.join(self.path, 'chunk-%05d.npy' % number)
+            if os.path.exists(chunk_path):
+                chunk = np.load(chunk_path, mmap_mode='r+')
+            elif create:
+                chunk = np.lib.format.open_memmap(
+                    chunk_path, mode='w+', dtype=np.float32,
+                    shape=(self.chunk_size, self.height, self.width))
+                chunk[:] = np.nan
+            else:
+                raise KeyError(number)
+            self._chunks[number] = chunk
+        return chunk
+
+    def append(self, geotiff, instance_time, band=1, resampling=Resampling.nearest):
+        """
+        Adds band of a GeoTIFF as the slice for instance_time, reprojecting
+        it onto the cube grid when its grid differs. Appending a time that
+        is already in the cube overwrites its slice.
+        """
+        with rasterio.open(geotiff) as src:
+            image = src.read(band, out_dtype=np.float32)
+            if src.nodata is not None and not np.isnan(src.nodata):
+                image[image == src.nodata] = np.nan
+            if (src.crs != self.crs or src.transform != self.transform or
+                    image.shape != (self.height, self.width)):
+                source = image
+                image = np.full((self.height, self.width), np.nan, dtype=np.float32)
+                reproject(source, image, src_transform=src.transform, src_crs=src.crs,
+                          src_nodata=np.nan, dst_transform=self.transform, dst_crs=self.crs,
+                          dst_nodata=np.nan, resampling=resampling)
+
+        with self._lock:
+            times = self._index['times']
+            slot = times.index(instance_time) if instance_time in times else len(times)
+            chunk = self._chunk(slot // self.chunk_size, create=True)
+            chunk[slot % self.chunk_size] = image
+            chunk.flush()
+            if slot == len(times):
+                times.append(instance_time)
+                self._write_index(self.path, self._index)
+
+    def select(self, start=None, end=None, bbox=None):
+        """
+        Returns a lazy CubeView of the instances with start <= time <= end
+        inside bbox. Nothing is read until the view is.
+
+        Args:
+            start, end (str): Instance times bounding the selection, or None.
+            bbox (list): [west_longitude, north_latitude, east_longitude,
+                south_latitude] in EPSG:4326, or None for the whole grid.
+        """
+        times = self._index['times']
+        slots = sorted((t, slot) for slot, t in enumerate(times)
+                       if (start is None or t >= start) and (end is None or t <= end))
+
+        window = Window(0, 0, self.width, self.height)
+        if bbox is not None:
+            w_lon, n_lat, e_lon, s_lat = bbox[:4]
+            left, bottom, right, top = transform_bounds("EPSG:4326", self.crs,
+                                                        w_lon, s_lat, e_lon, n_lat)
+            window = from_bounds(left, bottom, right, top, self.transform)
+            col0 = max(int(np.floor(window.col_off)), 0)
+            row0 = max(int(np.floor(window.row_off)), 0)
+            col1 = min(int(np.ceil(window.col_off + window.width)), self.width)
+            row1 = min(int(np.ceil(window.row_off + window.height)), self.height)
+            window = Window(col0, row0, max(col1 - col0, 0), max(row1 - row0, 0))
+        return CubeView(self, [t for t, _ in slots], [slot for _, slot in slots], window)
+
+
+class CubeView(object):
+    """
+    Lazy time/bbox selection of a RasterCube. Aggregates stream through the
+    selected slices one chunk at a time, so memory stays bounded by
+    chunk_size slices of the window.
+    """
+
+    def __init__(self, cube, times, slots, window):
+        self.cube = cube
+        self.times = times
+        self._slots = slots
+        self.window = window
+        self.transform = window_transform(window, cube.transform)
+        self.crs = cube.crs
+
+    @property
+    def shape(self):
+        return (len(self.times), int(self.window.height), int(self.window.width))
+
+    def _blocks(self):
+        """ Yields (times, array) blocks of consecutive slices from the same chunk
+        """
+        rows, cols = self.window.toslices()
+        size = self.cube.chunk_size
+        start = 0
+        while start < len(self._slots):
+            number = self._slots[start] // size
+            end = start
+            while end < len(self._slots) and self._slots[end] // size == number:
+                end += 1
+            offsets = [slot % size for slot in self._slots[start:end]]
+            yield self.times[start:end], self.cube._chunk(number)[offsets, rows, cols]
+            start = end
+
+    def __iter__(self):
+        """ Yields (time, array) per selected instance
+        """
+        for times, block in self._blocks():
+            for t, image in zip(times, block):
+                yield t, image
+
+    def read(self):
+        """ Returns the selection as an in-memory (time, rows, cols) array
+        """
+        result = np.empty(self.shape, dtype=np.float32)
+        start = 0
+        for times, block in self._blocks():
+            result[start:start + len(times)] = block
+            start += len(times)
+        return result
+
+    def _reduce(self, func, combine):
+        result = None
+        for _, block in self._blocks():
+            partial = func(block)
+            result = partial if result is None else combine(result, partial)
+        if result is None:
+            return np.full(self.shape[1:], np.nan, dtype=np.float32)
+        return result
+
+    def max(self):
+        """ Returns the per-pixel maximum over time, e.g. max hail size
+        """
+        return self._reduce(lambda b: np.fmax.reduce(b, axis=0), np.fmax)
+
+    def min(self):
+        return self._reduce(lambda b: np.fmin.reduce(b, axis=0), np.fmin)
+
+    def count(self):
+        """ Returns the per-pixel number of slices holding data
+        """
+        return self._reduce(lambda b: np.count_nonzero(~np.isnan(b), axis=0), np.add)
+
+    def _sum_count(self):
+        total = np.zeros(self.shape[1:], dtype=np.float64)
+        count = np.zeros(self.shape[1:], dtype=np.int64)
+        for _, block in self._blocks():
+            total += np.nansum(block, axis=0, dtype=np.float64)
+            count += np.count_nonzero(~np.isnan(block), axis=0)
+        return total, count
+
+    def sum(self):
+        """
+        Returns the per-pixel sum over time, e.g. accumulated
+        precipitation; NaN where no slice holds data.
+        """
+        total, count = self._sum_count()
+        total[count == 0] = np.nan
+        return total
+
+    def mean(self):
+        total, count = self._sum_count()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, total / count, np.nan)
+
+    def to_geotiff(self, array, path):
+        """ Writes a 2D aggregate of this view (e.g. view.max()) as a GeoTIFF
+        """
+        with rasterio.open(path, 'w', driver='GTiff', height=array.shape[0],
+                           width=array.shape[1], count=1, dtype=array.dtype,
+                           crs=self.crs, transform=self.transform, nodata=np.nan) as dst:
+            dst.write(array, 1)
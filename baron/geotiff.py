@@ -0,0 +1,198 @@
+import hashlib
+import json
+import logging
+import os
+
+import requests
+
+from .metrics import redact_url
+
+
+log = logging.getLogger(__name__)
+
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def format_bbox(bbox):
+    """ Returns bbox as the comma-separated string the API expects
+    """
+    if isinstance(bbox, str):
+        return bbox
+    return ','.join(str(x) for x in bbox)
+
+
+def request_geotiff_source(client, product, product_config, bbox, product_instance_time=None):
+    """
+    Returns the download url of the GeoTIFF rendered for bbox from
+    product_instance_time, by default the latest product instance, or None
+    if the request fails.
+    """
+    if product_instance_time is None:
+        product_instance_time = client.get_instance_time(product, product_config)
+    if product_instance_time is None:
+        log.warning("Product instance time not found for %s/%s", product, product_config)
+        return None
+
+    data = client.fetch_json(
+        f"/geotiff/{product}/{product_config}/{product_instance_time}?&BBOX={format_bbox(bbox)}")
+    if not data:
+        return None
+    return data['source']
+
+
+def _parse_checksum(checksum):
+    # 'sha256:abc...' or a bare hex digest, which is taken to be sha256.
+    if checksum is None:
+        return None, None
+    algorithm, _, digest = checksum.rpartition(':')
+    return hashlib.new(algorithm or 'sha256'), digest.lower()
+
+
+def _content_range_start(response):
+    # 'bytes 1000-1999/2000' -> 1000, None if the header is missing or malformed.
+    value = response.headers.get('Content-Range', '')
+    unit, _, span = value.partition(' ')
+    start = span.partition('-')[0]
+    if unit != 'bytes' or not start.isdigit():
+        return None
+    return int(start)
+
+
+def _read_validator(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_validator(path, validator):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(validator, f)
+    os.replace(tmp, path)
+
+
+def _remove(*paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def download_file(client, url, dest, checksum=None, chunk_size=CHUNK_SIZE):
+    """
+    Streams url to dest in chunks, keeping memory use flat regardless of size.
+
+    The body is written to dest + '.part' and renamed over dest only once it
+    is complete (and matches checksum, if given), so readers never see a
+    half-written file. The url (without its signature) and the response's
+    ETag or Last-Modified are kept in dest + '.part.json'. If a .part file
+    is left over from an interrupted download of the same url, the
+    remainder is requested with Range and If-Range, so a server whose file
+    has changed sends the whole new file instead. The partial file is also
+    discarded when the 206 Content-Range does not start at its size.
+
+    Args:
+        client (APIClient): Client whose pooled transport is used.
+        url (str): The file url.
+        dest (str): Destination path.
+        checksum (str): Optional expected digest, as 'algorithm:hexdigest'
+            (e.g. 'md5:...') or a bare sha256 hex digest.
+        chunk_size (int): Bytes read and written per chunk.
+
+    Returns:
+        str or None: dest if the download succeeded, None otherwise.
+    """
+    part = dest + '.part'
+    meta = part + '.json'
+    hasher, expected = _parse_checksum(checksum)
+
+    # Compressed transfer encodings would make Range offsets meaningless.
+    headers = {'Accept-Encoding': 'identity'}
+    offset = os.path.getsize(part) if os.path.exists(part) else 0
+    if offset:
+        validator = _read_validator(meta)
+        if (validator is None or validator.get('url') != redact_url(url) or
+                not (validator.get('etag') or validator.get('last_modified'))):
+            # Unknown origin; its bytes cannot safely be continued.
+            _remove(part, meta)
+            offset = 0
+        else:
+            headers['Range'] = 'bytes=%d-' % offset
+            headers['If-Range'] = validator.get('etag') or validator['last_modified']
+
+    try:
+        with client.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 416:
+                # The partial file does not match the remote one; start over.
+                _remove(part, meta)
+                return download_file(client, url, dest, checksum, chunk_size)
+            response.raise_for_status()
+
+            if response.status_code == 206:
+                if _content_range_start(response) != offset:
+                    _remove(part, meta)
+                    return download_file(client, url, dest, checksum, chunk_size)
+                mode = 'ab'
+                if hasher is not None:
+                    with open(part, 'rb') as f:
+                        for chunk in iter(lambda: f.read(chunk_size), b''):
+                            hasher.update(chunk)
+            else:
+                mode = 'wb'
+                _write_validator(meta, {
+                    'url': redact_url(url),
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                })
+
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+    except requests.RequestException as e:
+        log.warning("[VelocityWeather] Download failed, partial file kept for resume: %s",
+                    redact_url(str(e)))
+        return None
+
+    if hasher is not None and hasher.hexdigest() != expected:
+        log.warning("Checksum mismatch for %s: expected %s, got %s",
+                    redact_url(url), expected, hasher.hexdigest())
+        _remove(part, meta)
+        return None
+
+    os.replace(part, dest)
+    _remove(meta)
+    return dest
+
+
+def download_geotiff(client, product, product_config, bbox, dest, checksum=None,
+                     chunk_size=CHUNK_SIZE, product_instance_time=None):
+    """
+    Downloads the GeoTIFF for bbox from product_instance_time, by default
+    the latest product instance, to dest.
+
+    Args:
+        client (APIClient): The API client.
+        product (str): The product identifier, e.g. 'C39-0x03A1-0'.
+        product_config (str): The product configuration, e.g. 'Standard-Geodetic'.
+        bbox (str or list): Bounds as [west_longitude, north_latitude,
+            east_longitude, south_latitude] or the equivalent string.
+        dest (str): Destination path of the .tiff file.
+        checksum (str): Optional expected digest, see download_file.
+        product_instance_time (str): Instance to download, defaults to the
+            latest one.
+
+    Returns:
+        str or None: dest if the download succeeded, None otherwise.
+    """
+    source = request_geotiff_source(client, product, product_config, bbox,
+                                    product_instance_time)
+    if source is None:
+        log.warning("Failed to get GeoTIFF URL")
+        return None
+    return download_file(client, source, dest, checksum=checksum, chunk_size=chunk_size)
@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from .points import parse_region_response
+
+
+class Checkpoint(object):
+    """
+    JSON manifest recording the last processed instance time per
+    (product, product_config, region). Every set() rewrites the manifest
+    atomically, so an interrupted run resumes from its last finished
+    instance.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self._entries = json.load(f)
+        else:
+            self._entries = {}
+
+    @staticmethod
+    def _key(product, product_config, region):
+        return f"{product}/{product_config}/{region}"
+
+    def get(self, product, product_config, region):
+        return self._entries.get(self._key(product, product_config, region))
+
+    def set(self, product, product_config, region, instance_time):
+        with self._lock:
+            self._entries[self._key(product, product_config, region)] = instance_time
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as f:
+                json.dump(self._entries, f, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+
+
+def instances_since(client, product, product_config, since=None):
+    """
+    Returns the instance times newer than since, oldest first. Pages back
+    from the latest instance and stops at since, so only the new part of
+    the history is listed. With since=None only the latest instance is
+    returned, which bootstraps a fresh checkpoint.
+    """
+    if since is None:
+        instances = client.list_all_instances(product, product_config, page_size=1,
+                                              max_pages=1)
+    else:
+        instances = client.list_all_instances(product, product_config, newer_than=since,
+                                              stop=lambda instance: instance['time'] <= since)
+    return [instance['time'] for instance in instances][::-1]
+
+
+def partition_path(root, product, product_config, region, instance_time):
+    """ Returns the file holding one instance of one region in the output store
+    """
+    # ':' is not allowed in Windows file names.
+    stamp = instance_time.replace(':', '')
+    return os.path.join(root, f"product={product}", f"config={product_config}",
+                        f"region={region}", f"time={stamp}.npz")
+
+
+def write_partition(path, points):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp.npz'
+    np.savez_compressed(tmp, **points)
+    os.replace(tmp, path)
+
+
+def update(client, product, product_config, region, bbox, checkpoint, root):
+    """
+    Incrementally sweeps one region: fetches only the product instances
+    newer than the checkpoint, writes each as a new partition under root
+    and advances the checkpoint after every instance.
+
+    Args:
+        client (APIClient): The API client.
+        product (str): The product identifier.
+        product_config (str): The product configuration.
+        region (str): Name of the region, e.g. 'texas'; part of the
+            checkpoint key and of the partition path.
+        bbox (list): Region bounds as [west_longitude, north_latitude,
+            east_longitude, south_latitude].
+        checkpoint (Checkpoint): Where progress is recorded.
+        root (str): Root directory of the partitioned output store.
+
+    Returns:
+        list: Paths of the partitions written by this run.
+    """
+    since = checkpoint.get(product, product_config, region)
+    written = []
+    for instance_time in instances_since(client, product, product_config, since):
+        content = client.point_query_region(product, product_config, bbox,
+                                            product_instance_time=instance_time)
+        if content is None:
+            # Leave the checkpoint here so the next run retries this instance.
+            break
+        path = partition_path(root, product, product_config, region, instance_time)
+        write_partition(path, parse_region_response(content))
+        checkpoint.set(product, product_config, region, instance_time)
+        written.append(path)
+    return written
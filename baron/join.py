@@ -0,0 +1,163 @@
+import numpy as np
+import rasterio
+from rasterio.crs import CRS
+from rasterio.warp import transform as warp_transform
+from rasterio.windows import Window
+from scipy.spatial import cKDTree
+
+from .raster import pixel_index
+
+
+# Mean Earth radius in meters.
+EARTH_RADIUS = 6371008.8
+
+
+def coordinates(points):
+    """
+    Returns (longitude, latitude) float64 arrays for a GeoDataFrame of
+    points, a DataFrame with longitude/latitude columns, or a baron.points
+    column dict.
+    """
+    geometry = getattr(points, 'geometry', None)
+    if geometry is not None and not isinstance(points, dict):
+        return (np.asarray(geometry.x, dtype=np.float64),
+                np.asarray(geometry.y, dtype=np.float64))
+    return (np.asarray(points['longitude'], dtype=np.float64),
+            np.asarray(points['latitude'], dtype=np.float64))
+
+
+def sample_raster(path, longitude, latitude, bands=None, crs="EPSG:4326"):
+    """
+    Samples a raster at many points without polygonizing it.
+
+    The points are converted to pixel indices with one inverse affine
+    transform over the coordinate arrays, and only the window of the raster
+    that covers them is read.
+
+    Args:
+        path (str): Path of the GeoTIFF, e.g. from APIClient.download_geotiff.
+        longitude, latitude: Coordinate arrays of the points.
+        bands (list): 1-based band indexes to sample; all bands when None.
+        crs: CRS of the points; they are reprojected to the raster CRS when
+            it differs.
+
+    Returns:
+        numpy.ndarray: float64 array of shape (points, bands). Points
+            outside the raster or on nodata pixels are NaN.
+    """
+    x = np.asarray(longitude, dtype=np.float64)
+    y = np.asarray(latitude, dtype=np.float64)
+    with rasterio.open(path) as src:
+        bands = list(bands) if bands is not None else list(src.indexes)
+        if crs is not None and src.crs is not None and CRS.from_user_input(crs) != src.crs:
+            x, y = (np.asarray(v) for v in warp_transform(crs, src.crs, x, y))
+
+        values = np.full((len(x), len(bands)), np.nan)
+        rows, cols = pixel_index(x, y, src.transform)
+        inside = (rows >= 0) & (rows < src.height) & (cols >= 0) & (cols < src.width)
+        if not inside.any():
+            return values
+
+        row0, row1 = rows[inside].min(), rows[inside].max() + 1
+        col0, col1 = cols[inside].min(), cols[inside].max() + 1
+        image = src.read(bands, window=Window(col0, row0, col1 - col0, row1 - row0))
+        nodata = src.nodatavals
+
+    sampled = image[:, rows[inside] - row0, cols[inside] - col0].T.astype(np.float64)
+    for i, band in enumerate(bands):
+        band_nodata = nodata[band - 1]
+        if band_nodata is not None and not np.isnan(band_nodata):
+            sampled[sampled[:, i] == band_nodata, i] = np.nan
+    values[inside] = sampled
+    return values
+
+
+def join_raster(points, path, bands=None, column='value', crs="EPSG:4326"):
+    """
+    Returns a copy of points (e.g. FIRMS detections) with the raster values
+    at each point added as columns: column for a single band, or
+    column_1 ... column_n for several bands.
+    """
+    longitude, latitude = coordinates(points)
+    values = sample_raster(path, longitude, latitude, bands, crs)
+    result = points.copy()
+    if values.shape[1] == 1:
+        result[column] = values[:, 0]
+    else:
+        for i in range(values.shape[1]):
+            result['%s_%d' % (column, i + 1)] = values[:, i]
+    return result
+
+
+def _unit_vectors(longitude, latitude):
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+class NearestIndex(object):
+    """
+    KD-tree over a point set, such as tx_wind_points or the output of
+    baron.points.parse_region_response, for nearest-neighbour lookups.
+
+    Points are placed on the unit sphere, so distances are true great-circle
+    distances in meters rather than distorted degree distances.
+
+    Args:
+        longitude, latitude: Coordinate arrays of the indexed points, in
+            EPSG:4326.
+    """
+
+    def __init__(self, longitude, latitude):
+        self.tree = cKDTree(_unit_vectors(longitude, latitude))
+
+    def query(self, longitude, latitude, max_distance=None, workers=1):
+        """
+        Returns (distance, index) arrays with the great-circle distance in
+        meters to, and the index of, the nearest indexed point. Points with
+        no neighbour within max_distance meters get an inf distance and
+        index -1.
+        """
+        upper = np.inf
+        if max_distance is not None:
+            upper = 2.0 * np.sin(min(max_distance / EARTH_RADIUS, np.pi) / 2.0)
+        chord, index = self.tree.query(_unit_vectors(longitude, latitude),
+                                       distance_upper_bound=upper, workers=workers)
+        found = np.isfinite(chord)
+        distance = np.full(chord.shape, np.inf)
+        distance[found] = 2.0 * EARTH_RADIUS * np.arcsin(np.minimum(chord[found] / 2.0, 1.0))
+        index = np.where(found, index, -1)
+        return distance, index
+
+
+def join_nearest(left, right, columns=None, max_distance=None, distance_column='distance_m'):
+    """
+    Returns a copy of left with the columns of the nearest point in right,
+    e.g. the wind value closest to each FIRMS detection.
+
+    Args:
+        left: Points to annotate (GeoDataFrame, DataFrame or points dict).
+        right: Point set to search (GeoDataFrame, DataFrame or points dict).
+        columns (list): Columns of right to copy; 'value' when None.
+        max_distance (float): Only match points within this many meters;
+            unmatched rows get NaN.
+        distance_column (str): Name of the column holding the distance in
+            meters, or None to leave it out.
+    """
+    index = NearestIndex(*coordinates(right))
+    distance, nearest = index.query(*coordinates(left), max_distance=max_distance)
+    found = nearest >= 0
+
+    result = left.copy()
+    for name in columns or ['value']:
+        source = np.asarray(right[name])
+        if source.dtype.kind in 'biuf':
+            values = np.full(len(nearest), np.nan)
+        else:
+            values = np.full(len(nearest), None, dtype=object)
+        values[found] = source[nearest[found]]
+        result[name] = values
+    if distance_column:
+        result[distance_column] = np.where(found, distance, np.nan)
+    return result
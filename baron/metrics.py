@@ -0,0 +1,232 @@
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+
+# Upper bounds in seconds of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# First path segments of the API endpoints and how many segments name the
+# endpoint, e.g. /v1/<key>/point/region/<product>/... is 'point/region' and
+# the FIRMS /api/area/csv/<MAP_KEY>/... is 'api/area/csv'.
+ENDPOINTS = {
+    'meta': 3,
+    'point': 2,
+    'wms': 1,
+    'geotiff': 1,
+    'tms': 1,
+    'reports': 3,
+    'files': 2,
+    'api': 3,
+}
+
+_SECRET_PARAMS = re.compile(r'(?<=[?&])(sig|ts|MAP_KEY)=[^&#\s]*')
+# FIRMS puts the MAP_KEY in the path: /api/<source>/csv/<MAP_KEY>/...
+_SECRET_SEGMENTS = re.compile(r'(/api/[A-Za-z_]+/csv/)[^/?#\s]+')
+# Label segments holding digits are ids (products, stations, instance
+# times) rather than endpoint names.
+_ID_SEGMENT = re.compile(r'\d')
+
+
+def redact_url(text):
+    """
+    Returns text with the values of the signed sig and ts query parameters
+    and of the FIRMS MAP_KEY, in the query or the path, removed
+    """
+    return _SECRET_SEGMENTS.sub(r'\1REDACTED', _SECRET_PARAMS.sub(r'\1=REDACTED', text))
+
+
+def endpoint_of(url):
+    """
+    Returns the low-cardinality endpoint label of an API url, such as
+    'point/region' or 'reports/metar/station', leaving out the access key,
+    products, instance times and coordinates. Segments that look like ids
+    are collapsed to '{id}', and unknown urls are labelled 'other'.
+    """
+    path = url.split('?', 1)[0].split('#', 1)[0]
+    segments = [s for s in path.split('/') if s]
+    for i, segment in enumerate(segments):
+        if segment in ENDPOINTS:
+            parts = segments[i:i + ENDPOINTS[segment]]
+            if segment == 'point' and len(parts) > 1 and parts[1] != 'region':
+                parts = parts[:1]
+            parts[-1] = parts[-1].rsplit('.', 1)[0]
+            return '/'.join('{id}' if _ID_SEGMENT.search(part) else part for part in parts)
+    return 'other'
+
+
+def _labels(**labels):
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                             for k, v in sorted(labels.items()))
+
+
+class JsonLinesSink(object):
+    """ Writes each event as one JSON line to a file path or stream
+    """
+
+    def __init__(self, target=sys.stderr):
+        self._lock = threading.Lock()
+        self._stream = open(target, 'a') if isinstance(target, str) else target
+
+    def __call__(self, event):
+        line = json.dumps(event, sort_keys=True)
+        with self._lock:
+            self._stream.write(line + '\n')
+            self._stream.flush()
+
+
+class Metrics(object):
+    """
+    Process-wide request and cache instrumentation.
+
+    Records per-endpoint latency histograms, status codes, response bytes
+    (as sent on the wire and decoded), retries and cache lookups. Read it
+    as Prometheus text with exposition() or write_textfile(), or pass a
+    sink (e.g. JsonLinesSink) to receive every request as a structured
+    event. URLs in events are passed through redact_url and endpoint
+    labels through endpoint_of, so no signature or key reaches either.
+
+    Disabled by default; instrumented code checks the enabled attribute
+    first, so the disabled cost is one attribute lookup per request. Set
+    BARON_METRICS=1 or call enable() to turn it on.
+    """
+
+    def __init__(self, enabled=False, sink=None, buckets=LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.sink = sink
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, sink=None):
+        self.sink = sink
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        self.sink = None
+
+    def reset(self):
+        with self._lock:
+            self._latency = {}
+            self._requests = {}
+            self._bytes = {}
+            self._retries = {}
+            self._cache = {}
+
+    def observe_request(self, url, status, seconds, wire_bytes=None, body_bytes=None,
+                        retries=0, method='GET'):
+        """
+        Records one HTTP request. status is the HTTP status code or the
+        exception class name when no response arrived.
+        """
+        endpoint = endpoint_of(url)
+        with self._lock:
+            histogram = self._latency.get(endpoint)
+            if histogram is None:
+                histogram = self._latency[endpoint] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[1] += seconds
+
+            key = (endpoint, method, str(status))
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if wire_bytes is not None:
+                key = (endpoint, 'wire')
+                self._bytes[key] = self._bytes.get(key, 0) + wire_bytes
+            if body_bytes is not None:
+                key = (endpoint, 'decoded')
+                self._bytes[key] = self._bytes.get(key, 0) + body_bytes
+            if retries:
+                self._retries[endpoint] = self._retries.get(endpoint, 0) + retries
+
+        if self.sink is not None:
+            self.sink({
+                'event': 'request',
+                'time': time.time(),
+                'endpoint': endpoint,
+                'url': redact_url(url),
+                'method': method,
+                'status': status,
+                'seconds': round(seconds, 6),
+                'wire_bytes': wire_bytes,
+                'body_bytes': body_bytes,
+                'retries': retries,
+            })
+
+    def observe_cache(self, cache, result):
+        """ Records a cache lookup; result is 'hit', 'miss' or 'coalesced'
+        """
+        with self._lock:
+            key = (cache, result)
+            self._cache[key] = self._cache.get(key, 0) + 1
+
+    def cache_hit_rates(self):
+        """
+        Returns {cache: fraction of lookups served without a request}.
+        Coalesced lookups waited on another caller's request, so only hits
+        count as served.
+        """
+        with self._lock:
+            totals, served = {}, {}
+            for (cache, result), count in self._cache.items():
+                totals[cache] = totals.get(cache, 0) + count
+                if result == 'hit':
+                    served[cache] = served.get(cache, 0) + count
+        return {cache: served.get(cache, 0) / float(total) for cache, total in totals.items()}
+
+    def exposition(self):
+        """ Returns the metrics in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            lines.append('# HELP baron_request_duration_seconds Request latency by endpoint.')
+            lines.append('# TYPE baron_request_duration_seconds histogram')
+            for endpoint, (counts, total) in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append('baron_request_duration_seconds_bucket%s %d' % (
+                        _labels(endpoint=endpoint, le=bound), cumulative))
+                lines.append('baron_request_duration_seconds_sum%s %.6f' % (
+                    _labels(endpoint=endpoint), total))
+                lines.append('baron_request_duration_seconds_count%s %d' % (
+                    _labels(endpoint=endpoint), cumulative))
+
+            lines.append('# HELP baron_requests_total Requests by endpoint and status.')
+            lines.append('# TYPE baron_requests_total counter')
+            for (endpoint, method, status), count in sorted(self._requests.items()):
+                lines.append('baron_requests_total%s %d' % (
+                    _labels(endpoint=endpoint, method=method, status=status), count))
+
+            lines.append('# HELP baron_response_bytes_total Response bytes on the wire and decoded.')
+            lines.append('# TYPE baron_response_bytes_total counter')
+            for (endpoint, encoding), count in sorted(self._bytes.items()):
+                lines.append('baron_response_bytes_total%s %d' % (
+                    _labels(endpoint=endpoint, encoding=encoding), count))
+
+            lines.append('# HELP baron_retries_total Retried attempts by endpoint.')
+            lines.append('# TYPE baron_retries_total counter')
+            for endpoint, count in sorted(self._retries.items()):
+                lines.append('baron_retries_total%s %d' % (_labels(endpoint=endpoint), count))
+
+            lines.append('# HELP baron_cache_lookups_total Cache lookups by cache and result.')
+            lines.append('# TYPE baron_cache_lookups_total counter')
+            for (cache, result), count in sorted(self._cache.items()):
+                lines.append('baron_cache_lookups_total%s %d' % (
+                    _labels(cache=cache, result=result), count))
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """ Atomically writes exposition() to path, e.g. for the node_exporter textfile collector
+        """
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.exposition())
+        os.replace(tmp, path)
+
+
+registry = Metrics(enabled=os.getenv('BARON_METRICS', '') not in ('', '0'))
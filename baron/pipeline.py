@@ -0,0 +1,230 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .points import dedupe_points, grid_keys
+from .storage import CELL_SIZE, write_points
+
+
+# Set in each worker process by _init_worker.
+_region = None
+_buffered = False
+
+
+def _init_worker(region_path, buffer_miles, resolution, buffered):
+    global _region, _buffered
+    if region_path is not None:
+        from .region import load_region
+
+        # The index is cached on disk, so each worker loads it instead of
+        # rebuilding it.
+        _region = load_region(region_path, buffer_miles, resolution)
+    _buffered = buffered
+
+
+def shard_of(points, shards):
+    """
+    Returns the shard number of each point, a hash of its
+    baron.points.grid_keys key. Points that dedupe_points treats as
+    duplicates share a key and so always land in the same shard.
+    """
+    keys = grid_keys(points['longitude'], points['latitude']).astype(np.uint64)
+    # Fibonacci hashing spreads neighbouring keys over all shards.
+    return ((keys * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)) % np.uint64(shards)
+
+
+def _write(path, points, metadata, cell_size, crs=None):
+    if _region is not None and len(points['value']):
+        inside = _region.contains(points['longitude'], points['latitude'], buffered=_buffered)
+        points = {name: values[inside] for name, values in points.items()}
+    if not len(points['value']):
+        return path, 0
+    points['crs'] = crs
+    tmp = path + '.tmp'
+    write_points(tmp, points, metadata=metadata, cell_size=cell_size)
+    os.replace(tmp, path)
+    return path, len(points['value'])
+
+
+def _sweep_shard(path, spill, metadata, cell_size):
+    records = np.fromfile(spill, dtype=np.float64).reshape(-1, 3)
+    os.remove(spill)
+    points = {'longitude': records[:, 0], 'latitude': records[:, 1], 'value': records[:, 2]}
+    return _write(path, dedupe_points(points), metadata, cell_size)
+
+
+def _raster_shard(path, geotiff, window, band, metadata, cell_size):
+    import rasterio
+    from rasterio.windows import Window
+    from rasterio.windows import transform as window_transform
+
+    from .raster import pixel_centers, valid_mask
+
+    with rasterio.open(geotiff) as src:
+        window = Window(*window)
+        image = src.read(band, window=window)
+        transform = window_transform(window, src.transform)
+        mask = valid_mask(image, src.nodata)
+        crs = src.crs.to_string() if src.crs else None
+    rows, cols = np.nonzero(mask)
+    longitude, latitude = pixel_centers(rows, cols, transform)
+    points = {'longitude': longitude, 'latitude': latitude,
+              'value': image[rows, cols].astype(np.float64)}
+    return _write(path, points, metadata, cell_size, crs)
+
+
+class Pipeline(object):
+    """
+    Clips and exports sweep or raster results in parallel across processes.
+
+    The input is cut into shards, by point for sweeps and by window for
+    rasters; each worker process drops duplicates from its shard, clips it
+    against the region (a RegionIndex loaded once per worker) and writes it
+    as its own GeoParquet part under root. Sweep shards are spilled to disk
+    rather than collected in the parent, and nothing is merged in memory:
+    the parts together form one dataset that
+    baron.storage.read_geoparquet(root) reads back, skipping parts outside
+    the requested bbox.
+
+    Args:
+        root (str): Output directory of the parts.
+        region (str): Optional GeoJSON path of the clip region, e.g.
+            'texas.geojson'; see baron.region.load_region.
+        buffered (bool): Clip to the buffered region instead.
+        buffer_miles (float): Buffer distance of the buffered region.
+        resolution (float): Grid resolution of the region index.
+        workers (int): Worker processes, defaults to os.cpu_count().
+        metadata (dict): Stored with every part, e.g. product,
+            product_config and instance time.
+        cell_size (float): Row group cell size of the parts, see
+            baron.storage.write_geoparquet.
+        mp_context: Optional multiprocessing context, e.g.
+            multiprocessing.get_context('spawn') when the caller runs
+            threads that should not be forked.
+    """
+
+    def __init__(self, root, region=None, buffered=False, buffer_miles=50, resolution=0.05,
+                 workers=None, metadata=None, cell_size=CELL_SIZE, mp_context=None):
+        self.root = root
+        self.region = region
+        self.buffered = buffered
+        self.buffer_miles = buffer_miles
+        self.resolution = resolution
+        self.workers = workers or os.cpu_count()
+        self.metadata = metadata or {}
+        self.cell_size = cell_size
+        self.mp_context = mp_context
+        if region is not None:
+            # Build the cached index once here rather than in every worker.
+            from .region import load_region
+
+            load_region(region, buffer_miles, resolution)
+
+    def _executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self.mp_context,
+            initializer=_init_worker,
+            initargs=(self.region, self.buffer_miles, self.resolution, self.buffered))
+
+    def _reset(self):
+        """ Removes the parts of a previous run, which would otherwise mix into the dataset """
+        os.makedirs(self.root, exist_ok=True)
+        for name in os.listdir(self.root):
+            if (name.startswith('part-') and name.endswith(('.parquet', '.parquet.tmp')) or
+                    name.startswith('spill-') and name.endswith('.bin')):
+                os.remove(os.path.join(self.root, name))
+
+    def _part(self, number):
+        return os.path.join(self.root, 'part-%05d.parquet' % number)
+
+    def _spill(self, number):
+        return os.path.join(self.root, 'spill-%05d.bin' % number)
+
+    def _finish(self, futures):
+        parts = []
+        for future in futures:
+            path, rows = future.result()
+            if rows:
+                parts.append((path, rows))
+        with open(os.path.join(self.root, '_manifest.json'), 'w') as f:
+            json.dump({'metadata': self.metadata,
+                       'parts': [{'path': os.path.basename(path), 'rows': rows}
+                                 for path, rows in parts]}, f, indent=2)
+        return parts
+
+    def write_sweep(self, cells, shards=None):
+        """
+        Exports the settled cells of a sweep.
+
+        Points are routed to shards by a hash of their grid key, so every
+        duplicate of a point, from whichever cell, is dropped by the one
+        worker that owns its key, as a global drop_duplicates would. The
+        parent holds one cell at a time: it appends the cell's points to a
+        spill file per shard under root, and once all cells are in, each
+        worker reads one spill file, deduplicates, clips and writes it.
+
+        Args:
+            cells: Iterable of (cell_bbox, points) pairs, as yielded by
+                QuadtreeSweep.run(bbox).
+            shards (int): Number of parts, defaults to four per worker.
+
+        Returns:
+            list: (path, rows) of the non-empty parts written, in shard order.
+        """
+        shards = shards or self.workers * 4
+        self._reset()
+        spilled = set()
+        try:
+            for _, points in cells:
+                if not len(points['value']):
+                    continue
+                shard = shard_of(points, shards)
+                order = np.argsort(shard, kind='stable')
+                bounds = np.searchsorted(shard[order], np.arange(shards + 1, dtype=np.uint64))
+                # Rows of (longitude, latitude, value), grouped by shard.
+                records = np.column_stack([points['longitude'], points['latitude'],
+                                           points['value']]).astype(np.float64)[order]
+                for number in np.flatnonzero(np.diff(bounds)).tolist():
+                    with open(self._spill(number), 'ab') as f:
+                        records[bounds[number]:bounds[number + 1]].tofile(f)
+                    spilled.add(number)
+
+            with self._executor() as executor:
+                futures = [executor.submit(_sweep_shard, self._part(number), self._spill(number),
+                                           self.metadata, self.cell_size)
+                           for number in sorted(spilled)]
+                return self._finish(futures)
+        finally:
+            # Workers remove the spill files they read; these are the
+            # leftovers of a sweep that failed.
+            for number in spilled:
+                if os.path.exists(self._spill(number)):
+                    os.remove(self._spill(number))
+
+    def write_raster(self, geotiff, band=1, window_size=1024):
+        """
+        Exports the pixels of a GeoTIFF that hold data, as points at the
+        pixel centres, one shard per window_size square window. The region
+        is in EPSG:4326, so clipping needs a geodetic raster such as the
+        Standard-Geodetic configuration.
+
+        Returns:
+            list: (path, rows) of the parts written, in window order.
+        """
+        import rasterio
+
+        with rasterio.open(geotiff) as src:
+            width, height = src.width, src.height
+            if self.region is not None and src.crs is not None and not src.crs.is_geographic:
+                raise ValueError("Clipping needs a geographic raster, got %s" % src.crs)
+        self._reset()
+        windows = [(col, row, min(window_size, width - col), min(window_size, height - row))
+                   for row in range(0, height, window_size)
+                   for col in range(0, width, window_size)]
+        with self._executor() as executor:
+            futures = [executor.submit(_raster_shard, self._part(i), geotiff, window, band,
+                                       self.metadata, self.cell_size)
+                       for i, window in enumerate(windows)]
+            return self._finish(futures)
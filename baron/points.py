@@ -0,0 +1,88 @@
+import numpy as np
+
+
+# Coordinates are snapped to this many degrees when building dedup keys.
+GRID_RESOLUTION = 1e-6
+
+
+def parse_region_response(response, min_value=0):
+    """
+    Decodes a /point/region response into coordinate and value arrays.
+
+    The response is a list of rows, each a list of points like
+    {'coordinates': [lon, lat], 'value': v}. The points are flattened into
+    three float columns in one pass, rather than one dict per point, and
+    those without a value, or with a value not greater than min_value, are
+    then dropped with a single boolean mask.
+
+    Returns:
+        dict: 'longitude', 'latitude' and 'value' float64 arrays.
+    """
+    points = [point for row in response if row for point in row]
+    if not points:
+        return empty_points()
+    coordinates = np.array([point['coordinates'][:2] for point in points], dtype=np.float64)
+    # Missing values become NaN, which fails the comparison below.
+    value = np.array([point.get('value') for point in points], dtype=np.float64)
+    keep = value > min_value
+    return {
+        'longitude': coordinates[keep, 0],
+        'latitude': coordinates[keep, 1],
+        'value': value[keep],
+    }
+
+
+def empty_points():
+    return {
+        'longitude': np.empty(0, dtype=np.float64),
+        'latitude': np.empty(0, dtype=np.float64),
+        'value': np.empty(0, dtype=np.float64),
+    }
+
+
+def concat_points(chunks):
+    """ Concatenates parsed point dicts column by column
+    """
+    chunks = [chunk for chunk in chunks if len(chunk['value'])]
+    if not chunks:
+        return empty_points()
+    return {name: np.concatenate([chunk[name] for chunk in chunks])
+            for name in ('longitude', 'latitude', 'value')}
+
+
+def grid_keys(longitude, latitude, resolution=GRID_RESOLUTION):
+    """
+    Packs each (longitude, latitude) pair into one int64 key after snapping
+    it to a grid of the given resolution in degrees.
+    """
+    x = np.rint((np.asarray(longitude) + 180.0) / resolution).astype(np.int64)
+    y = np.rint((np.asarray(latitude) + 90.0) / resolution).astype(np.int64)
+    width = int(round(360.0 / resolution)) + 1
+    return y * width + x
+
+
+def dedupe_points(points, resolution=GRID_RESOLUTION):
+    """
+    Drops points that fall on the same grid cell as an earlier point,
+    keeping the first occurrence and the original order, like
+    DataFrame.drop_duplicates(subset=['latitude', 'longitude']).
+    """
+    keys = grid_keys(points['longitude'], points['latitude'], resolution)
+    _, first = np.unique(keys, return_index=True)
+    first.sort()
+    return {name: points[name][first] for name in ('longitude', 'latitude', 'value')}
+
+
+def points_to_geodataframe(points, crs="EPSG:4326"):
+    """
+    Returns a point GeoDataFrame with latitude, longitude and value columns,
+    in points['crs'] when set (as by baron.raster.raster_to_points), else crs.
+    """
+    import geopandas as gpd
+
+    return gpd.GeoDataFrame(
+        {'latitude': points['latitude'], 'longitude': points['longitude'],
+         'value': points['value']},
+        geometry=gpd.points_from_xy(points['longitude'], points['latitude']),
+        crs=points.get('crs') or crs,
+    )
@@ -0,0 +1,117 @@
+import numpy as np
+import rasterio
+from rasterio.features import geometry_mask, shapes
+
+
+def valid_mask(image, nodata):
+    """ Returns a boolean array that is True where image holds data
+    """
+    if nodata is None:
+        return np.ones(image.shape, dtype=bool)
+    if np.isnan(nodata):
+        return ~np.isnan(image)
+    return image != nodata
+
+
+def pixel_centers(rows, cols, transform):
+    """
+    Returns (x, y) arrays with the coordinates of the centers of the pixels
+    at rows/cols, applying the affine transform to whole index arrays.
+    """
+    cols = cols + 0.5
+    rows = rows + 0.5
+    x = transform.c + cols * transform.a + rows * transform.b
+    y = transform.f + cols * transform.d + rows * transform.e
+    return x, y
+
+
+def pixel_index(x, y, transform):
+    """
+    Returns (rows, cols) int64 arrays with the pixels containing the points
+    (x, y), applying the inverse affine transform to whole coordinate
+    arrays. Indices may fall outside the raster.
+    """
+    inverse = ~transform
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    cols = np.floor(inverse.c + x * inverse.a + y * inverse.b).astype(np.int64)
+    rows = np.floor(inverse.f + x * inverse.d + y * inverse.e).astype(np.int64)
+    return rows, cols
+
+
+class RasterClipper(object):
+    """
+    Clips rasters to a region by rasterizing the region geometry once per
+    grid into a boolean mask, so clipping is an array AND instead of a
+    per-feature within() test.
+
+    Args:
+        geometry: A shapely geometry (e.g. texas_gdf.geometry.union_all()) in
+            the same CRS as the rasters it will clip.
+        all_touched (bool): Include every pixel touched by the geometry, not
+            only those whose center falls inside it.
+    """
+
+    def __init__(self, geometry, all_touched=False):
+        self.geometry = geometry
+        self.all_touched = all_touched
+        self._masks = {}
+
+    def mask(self, shape, transform):
+        """ Returns the cached boolean mask that is True inside the region
+        """
+        key = (tuple(shape), tuple(transform))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = geometry_mask([self.geometry], out_shape=shape, transform=transform,
+                                 all_touched=self.all_touched, invert=True)
+            self._masks[key] = mask
+        return mask
+
+
+def _read_masked(path, band, clipper):
+    with rasterio.open(path) as src:
+        image = src.read(band)
+        transform = src.transform
+        crs = src.crs
+        mask = valid_mask(image, src.nodata)
+    if clipper is not None:
+        mask &= clipper.mask(image.shape, transform)
+    return image, mask, transform, crs
+
+
+def raster_to_points(path, band=1, clipper=None):
+    """
+    Extracts the pixels of a raster that hold data as NumPy arrays.
+
+    Args:
+        path (str): Path of the GeoTIFF.
+        band (int): Band to read.
+        clipper (RasterClipper): Optional region to clip to.
+
+    Returns:
+        dict: 'longitude', 'latitude' and 'value' arrays, the same layout as
+            baron.points.parse_region_response. Coordinates are pixel
+            centers in the raster CRS, which is returned as 'crs'.
+    """
+    image, mask, transform, crs = _read_masked(path, band, clipper)
+    rows, cols = np.nonzero(mask)
+    longitude, latitude = pixel_centers(rows, cols, transform)
+    return {'longitude': longitude, 'latitude': latitude,
+            'value': image[rows, cols], 'crs': crs}
+
+
+def raster_to_polygons(path, band=1, clipper=None):
+    """
+    Opt-in polygonization mode: returns a GeoDataFrame with one polygon per
+    connected run of equal-valued pixels, as rasterio.features.shapes
+    produces. Much slower than raster_to_points on large rasters.
+    """
+    import geopandas as gpd
+
+    image, mask, transform, crs = _read_masked(path, band, clipper)
+    features = (
+        {"properties": {"value": v}, "geometry": s}
+        for s, v in shapes(image, mask=mask, transform=transform)
+    )
+    return gpd.GeoDataFrame.from_features(list(features), crs=crs)
@@ -0,0 +1,331 @@
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import rasterio
+from rasterio.enums import Resampling
+from rasterio.transform import Affine
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window, from_bounds
+from rasterio.windows import transform as window_transform
+
+from .metrics import registry
+
+
+log = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+
+# Internal tile size of ingested rasters; overviews are built down to about
+# one tile.
+BLOCK_SIZE = 256
+
+
+def _contains(outer, inner):
+    """ Returns True if bbox outer, as [w_lon, n_lat, e_lon, s_lat], covers bbox inner
+    """
+    return (outer[0] <= inner[0] and outer[1] >= inner[1] and
+            outer[2] >= inner[2] and outer[3] <= inner[3])
+
+
+def overview_factors(width, height, block_size=BLOCK_SIZE):
+    """ Returns the power-of-two overview factors that keep a level at least block_size wide
+    """
+    factors = []
+    factor = 2
+    while max(width, height) // factor >= block_size:
+        factors.append(factor)
+        factor *= 2
+    return factors
+
+
+def ingest_geotiff(src_path, dest, block_size=BLOCK_SIZE, resampling=Resampling.nearest):
+    """
+    Rewrites a GeoTIFF as a deflate-compressed, internally tiled GeoTIFF
+    with internal overviews, so that windowed reads only touch the tiles
+    they overlap and downsampled reads come from a smaller overview level.
+    The result is written to dest + '.tmp' and renamed over dest.
+    """
+    tmp = dest + '.tmp'
+    with rasterio.open(src_path) as src:
+        profile = src.profile.copy()
+        profile.update(driver='GTiff', tiled=True, blockxsize=block_size,
+                       blockysize=block_size, compress='deflate', BIGTIFF='IF_SAFER')
+        if src.width < block_size or src.height < block_size:
+            profile.update(tiled=False)
+            profile.pop('blockxsize', None)
+            profile.pop('blockysize', None)
+        with rasterio.open(tmp, 'w', **profile) as dst:
+            for _, window in dst.block_windows(1):
+                dst.write(src.read(window=window), window=window)
+            factors = overview_factors(src.width, src.height, block_size)
+            if factors:
+                dst.build_overviews(factors, resampling)
+                dst.update_tags(ns='rio_overview', resampling=resampling.name)
+    os.replace(tmp, dest)
+    return dest
+
+
+class GeoTiffCache(object):
+    """
+    Size-bounded disk cache of product GeoTIFFs keyed by (product,
+    product_config, instance time).
+
+    read() answers a bbox from any cached raster of the same instance that
+    covers it with a windowed read, and only downloads when none does. By
+    giving a coverage bbox (e.g. all of Texas) the first request for an
+    instance fetches the whole area once and every later sub-bbox is cut
+    from that file. Rasters are rewritten on ingest with internal tiling
+    and overviews (see ingest_geotiff), and the least recently read ones
+    are deleted once the cache exceeds max_bytes.
+
+    Args:
+        client (APIClient): Client used for downloads.
+        path (str): Cache directory.
+        max_bytes (int): Size bound of the cached rasters.
+        coverage (list): Optional bbox downloaded instead of the requested
+            one whenever it covers the request.
+        resampling (Resampling): Resampling used to build overviews.
+    """
+
+    def __init__(self, client, path, max_bytes=2 * 1024 ** 3, coverage=None,
+                 resampling=Resampling.nearest):
+        self.client = client
+        self.path = path
+        self.max_bytes = max_bytes
+        self.coverage = list(coverage) if coverage is not None else None
+        self.resampling = resampling
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._pins = {}
+        os.makedirs(path, exist_ok=True)
+        index_path = os.path.join(path, INDEX_FILE)
+        self._entries = {}
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self._entries = json.load(f)
+            # Files deleted behind the cache's back are forgotten.
+            self._entries = {name: entry for name, entry in self._entries.items()
+                             if os.path.exists(os.path.join(path, name))}
+
+    @property
+    def size(self):
+        return sum(entry['size'] for entry in self._entries.values())
+
+    def _write_index(self):
+        # Must be called with self._lock held.
+        tmp = os.path.join(self.path, INDEX_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, INDEX_FILE))
+
+    def _find(self, key, bbox):
+        # Must be called with self._lock held. Prefers the smallest covering raster.
+        found = [(entry['size'], name) for name, entry in self._entries.items()
+                 if tuple(entry['key']) == key and _contains(entry['bbox'], bbox)]
+        return min(found)[1] if found else None
+
+    def _count(self, result):
+        # Must be called with self._lock held.
+        if result == 'hit':
+            self.hits += 1
+        else:
+            self.misses += 1
+        if registry.enabled:
+            registry.observe_cache('geotiff', result)
+
+    def _evict(self):
+        # Must be called with self._lock held. Pinned rasters are being read
+        # and are skipped; they are reconsidered when their last pin is
+        # released.
+        size = self.size
+        for name, entry in sorted(self._entries.items(), key=lambda item: item[1]['accessed']):
+            if size <= self.max_bytes:
+                break
+            if self._pins.get(name):
+                continue
+            try:
+                os.remove(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+            size -= entry['size']
+            del self._entries[name]
+
+    def _pin(self, name):
+        # Must be called with self._lock held.
+        self._pins[name] = self._pins.get(name, 0) + 1
+
+    def _unpin(self, name):
+        with self._lock:
+            self._pins[name] -= 1
+            if not self._pins[name]:
+                del self._pins[name]
+                if self.size > self.max_bytes:
+                    self._evict()
+                    self._write_index()
+
+    @contextlib.contextmanager
+    def pinned(self, product, product_config, bbox, product_instance_time=None):
+        """
+        Like get(), but the yielded path (or None) cannot be evicted until
+        the block exits, so it can be opened and read safely while other
+        threads fill the cache.
+        """
+        name = self._get(product, product_config, bbox, product_instance_time)
+        if name is None:
+            yield None
+            return
+        try:
+            yield os.path.join(self.path, name)
+        finally:
+            self._unpin(name)
+
+    def get(self, product, product_config, bbox, product_instance_time=None):
+        """
+        Returns the path of a cached raster of the instance that covers
+        bbox, downloading and ingesting one on a miss, or None if the
+        download fails. Concurrent misses for the same area share one
+        download. The file may be evicted by later calls; use pinned() to
+        read it while other threads use the cache.
+        """
+        name = self._get(product, product_config, bbox, product_instance_time)
+        if name is None:
+            return None
+        self._unpin(name)
+        return os.path.join(self.path, name)
+
+    def _get(self, product, product_config, bbox, product_instance_time):
+        """ Returns the file name of a covering raster, pinned, or None """
+        bbox = [float(v) for v in bbox[:4]]
+        if product_instance_time is None:
+            product_instance_time = self.client.get_instance_time(product, product_config)
+            if product_instance_time is None:
+                return None
+        key = (product, product_config, product_instance_time)
+        fetch_bbox = self.coverage if self.coverage and _contains(self.coverage, bbox) else bbox
+        name = hashlib.sha1(json.dumps([key, fetch_bbox]).encode('utf-8')).hexdigest()[:20] + '.tiff'
+
+        while True:
+            with self._lock:
+                found = self._find(key, bbox)
+                if found is not None:
+                    self._count('hit')
+                    self._entries[found]['accessed'] = time.time()
+                    self._pin(found)
+                    return found
+                event = self._loading.get(name)
+                leader = event is None
+                if leader:
+                    event = self._loading[name] = threading.Event()
+                    self._count('miss')
+            if leader:
+                break
+            event.wait()
+            if name not in self._entries:
+                return None
+
+        dest = os.path.join(self.path, name)
+        try:
+            download = self.client.download_geotiff(
+                product, product_config, fetch_bbox, dest + '.download',
+                product_instance_time=product_instance_time)
+            if download is None:
+                return None
+            ingest_geotiff(download, dest, resampling=self.resampling)
+            os.remove(download)
+            with self._lock:
+                self._entries[name] = {
+                    'key': list(key),
+                    'bbox': fetch_bbox,
+                    'size': os.path.getsize(dest),
+                    'accessed': time.time(),
+                }
+                self._pin(name)
+                self._evict()
+                self._write_index()
+            return name
+        finally:
+            with self._lock:
+                del self._loading[name]
+            event.set()
+
+    def read(self, product, product_config, bbox, product_instance_time=None, band=1,
+             out_shape=None, resampling=Resampling.nearest):
+        """
+        Reads band for bbox from the cache with a windowed read.
+
+        Args:
+            bbox (list): [west_longitude, north_latitude, east_longitude,
+                south_latitude] in EPSG:4326.
+            product_instance_time (str): Defaults to the latest instance.
+            out_shape (tuple): Optional (height, width) to read the window
+                at; smaller shapes are read from the overviews.
+            resampling (Resampling): Resampling of downsampled reads.
+
+        Returns:
+            tuple or None: (float32 array with nodata as NaN, affine
+                transform of the array, CRS), or None if the raster could
+                not be fetched.
+        """
+        with self.pinned(product, product_config, bbox, product_instance_time) as path:
+            if path is None:
+                return None
+            return self._read_window(path, bbox, band, out_shape, resampling)
+
+    def _read_window(self, path, bbox, band, out_shape, resampling):
+        w_lon, n_lat, e_lon, s_lat = bbox[:4]
+        with rasterio.open(path) as src:
+            left, bottom, right, top = transform_bounds("EPSG:4326", src.crs,
+                                                        w_lon, s_lat, e_lon, n_lat)
+            window = from_bounds(left, bottom, right, top, src.transform)
+            col0 = max(int(np.floor(window.col_off)), 0)
+            row0 = max(int(np.floor(window.row_off)), 0)
+            col1 = min(int(np.ceil(window.col_off + window.width)), src.width)
+            row1 = min(int(np.ceil(window.row_off + window.height)), src.height)
+            window = Window(col0, row0, max(col1 - col0, 0), max(row1 - row0, 0))
+            image = src.read(band, window=window, out_shape=out_shape,
+                             out_dtype=np.float32, resampling=resampling)
+            transform = window_transform(window, src.transform)
+            if out_shape is not None and image.size:
+                transform = transform * Affine.scale(window.width / image.shape[1],
+                                                     window.height / image.shape[0])
+            if src.nodata is not None and not np.isnan(src.nodata):
+                image[image == src.nodata] = np.nan
+            return image, transform, src.crs
+
+    def flush(self):
+        """ Persists access times so eviction order survives a restart
+        """
+        with self._lock:
+            self._write_index()
+
+    def clear(self):
+        """ Deletes every cached raster that is not being read
+        """
+        with self._lock:
+            for name in list(self._entries):
+                if self._pins.get(name):
+                    continue
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+                del self._entries[name]
+            self._write_index()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'rasters': len(self._entries),
+            'bytes': self.size,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
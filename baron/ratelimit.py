@@ -0,0 +1,213 @@
+import datetime
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits are then only shared within a process.
+    fcntl = None
+
+
+DEFAULT_STATE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'baron', 'ratelimit')
+
+# Per-provider defaults. rate is in requests per second and burst the bucket
+# size. daily_quota and monthly_quota cap the billed requests per UTC day and
+# calendar month: once one is used up, acquire() raises QuotaExceeded so a
+# run stops instead of running up charges. window_quota caps the requests per
+# fixed window of window seconds; acquire() waits for the next window.
+# NASA FIRMS allows 5000 transactions per 10 minutes per MAP_KEY. Baron bills
+# every request; its defaults are a conservative budget for a trial key, not
+# published limits, and can be changed per plan with the
+# BARON_DAILY_QUOTA and BARON_MONTHLY_QUOTA environment variables (see
+# get_limiter).
+PROVIDERS = {
+    'baron': {'rate': 10.0, 'burst': 20, 'daily_quota': 10000, 'monthly_quota': 100000},
+    'firms': {'rate': 5000 / 600.0, 'burst': 100, 'window_quota': 5000, 'window': 600},
+}
+
+QUOTAS = ('daily_quota', 'monthly_quota', 'window_quota')
+
+
+def _utc_day(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%Y-%m-%d')
+
+
+def _utc_month(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).strftime('%Y-%m')
+
+
+class QuotaExceeded(Exception):
+    """ Raised when a request would go over a provider's daily or monthly quota
+    """
+
+
+class RateLimiter(object):
+    """
+    Token bucket shared by every thread, asyncio task and process that uses
+    the same provider name and state_dir.
+
+    The bucket state lives in a small JSON file guarded by an exclusive
+    file lock, so worker processes draw from one budget. acquire() waits
+    until a token is available instead of letting requests fail with 429,
+    which smooths bursts down to the configured rate. Every acquired token
+    is counted as a billed request for the current UTC day, month and
+    window, so usage can be read locally with billed() and usage() instead
+    of polling a status endpoint. A request that would go over the daily
+    or monthly quota raises QuotaExceeded; one that would go over the
+    window quota waits for the next window.
+
+    Args:
+        name (str): Provider name, e.g. 'baron' or 'firms'.
+        rate (float): Sustained requests per second.
+        burst (int): Bucket size, the largest burst allowed.
+        daily_quota (int): Billed requests allowed per UTC day, or None.
+        monthly_quota (int): Billed requests allowed per UTC calendar
+            month, or None.
+        window_quota (int): Requests allowed per window, or None.
+        window (float): Length of the window in seconds.
+        state_dir (str): Directory of the shared state files.
+    """
+
+    def __init__(self, name, rate, burst, daily_quota=None, monthly_quota=None,
+                 window_quota=None, window=None, state_dir=DEFAULT_STATE_DIR):
+        if window_quota is not None and not window:
+            raise ValueError("window_quota needs a window length in seconds")
+        self.name = name
+        self.rate = float(rate)
+        self.burst = burst
+        self.daily_quota = daily_quota
+        self.monthly_quota = monthly_quota
+        self.window_quota = window_quota
+        self.window = window
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, '%s.json' % name)
+        self._lock = threading.Lock()
+
+    def _update(self, func):
+        """ Runs func(state) under the thread and file locks, persisting the result
+        """
+        with self._lock:
+            with open(self.path, 'a+') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    text = f.read()
+                    state = json.loads(text) if text else {}
+                    result = func(state)
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(state, f)
+                    f.flush()
+                    return result
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _reset_periods(self, state, now):
+        # Must be called from within _update.
+        today = _utc_day(now)
+        if state.get('day') != today:
+            state['day'] = today
+            state['billed'] = 0
+        month = _utc_month(now)
+        if state.get('month') != month:
+            state['month'] = month
+            state['month_billed'] = 0
+        if self.window:
+            start = now // self.window * self.window
+            if state.get('window_start') != start:
+                state['window_start'] = start
+                state['window_billed'] = 0
+
+    def _take(self, n):
+        """ Takes n tokens if available; returns the seconds to wait otherwise (0.0 on success)
+        """
+        def take(state):
+            now = time.time()
+            self._reset_periods(state, now)
+            tokens = state.get('tokens', float(self.burst))
+            tokens = min(float(self.burst), tokens + (now - state.get('updated', now)) * self.rate)
+            state['updated'] = now
+            state['tokens'] = tokens
+
+            if self.daily_quota is not None and state['billed'] + n > self.daily_quota:
+                raise QuotaExceeded('%s: daily quota of %d requests used up' % (
+                    self.name, self.daily_quota))
+            if self.monthly_quota is not None and state['month_billed'] + n > self.monthly_quota:
+                raise QuotaExceeded('%s: monthly quota of %d requests used up' % (
+                    self.name, self.monthly_quota))
+            if self.window_quota is not None and state['window_billed'] + n > self.window_quota:
+                return max(state['window_start'] + self.window - now, 0.001)
+            if tokens >= n:
+                state['tokens'] = tokens - n
+                state['billed'] += n
+                state['month_billed'] += n
+                if self.window:
+                    state['window_billed'] += n
+                return 0.0
+            return (n - tokens) / self.rate
+
+        return self._update(take)
+
+    def acquire(self, n=1):
+        """ Blocks until n requests may be sent, then counts them as billed
+        """
+        while True:
+            wait = self._take(n)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, n=1):
+        """ asyncio variant of acquire(); waits without blocking the event loop
+        """
+        import asyncio
+
+        while True:
+            wait = await asyncio.get_running_loop().run_in_executor(None, self._take, n)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def billed(self):
+        """ Returns the number of requests billed so far today
+        """
+        return self.usage()['day']
+
+    def usage(self):
+        """ Returns the requests billed so far this UTC day, month and window
+        """
+        def read(state):
+            self._reset_periods(state, time.time())
+            return {'day': state['billed'], 'month': state['month_billed'],
+                    'window': state.get('window_billed', 0)}
+
+        return self._update(read)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name, state_dir=DEFAULT_STATE_DIR, **overrides):
+    """
+    Returns the process-wide RateLimiter for a provider in PROVIDERS,
+    creating it on first use; overrides replace the provider defaults.
+    Quotas can also be set with environment variables named after the
+    provider, e.g. BARON_DAILY_QUOTA=50000 or BARON_MONTHLY_QUOTA=none.
+    """
+    with _limiters_lock:
+        key = (name, state_dir)
+        limiter = _limiters.get(key)
+        if limiter is None:
+            options = dict(PROVIDERS.get(name, {}))
+            for quota in QUOTAS:
+                value = os.getenv('%s_%s' % (name.upper(), quota.upper()))
+                if value:
+                    options[quota] = None if value.lower() == 'none' else int(value)
+            options.update(overrides)
+            limiter = _limiters[key] = RateLimiter(name, state_dir=state_dir, **options)
+        return limiter
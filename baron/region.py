@@ -0,0 +1,171 @@
+import functools
+import hashlib
+import json
+import os
+
+import numpy as np
+import shapely
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'baron')
+
+# 1 mile in meters.
+MILE = 1609.34
+
+# Grid cell states.
+OUTSIDE, INSIDE, EDGE = 0, 1, 2
+
+
+class _Grid(object):
+    """
+    Coarse lookup grid over a geometry's bounds. Each cell is marked
+    OUTSIDE, INSIDE or EDGE, so only points falling in EDGE cells need an
+    exact point-in-polygon test.
+    """
+
+    def __init__(self, geometry, resolution, states=None):
+        xmin, ymin, xmax, ymax = geometry.bounds
+        self.geometry = geometry
+        self.resolution = resolution
+        self.origin = (xmin, ymin)
+        self.shape = (int(np.ceil((ymax - ymin) / resolution)) or 1,
+                      int(np.ceil((xmax - xmin) / resolution)) or 1)
+        self.states = self._classify() if states is None else states
+
+    def _classify(self):
+        rows, cols = np.indices(self.shape)
+        x0 = self.origin[0] + cols.ravel() * self.resolution
+        y0 = self.origin[1] + rows.ravel() * self.resolution
+        cells = shapely.box(x0, y0, x0 + self.resolution, y0 + self.resolution)
+        states = np.full(cells.shape, OUTSIDE, dtype=np.uint8)
+        states[shapely.intersects(self.geometry, cells)] = EDGE
+        states[shapely.contains_properly(self.geometry, cells)] = INSIDE
+        return states.reshape(self.shape)
+
+    def contains(self, lon, lat):
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        col = np.floor((lon - self.origin[0]) / self.resolution).astype(np.int64)
+        row = np.floor((lat - self.origin[1]) / self.resolution).astype(np.int64)
+        in_grid = (row >= 0) & (row < self.shape[0]) & (col >= 0) & (col < self.shape[1])
+
+        states = np.full(lon.shape, OUTSIDE, dtype=np.uint8)
+        states[in_grid] = self.states[row[in_grid], col[in_grid]]
+
+        result = states == INSIDE
+        edge = states == EDGE
+        result[edge] = shapely.contains_xy(self.geometry, lon[edge], lat[edge])
+        return result
+
+
+class RegionIndex(object):
+    """
+    Reusable spatial index of a region boundary such as texas.geojson.
+
+    Holds the union of the region's geometries and a buffered variant, both
+    prepared, an STRtree over their parts, and a coarse grid per geometry
+    that answers most point-in-region tests with an array lookup. Use
+    from_file() (or load_region()) to parse the GeoJSON once and reuse the
+    result, cached on disk, across runs.
+
+    Args:
+        geometry: Shapely geometry of the region, in EPSG:4326.
+        buffered: The region grown by the buffer distance, in EPSG:4326.
+        resolution (float): Grid cell size in degrees.
+    """
+
+    def __init__(self, geometry, buffered=None, resolution=0.05, grids=None):
+        self.geometry = geometry
+        self.buffered = buffered if buffered is not None else geometry
+        shapely.prepare(self.geometry)
+        shapely.prepare(self.buffered)
+        grids = grids or {}
+        self._grids = {
+            False: _Grid(self.geometry, resolution, grids.get(False)),
+            True: _Grid(self.buffered, resolution, grids.get(True)),
+        }
+        self._trees = {
+            False: shapely.STRtree(shapely.get_parts(self.geometry)),
+            True: shapely.STRtree(shapely.get_parts(self.buffered)),
+        }
+        self.resolution = resolution
+
+    @classmethod
+    def from_file(cls, path, buffer_miles=50, resolution=0.05, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Builds the index for the GeoJSON at path, or loads it from cache_dir
+        if the same file was indexed with the same parameters before. The
+        buffer is computed in EPSG:3083 (Texas Centric Albers Equal Area),
+        as the GeoTIFF notebook does. cache_dir=None disables the disk cache.
+        """
+        with open(path, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+        params = json.dumps([digest, buffer_miles, resolution])
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = os.path.join(
+                cache_dir, 'region-%s.npz' % hashlib.sha1(params.encode('utf-8')).hexdigest())
+            if os.path.exists(cache_path):
+                return cls._load(cache_path, resolution)
+
+        import geopandas as gpd
+
+        gdf = gpd.read_file(path)
+        geometry = gdf.geometry.union_all()
+        buffered = (gdf.to_crs(epsg=3083).buffer(buffer_miles * MILE)
+                    .to_crs(epsg=4326).union_all()) if buffer_miles else geometry
+        index = cls(geometry, buffered, resolution)
+        if cache_path is not None:
+            index._save(cache_path)
+        return index
+
+    def _save(self, cache_path):
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp = cache_path + '.tmp.npz'
+        np.savez(tmp,
+                 geometry=np.frombuffer(shapely.to_wkb(self.geometry), dtype=np.uint8),
+                 buffered=np.frombuffer(shapely.to_wkb(self.buffered), dtype=np.uint8),
+                 grid=self._grids[False].states,
+                 buffered_grid=self._grids[True].states)
+        os.replace(tmp, cache_path)
+
+    @classmethod
+    def _load(cls, cache_path, resolution):
+        with np.load(cache_path) as data:
+            return cls(shapely.from_wkb(data['geometry'].tobytes()),
+                       shapely.from_wkb(data['buffered'].tobytes()),
+                       resolution,
+                       grids={False: data['grid'], True: data['buffered_grid']})
+
+    def contains(self, lon, lat, buffered=False):
+        """
+        Returns a boolean array that is True for the (lon, lat) points that
+        fall inside the region (or its buffered variant).
+        """
+        return self._grids[buffered].contains(lon, lat)
+
+    def intersects(self, geometries, buffered=False):
+        """
+        Returns a boolean array that is True for the geometries (e.g. sweep
+        cells) intersecting the region, using the STRtree to skip parts
+        whose bounds do not overlap.
+        """
+        geometries = np.asarray(geometries, dtype=object)
+        hits = self._trees[buffered].query(geometries, predicate='intersects')
+        result = np.zeros(len(geometries), dtype=bool)
+        result[hits[0]] = True
+        return result
+
+    def clipper(self, buffered=False, all_touched=False):
+        """ Returns a baron.raster.RasterClipper for the region
+        """
+        from .raster import RasterClipper
+
+        return RasterClipper(self.buffered if buffered else self.geometry, all_touched)
+
+
+@functools.lru_cache(maxsize=None)
+def load_region(path, buffer_miles=50, resolution=0.05, cache_dir=DEFAULT_CACHE_DIR):
+    """ Returns the RegionIndex for path, built or loaded once per process
+    """
+    return RegionIndex.from_file(path, buffer_miles, resolution, cache_dir)
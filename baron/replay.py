@@ -0,0 +1,423 @@
+import datetime
+import gzip
+import hashlib
+import json
+import math
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .client import TIME_FORMAT
+from .metrics import endpoint_of
+from .signing import sign
+
+
+CONTENT_TYPES = {
+    '.json': 'application/json',
+    '.png': 'image/png',
+    '.tif': 'image/tiff',
+    '.tiff': 'image/tiff',
+}
+
+
+def field_value(lon, lat, phase=0.0):
+    """
+    Synthetic product value at (lon, lat): smooth cells of values up to 60
+    separated by zeros, shifted by phase so instances differ.
+    """
+    v = 60.0 * math.sin(lon * 1.7 + phase) * math.cos(lat * 2.3 - phase)
+    return round(v, 2) if v > 0 else 0
+
+
+def _phase(text):
+    return int(hashlib.sha1(text.encode('utf-8')).hexdigest()[:8], 16) % 628 / 100.0
+
+
+def encode_png(width, height, pixel):
+    """
+    Returns an RGBA PNG of width x height. pixel(x) gives the (r, g, b, a)
+    of column x; every row is the same, which keeps encoding fast.
+    """
+    row = b'\x00' + b''.join(bytes(pixel(x)) for x in range(width))
+
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(row * height, 6)) +
+            chunk(b'IEND', b''))
+
+
+class ReplayServer(object):
+    """
+    Local stand-in for the Velocity Weather API, so the client, sweeps,
+    tile fetcher and GeoTIFF flow can be exercised and load tested without
+    a billed key.
+
+    Serves synthetic (or recorded) responses for
+    /meta/tiles/product-instances, /point/region, /wms, /geotiff, /tms,
+    /reports/metar/* and /reports/ndfd/hourly under
+    http://host:port/v1/<key>/. Every request must carry a sig/ts pair
+    made with the same HMAC scheme as baron.signing.sign, or it is
+    rejected with 401/403.
+
+    Args:
+        key, secret (str): Credentials the server accepts.
+        host (str), port (int): Address to listen on; port 0 picks a free port.
+        latency (float): Seconds added to every response.
+        jitter (float): Extra random latency, uniform in [0, jitter].
+        error_rate (float): Fraction of requests answered with error_status.
+        error_status (int): Status of injected errors.
+        retry_after (int): Retry-After seconds sent with injected errors.
+        recordings (str): Directory of recorded responses mirroring the path
+            after the key (e.g. point/region/<product>/<config>/<time>.json);
+            a recorded file is served instead of the synthetic response.
+        instances (int): Number of product instances listed.
+        interval (int): Seconds between product instances.
+        now (datetime): Time of the latest instance; defaults to the
+            current time rounded down to interval.
+        region_size (int): Points per side of a /point/region response.
+        geotiff_size (int): Pixels per side of served GeoTIFFs.
+        max_skew (int): Largest accepted difference between ts and the
+            server clock, in seconds.
+        seed (int): Seed of the error injection.
+    """
+
+    def __init__(self, key='replay-key', secret='replay-secret', host='127.0.0.1', port=0,
+                 latency=0.0, jitter=0.0, error_rate=0.0, error_status=503, retry_after=None,
+                 recordings=None, instances=48, interval=300, now=None, region_size=40,
+                 geotiff_size=512, max_skew=300, seed=None):
+        self.key = key
+        self.secret = secret
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.recordings = recordings
+        self.instances = instances
+        self.interval = interval
+        if now is None:
+            stamp = int(time.time()) // interval * interval
+            now = datetime.datetime.fromtimestamp(stamp, datetime.timezone.utc)
+        self.now = now.replace(tzinfo=None)
+        self.region_size = region_size
+        self.geotiff_size = geotiff_size
+        self.max_skew = max_skew
+        self.counts = {}
+        self.rejected = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._file_data = {}
+
+        handler = type('ReplayHandler', (_Handler,), {'replay': self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def address(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    @property
+    def base(self):
+        """ Base URL to pass to APIClient, e.g. http://127.0.0.1:8765/v1 """
+        return self.address + '/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def client(self, **options):
+        """ Returns an APIClient signed with the server credentials """
+        from .client import APIClient
+
+        return APIClient(self.key, self.secret, base=self.base, **options)
+
+    def instance_times(self):
+        return [(self.now - datetime.timedelta(seconds=i * self.interval)).strftime(TIME_FORMAT)
+                for i in range(self.instances)]
+
+    # Request handling, called from the handler threads.
+
+    def _count(self, endpoint):
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+
+    def _inject_error(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def authorize(self, key, query):
+        """ Returns None if the request is signed correctly, else (status, reason) """
+        sig = query.get('sig')
+        ts = query.get('ts')
+        if key != self.key:
+            return 401, 'unknown key'
+        if not sig or not ts:
+            return 401, 'missing sig or ts'
+        try:
+            skew = abs(time.time() - int(ts))
+        except ValueError:
+            return 401, 'bad ts'
+        if skew > self.max_skew:
+            return 401, 'expired ts'
+        if sig != sign(key + ":" + ts, self.secret):
+            return 403, 'bad signature'
+        return None
+
+    def recorded(self, path):
+        if not self.recordings:
+            return None
+        root = os.path.abspath(self.recordings)
+        file_path = os.path.abspath(os.path.join(root, path))
+        if os.path.commonpath([root, file_path]) != root or not os.path.isfile(file_path):
+            return None
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def product_instances(self, parts, query):
+        limit = int(query.get('limit') or query.get('page_size') or 10)
+        older_than = query.get('older_than')
+        newer_than = query.get('newer_than')
+        times = [t for t in self.instance_times()
+                 if (older_than is None or t < older_than) and (newer_than is None or t > newer_than)]
+        return [{'time': t} for t in times[:limit]]
+
+    def point_region(self, parts, query):
+        w_lon, n_lat = float(query['w_lon']), float(query['n_lat'])
+        e_lon, s_lat = float(query['e_lon']), float(query['s_lat'])
+        phase = _phase(parts[-1])
+        size = self.region_size
+        dx = (e_lon - w_lon) / size
+        dy = (n_lat - s_lat) / size
+        rows = []
+        for r in range(size):
+            lat = round(n_lat - (r + 0.5) * dy, 6)
+            rows.append([{'coordinates': [round(w_lon + (c + 0.5) * dx, 6), lat],
+                          'value': field_value(w_lon + (c + 0.5) * dx, lat, phase)}
+                         for c in range(size)])
+        return rows
+
+    def wms(self, parts, query):
+        width = int(query.get('WIDTH', 256))
+        height = int(query.get('HEIGHT', 256))
+        return encode_png(width, height, lambda x: (x % 256, 96, 160, 255 if x % 7 else 0))
+
+    def tile(self, parts, query):
+        return encode_png(256, 256, lambda x: (x, 128, 255 - x, 200))
+
+    def geotiff_source(self, parts, query):
+        product, product_config, instance_time = parts[1:4]
+        bbox = query.get('BBOX', '-180,90,180,-90')
+        name = '/'.join([product, product_config, instance_time.rsplit('.json', 1)[0],
+                         hashlib.sha1(bbox.encode('utf-8')).hexdigest()[:12]])
+        with self._lock:
+            self._sources[name] = (bbox, _phase(instance_time))
+        return {'source': '%s/files/geotiff/%s.tiff' % (self.address, name)}
+
+    def geotiff_file(self, name):
+        """ Returns the GeoTIFF bytes behind a source URL from geotiff_source """
+        import numpy as np
+        from rasterio.io import MemoryFile
+        from rasterio.transform import from_bounds
+
+        bbox, phase = self._sources[name]
+        w_lon, n_lat, e_lon, s_lat = (float(v) for v in bbox.split(','))
+        size = self.geotiff_size
+        lon = w_lon + (np.arange(size) + 0.5) * (e_lon - w_lon) / size
+        lat = n_lat - (np.arange(size) + 0.5) * (n_lat - s_lat) / size
+        image = 60.0 * np.sin(lon[None, :] * 1.7 + phase) * np.cos(lat[:, None] * 2.3 - phase)
+        image = np.where(image > 0, image, 0).astype('float32')
+        with MemoryFile() as memfile:
+            with memfile.open(driver='GTiff', height=size, width=size, count=1,
+                              dtype='float32', crs='EPSG:4326', nodata=0,
+                              transform=from_bounds(w_lon, s_lat, e_lon, n_lat, size, size),
+                              tiled=True, blockxsize=256, blockysize=256) as dst:
+                dst.write(image, 1)
+            return memfile.read()
+
+    def metar(self, station_id, lon=None, lat=None):
+        digest = hashlib.sha1(station_id.encode('utf-8')).digest()
+        if lon is None:
+            lon = -125.0 + digest[0] / 255.0 * 58.0
+            lat = 25.0 + digest[1] / 255.0 * 24.0
+        temperature = round(5 + digest[2] / 255.0 * 30, 1)
+        dew_point = round(temperature - digest[3] / 255.0 * 15, 1)
+        issue_time = self.now.replace(minute=53, second=0).strftime(TIME_FORMAT)
+        return {
+            'station': {'id': station_id.upper(), 'name': 'Synthetic %s' % station_id.upper(),
+                        'coordinates': [round(lon, 4), round(lat, 4)]},
+            'issue_time': issue_time,
+            'temperature': {'value': temperature, 'units': 'C'},
+            'dew_point': {'value': dew_point, 'units': 'C'},
+            'relative_humidity': {'value': round(100 * math.exp(
+                17.625 * dew_point / (243.04 + dew_point) -
+                17.625 * temperature / (243.04 + temperature))), 'units': '%'},
+            'wind_speed': {'value': round(digest[4] / 255.0 * 15, 1), 'units': 'm/s'},
+            'wind_direction': {'value': digest[5] * 360 // 256, 'units': 'degrees'},
+            'pressure': {'value': round(1000 + digest[6] / 255.0 * 30, 1), 'units': 'hPa'},
+            'visibility': {'value': round(digest[7] / 255.0 * 16, 1), 'units': 'km'},
+            'raw_text': '%s %s AUTO' % (station_id.upper(), issue_time),
+        }
+
+    def metar_report(self, parts, query):
+        if parts[2] == 'nearest.json':
+            lat, lon = float(query['lat']), float(query['lon'])
+            station_id = 'K%03d' % (int((lat + 90) * 7 + (lon + 180) * 3) % 1000)
+            return {'metars': {'data': [self.metar(station_id, lon + 0.05, lat - 0.05)]}}
+        station_id = parts[3].rsplit('.json', 1)[0]
+        return {'metars': {'data': [self.metar(station_id)]}}
+
+    def ndfd_hourly(self, parts, query):
+        lat, lon = float(query['lat']), float(query['lon'])
+        utc = query.get('utc') or self.now.strftime(TIME_FORMAT)
+        valid = datetime.datetime.strptime(utc, TIME_FORMAT).replace(minute=0, second=0)
+        phase = _phase(valid.strftime(TIME_FORMAT))
+        temperature = round(20 + 10 * math.sin(lon + phase) * math.cos(lat), 1)
+        return {'ndfd_hourly': {'data': [{
+            'coordinates': [lon, lat],
+            'valid_begin': valid.strftime(TIME_FORMAT),
+            'valid_end': (valid + datetime.timedelta(hours=1)).strftime(TIME_FORMAT),
+            'temperature': {'value': temperature, 'units': 'C'},
+            'dew_point': {'value': round(temperature - 6, 1), 'units': 'C'},
+            'wind_speed': {'value': round(abs(5 * math.cos(lon * 3 + phase)), 1), 'units': 'm/s'},
+            'wind_direction': {'value': int(abs(lon * 100 + lat * 10)) % 360, 'units': 'degrees'},
+            'precipitation_probability': {'value': int(abs(field_value(lon, lat, phase))), 'units': '%'},
+            'sky_cover': {'value': int(abs(lat * 37)) % 100, 'units': '%'},
+        }]}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    replay = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', content_type='application/json', headers=None):
+        if (len(body) > 1024 and content_type == 'application/json' and
+                'gzip' in self.headers.get('Accept-Encoding', '')):
+            body = gzip.compress(body, 5)
+            headers = dict(headers or {}, **{'Content-Encoding': 'gzip'})
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, value, status=200):
+        self._send(status, json.dumps(value).encode('utf-8'))
+
+    def _send_error(self, status, reason):
+        self._send_json({'code': status, 'message': reason}, status)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        replay = self.replay
+        split = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(split.query, keep_blank_values=True).items()}
+        segments = [unquote(s) for s in split.path.split('/') if s]
+
+        if segments[:2] == ['files', 'geotiff']:
+            return self._send_file(split.path.split('/files/geotiff/', 1)[1].rsplit('.tiff', 1)[0])
+
+        if len(segments) < 3 or segments[0] != 'v1':
+            return self._send_error(404, 'not found')
+        problem = replay.authorize(segments[1], query)
+        if problem is not None:
+            with replay._lock:
+                replay.rejected += 1
+            return self._send_error(*problem)
+
+        parts = segments[2:]
+        endpoint = endpoint_of(split.path)
+        replay._count(endpoint)
+
+        delay = replay.latency + (replay._random.uniform(0, replay.jitter) if replay.jitter else 0)
+        if delay:
+            time.sleep(delay)
+        if replay._inject_error():
+            headers = {'Retry-After': str(replay.retry_after)} if replay.retry_after is not None else None
+            return self._send(replay.error_status, b'{"message": "injected error"}', headers=headers)
+
+        recorded = replay.recorded('/'.join(parts))
+        if recorded is not None:
+            extension = os.path.splitext(parts[-1])[1]
+            return self._send(200, recorded, CONTENT_TYPES.get(extension, 'application/octet-stream'))
+
+        try:
+            if endpoint == 'meta/tiles/product-instances':
+                return self._send_json(replay.product_instances(parts, query))
+            if endpoint == 'point/region':
+                return self._send_json(replay.point_region(parts, query))
+            if endpoint == 'wms':
+                return self._send(200, replay.wms(parts, query), 'image/png')
+            if endpoint == 'tms':
+                etag = '"%s"' % hashlib.sha1(split.path.encode('utf-8')).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    return self._send(304, headers={'ETag': etag})
+                return self._send(200, replay.tile(parts, query), 'image/png', {'ETag': etag})
+            if endpoint == 'geotiff':
+                return self._send_json(replay.geotiff_source(parts, query))
+            if endpoint in ('reports/metar/station', 'reports/metar/nearest'):
+                return self._send_json(replay.metar_report(parts, query))
+            if endpoint == 'reports/ndfd/hourly':
+                return self._send_json(replay.ndfd_hourly(parts, query))
+        except (KeyError, ValueError, IndexError) as e:
+            return self._send_error(400, 'bad request: %r' % (e,))
+        return self._send_error(404, 'no synthetic response for %s' % endpoint)
+
+    def _send_file(self, name):
+        replay = self.replay
+        if name not in replay._sources:
+            return self._send_error(404, 'not found')
+        with replay._lock:
+            data = replay._file_data.get(name)
+        if data is None:
+            data = replay.geotiff_file(name)
+            with replay._lock:
+                replay._file_data[name] = data
+
+        headers = {'Accept-Ranges': 'bytes',
+                   'ETag': '"%s"' % hashlib.sha1(data).hexdigest()}
+        requested = self.headers.get('Range', '')
+        # As RFC 9110: a Range with a stale If-Range gets the whole file.
+        if_range = self.headers.get('If-Range')
+        if requested.startswith('bytes=') and if_range in (None, headers['ETag']):
+            start, _, end = requested[len('bytes='):].partition('-')
+            start = int(start or 0)
+            end = min(int(end), len(data) - 1) if end else len(data) - 1
+            if start >= len(data):
+                return self._send(416, headers={'Content-Range': 'bytes */%d' % len(data)})
+            headers['Content-Range'] = 'bytes %d-%d/%d' % (start, end, len(data))
+            return self._send(206, data[start:end + 1], 'image/tiff', headers)
+        return self._send(200, data, 'image/tiff', headers)
@@ -0,0 +1,61 @@
+from .client import get_default_client
+
+
+def _signed(api, client=None):
+    """
+    Returns the signed URL for api, ready to be fetched with client.get().
+    client defaults to get_default_client(), so credentials are only read
+    from local.env when the first URL is built.
+    """
+    return (client or get_default_client()).make_url(api)
+
+
+def request_marine_zone_forecast_all(client=None):
+    return _signed("/reports/forecast/marine/us/all.json", client)
+
+
+def request_pointquery_nws_watches_warning_all(lat=29.70, lon=-80.41, client=None):
+    return _signed("/reports/alert/all-poly/point.json?lat=%s&lon=%s" % (lat, lon), client)
+
+
+def request_lightning_count(w_lon=-160, e_lon=0, n_lat=-2, s_lat=-70, client=None):
+    return _signed("/reports/lightning/count/region.json?w_lon=%s&e_lon=%s&n_lat=%s&s_lat=%s" % (
+        w_lon, e_lon, n_lat, s_lat), client)
+
+
+def request_storm_vector(sitecode, client=None):
+    return _signed("/reports/stormvector/station/%s.json" % (sitecode), client)
+
+
+def request_geocodeip(client=None):
+    return _signed("/reports/geocode/ipaddress.json", client)
+
+
+def request_geocodecity(cityname, client=None):
+    return _signed("/reports/geocode/city.json?name=%s" % (cityname), client)
+
+
+def request_metar_nearest(lat, lon, within_radius=500, max_age=75, client=None):
+    return _signed("/reports/metar/nearest.json?lat=%s&lon=%s&within_radius=%s&max_age=%s" % (
+        lat, lon, within_radius, max_age), client)
+
+
+def request_metar(station_id, client=None):
+    return _signed("/reports/metar/station/%s.json" % station_id, client)
+
+
+def request_ndfd_hourly(lat, lon, utc_datetime, client=None):
+    datetime_str = utc_datetime.replace(microsecond=0).isoformat() + 'Z'
+    return _signed("/reports/ndfd/hourly.json?lat=%s&lon=%s&utc=%s" % (
+        lat, lon, datetime_str), client)
+
+
+def request_tile(product, product_config, z, x, y, client=None):
+    """ Returns the signed TMS tile URL for the latest instance, or None if there is none
+    """
+    client = client or get_default_client()
+    meta_date = client.get_instance_time(product, product_config)
+    if meta_date is None:
+        return None
+    return client.make_url("/tms/1.0.0/%s+%s+%s/%d/%d/%d.png" % (
+        product, product_config, meta_date, z, x, y))
@@ -0,0 +1,85 @@
+import base64
+import functools
+import hmac
+import time
+from hashlib import sha1 as sha
+
+from .metrics import registry
+
+
+def sign(string_to_sign, secret):
+    hmac_sha1 = hmac.new(
+        # Convert secret to bytes using UTF-8
+        secret.encode('utf-8'),
+        # Convert input string to bytes using UTF-8
+        string_to_sign.encode('utf-8'),
+        sha                        # Use SHA1 hash algorithm
+    )
+
+    # Get the binary digest
+    hmac_digest = hmac_sha1.digest()
+
+    # Encode to base64
+    base64_encoded = base64.b64encode(hmac_digest).decode('utf-8')
+
+    # Replace characters to make URL safe
+    signature = base64_encoded.replace('/', '_').replace('+', '-')
+
+    return signature
+
+
+class Signer(object):
+    """
+    Signs urls for one key/secret pair.
+
+    The signature only depends on the key and the whole-second timestamp,
+    so it is computed at most once per second and reused by every url
+    signed within that second. The secret is encoded and keyed into an HMAC
+    object once; each new signature copies that prototype instead of
+    rebuilding it.
+    """
+
+    def __init__(self, key, secret, clock=time.time):
+        self.key = key
+        self.clock = clock
+        self._prototype = hmac.new(secret.encode('utf-8'), digestmod=sha)
+        self._current = (None, None)
+
+    def signature(self, ts):
+        """ Returns the signature for the timestamp string ts
+        """
+        mac = self._prototype.copy()
+        mac.update((self.key + ":" + ts).encode('utf-8'))
+        return base64.b64encode(mac.digest()).decode('utf-8').replace('/', '_').replace('+', '-')
+
+    def current(self):
+        """ Returns (sig, ts) for the current second
+        """
+        ts = str(int(self.clock()))
+        cached_ts, sig = self._current
+        if cached_ts != ts:
+            sig = self.signature(ts)
+            self._current = (ts, sig)
+        if registry.enabled:
+            registry.observe_cache('signature', 'hit' if cached_ts == ts else 'miss')
+        return sig, ts
+
+    def sign_url(self, url):
+        """ Returns signed url
+        """
+        sig, ts = self.current()
+        q = '?' if url.find("?") == -1 else '&'
+        return "%s%ssig=%s&ts=%s" % (url, q, sig, ts)
+
+
+@functools.lru_cache(maxsize=32)
+def get_signer(key, secret):
+    """ Returns the shared Signer for key and secret
+    """
+    return Signer(key, secret)
+
+
+def sign_request(url, key, secret):
+    """ Returns signed url
+    """
+    return get_signer(key, secret).sign_url(url)
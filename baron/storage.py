@@ -0,0 +1,214 @@
+import json
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import shapely
+
+
+# Row groups are partitioned by cells of this many degrees.
+CELL_SIZE = 1.0
+
+
+def cell_ids(x, y, cell_size=CELL_SIZE):
+    """ Returns the int64 id of the grid cell containing each (x, y)
+    """
+    columns = int(np.ceil(360.0 / cell_size))
+    col = np.floor((np.asarray(x) + 180.0) / cell_size).astype(np.int64)
+    row = np.floor((np.asarray(y) + 90.0) / cell_size).astype(np.int64)
+    return row * columns + col
+
+
+def _projjson(crs):
+    from pyproj import CRS
+
+    return CRS.from_user_input(crs).to_json_dict()
+
+
+def _lonlat(x, y, crs):
+    """ Returns x, y in EPSG:4326, so that cell_size is in degrees whatever the CRS """
+    from pyproj import CRS, Transformer
+
+    crs = CRS.from_user_input(crs)
+    if crs.is_geographic or not len(x):
+        return x, y
+    return Transformer.from_crs(crs, 4326, always_xy=True).transform(x, y)
+
+
+def _is_projected(crs):
+    from pyproj import CRS
+
+    return crs is not None and not CRS.from_user_input(crs).is_geographic
+
+
+def _query_bounds(bbox, crs):
+    """
+    Returns (xmin, ymin, xmax, ymax) of a [w_lon, n_lat, e_lon, s_lat] bbox
+    in crs, the CRS of the bbox covering column. Projected bounds are
+    densified along the edges so they enclose the whole lon/lat bbox.
+    """
+    from pyproj import CRS, Transformer
+
+    w_lon, n_lat, e_lon, s_lat = bbox[:4]
+    if not _is_projected(crs):
+        return w_lon, s_lat, e_lon, n_lat
+    return Transformer.from_crs(4326, CRS.from_user_input(crs), always_xy=True).transform_bounds(
+        w_lon, s_lat, e_lon, n_lat, densify_pts=21)
+
+
+def _intersects_lonlat(covering, bbox, crs):
+    """ Returns a mask of the covering bboxes, in crs, that intersect a lon/lat bbox """
+    xmin, ymin, xmax, ymax = (covering.field(name).to_numpy()
+                              for name in ('xmin', 'ymin', 'xmax', 'ymax'))
+    lon, lat = _lonlat(np.concatenate([xmin, xmin, xmax, xmax]),
+                       np.concatenate([ymin, ymax, ymin, ymax]), crs)
+    lon = np.asarray(lon).reshape(4, -1)
+    lat = np.asarray(lat).reshape(4, -1)
+    w_lon, n_lat, e_lon, s_lat = bbox[:4]
+    return ((lon.max(axis=0) >= w_lon) & (lon.min(axis=0) <= e_lon) &
+            (lat.max(axis=0) >= s_lat) & (lat.min(axis=0) <= n_lat))
+
+
+def write_geoparquet(path, columns, geometry, crs="EPSG:4326", metadata=None,
+                     cell_size=CELL_SIZE):
+    """
+    Writes features as GeoParquet, one row group per grid cell.
+
+    Rows are sorted by the cell of their bbox center and each cell becomes
+    its own row group, so the per-row-group statistics of the bbox covering
+    column let readers skip every cell outside the bbox they ask for.
+
+    Args:
+        path (str): Output .parquet path.
+        columns (dict): Attribute columns, name to array-like.
+        geometry: Array of shapely geometries.
+        crs: CRS of the geometries, anything pyproj accepts.
+        metadata (dict): Extra metadata, e.g. product, product_config and
+            instance time, stored under the 'baron' schema key.
+        cell_size (float): Size in degrees of the partitioning cells;
+            features in a projected CRS are assigned to cells by their
+            bbox center reprojected to EPSG:4326.
+    """
+    geometry = np.asarray(geometry, dtype=object)
+    bounds = shapely.bounds(geometry)
+    cell = cell_ids(*_lonlat((bounds[:, 0] + bounds[:, 2]) / 2.0,
+                             (bounds[:, 1] + bounds[:, 3]) / 2.0, crs), cell_size)
+    order = np.argsort(cell, kind='stable')
+    cell = cell[order]
+    bounds = bounds[order]
+
+    arrays = {name: pa.array(np.asarray(values)[order]) for name, values in columns.items()}
+    arrays['cell'] = pa.array(cell)
+    arrays['bbox'] = pa.StructArray.from_arrays(
+        [pa.array(bounds[:, i]) for i in range(4)], names=['xmin', 'ymin', 'xmax', 'ymax'])
+    arrays['geometry'] = pa.array(shapely.to_wkb(geometry[order]), type=pa.binary())
+    table = pa.table(arrays)
+
+    geometry_types = sorted(set(shapely.get_type_id(geometry).tolist()))
+    type_names = {0: 'Point', 1: 'LineString', 3: 'Polygon', 4: 'MultiPoint',
+                  5: 'MultiLineString', 6: 'MultiPolygon', 7: 'GeometryCollection'}
+    geo = {
+        'version': '1.1.0',
+        'primary_column': 'geometry',
+        'columns': {
+            'geometry': {
+                'encoding': 'WKB',
+                'geometry_types': [type_names[t] for t in geometry_types if t in type_names],
+                'crs': _projjson(crs),
+                'bbox': ([float(bounds[:, 0].min()), float(bounds[:, 1].min()),
+                          float(bounds[:, 2].max()), float(bounds[:, 3].max())]
+                         if len(bounds) else []),
+                'covering': {'bbox': {
+                    'xmin': ['bbox', 'xmin'], 'ymin': ['bbox', 'ymin'],
+                    'xmax': ['bbox', 'xmax'], 'ymax': ['bbox', 'ymax'],
+                }},
+            },
+        },
+    }
+    table = table.replace_schema_metadata({
+        b'geo': json.dumps(geo).encode('utf-8'),
+        b'baron': json.dumps(metadata or {}).encode('utf-8'),
+    })
+
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(cell)) + 1, [len(cell)]])
+    with pq.ParquetWriter(path, table.schema, compression='zstd') as writer:
+        for start, end in zip(starts[:-1], starts[1:]):
+            writer.write_table(table.slice(start, end - start))
+
+
+def write_points(path, points, metadata=None, cell_size=CELL_SIZE):
+    """ Writes a baron.points column dict (longitude, latitude, value) as GeoParquet
+    """
+    columns = {name: points[name] for name in ('longitude', 'latitude', 'value')}
+    write_geoparquet(path, columns,
+                     shapely.points(points['longitude'], points['latitude']),
+                     crs=points.get('crs') or "EPSG:4326", metadata=metadata,
+                     cell_size=cell_size)
+
+
+def write_geodataframe(path, gdf, metadata=None, cell_size=CELL_SIZE):
+    """ Writes a GeoDataFrame (cells, clipped raster polygons, ...) as GeoParquet
+    """
+    columns = {name: gdf[name].to_numpy() for name in gdf.columns
+               if name != gdf.geometry.name}
+    write_geoparquet(path, columns, np.asarray(gdf.geometry.array),
+                     crs=gdf.crs or "EPSG:4326", metadata=metadata, cell_size=cell_size)
+
+
+def read_metadata(path):
+    """ Returns the product/instance metadata stored with a GeoParquet file
+    """
+    schema = pq.read_schema(path)
+    return json.loads(schema.metadata.get(b'baron', b'{}'))
+
+
+def read_geoparquet(path, bbox=None, columns=None, as_geodataframe=True):
+    """
+    Reads features from a file written by write_geoparquet.
+
+    Args:
+        path (str): A .parquet file, or a directory of them.
+        bbox (list): Optional [west_longitude, north_latitude,
+            east_longitude, south_latitude] in EPSG:4326; only features
+            whose bbox intersects it are read, and row groups (cells)
+            outside it are skipped without being decoded. For files in a
+            projected CRS, row groups are skipped by the bbox transformed
+            into that CRS and the rows read are then matched in lon/lat.
+        columns (list): Attribute columns to read; all when None.
+        as_geodataframe (bool): Return a GeoDataFrame; otherwise a
+            pyarrow.Table without decoding geometries.
+    """
+    dataset = ds.dataset(path, format='parquet')
+    geo = json.loads(dataset.schema.metadata[b'geo'])
+    crs = geo['columns']['geometry'].get('crs')
+
+    expression = None
+    if bbox is not None:
+        # The covering column is in the file's CRS, not necessarily lon/lat.
+        xmin, ymin, xmax, ymax = _query_bounds(bbox, crs)
+        expression = ((pc.field('bbox', 'xmax') >= xmin) & (pc.field('bbox', 'xmin') <= xmax) &
+                      (pc.field('bbox', 'ymax') >= ymin) & (pc.field('bbox', 'ymin') <= ymax))
+
+    # A projected query envelope is larger than the lon/lat bbox, so the
+    # rows it lets through are matched again by their bbox in lon/lat.
+    refine = bbox is not None and _is_projected(crs)
+    if columns is not None:
+        columns = list(columns) + ['geometry'] + (['bbox'] if refine else [])
+    table = dataset.to_table(columns=columns, filter=expression)
+    if refine:
+        table = table.filter(pa.array(_intersects_lonlat(
+            table.column('bbox').combine_chunks(), bbox, crs)))
+        if columns is not None:
+            table = table.drop_columns(['bbox'])
+    if not as_geodataframe:
+        return table
+
+    import geopandas as gpd
+
+    geometry = gpd.GeoSeries.from_wkb(table.column('geometry').to_numpy(zero_copy_only=False))
+    attributes = table.drop_columns(
+        [name for name in ('geometry', 'bbox') if name in table.column_names]).to_pandas()
+    return gpd.GeoDataFrame(attributes, geometry=geometry.values,
+                            crs=json.dumps(crs) if crs else None)
@@ -0,0 +1,149 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import shapely
+from shapely.geometry import box
+
+from .points import parse_region_response
+
+
+log = logging.getLogger(__name__)
+
+
+class SweepIncomplete(Exception):
+    """
+    Raised at the end of QuadtreeSweep.run() when some cells could not be
+    fetched; cells lists their bboxes, which can be swept again.
+    """
+
+    def __init__(self, cells):
+        super().__init__('%d cell(s) could not be fetched' % len(cells))
+        self.cells = cells
+
+
+def split_bbox(bbox):
+    """
+    Returns the four quadrants of bbox, each as
+    [west_longitude, north_latitude, east_longitude, south_latitude].
+    """
+    w_lon, n_lat, e_lon, s_lat = bbox[:4]
+    mid_lon = round((w_lon + e_lon) / 2.0, 6)
+    mid_lat = round((n_lat + s_lat) / 2.0, 6)
+    return [
+        [w_lon, n_lat, mid_lon, mid_lat],
+        [mid_lon, n_lat, e_lon, mid_lat],
+        [w_lon, mid_lat, mid_lon, s_lat],
+        [mid_lon, mid_lat, e_lon, s_lat],
+    ]
+
+
+def bbox_polygon(bbox):
+    w_lon, n_lat, e_lon, s_lat = bbox[:4]
+    return box(w_lon, s_lat, e_lon, n_lat)
+
+
+class QuadtreeSweep(object):
+    """
+    Adaptive region sweep replacing the fixed 1 degree frange grid.
+
+    The sweep starts with one query for the whole bbox. A cell whose
+    response has no values is done; a cell whose response is dense (at
+    least dense_fraction of its points have a value) or truncated (at
+    least max_points points came back) is split into four quadrants, which
+    are queried in turn, down to max_depth. Quadrants that do not intersect
+    the boundary are never queried. On a quiet day most of the state is
+    settled by a handful of coarse queries.
+
+    Args:
+        query (callable): query(bbox) returning a /point/region response or
+            None, e.g. functools.partial(client.point_query_region, product,
+            product_config).
+        boundary: Optional shapely geometry (e.g. the Texas polygon) that
+            cells must intersect; it is prepared once for fast tests.
+        max_depth (int): Maximum number of times a cell is split.
+        max_points (int): Response size at which the server is assumed to
+            have truncated the result. None disables the check.
+        dense_fraction (float): Fraction of points with a value above which
+            a cell is split.
+        workers (int): Number of cells queried concurrently per level.
+        retries (int): Times a cell whose query returned None is queried
+            again, with the next level.
+
+    After run() finishes, requests, splits, empty, outside and failed count
+    what the sweep did; failed counts queries that returned None, and
+    incomplete lists the cells still missing after their retries.
+    """
+
+    def __init__(self, query, boundary=None, max_depth=4, max_points=None,
+                 dense_fraction=0.25, workers=4, retries=2):
+        self.query = query
+        self.boundary = boundary
+        if boundary is not None:
+            shapely.prepare(boundary)
+        self.max_depth = max_depth
+        self.max_points = max_points
+        self.dense_fraction = dense_fraction
+        self.workers = workers
+        self.retries = retries
+        self.requests = 0
+        self.splits = 0
+        self.empty = 0
+        self.outside = 0
+        self.failed = 0
+        self.incomplete = []
+
+    def intersects(self, bbox):
+        return self.boundary is None or self.boundary.intersects(bbox_polygon(bbox))
+
+    def should_split(self, content, points):
+        total = sum(len(row) for row in content if row)
+        if self.max_points is not None and total >= self.max_points:
+            return True
+        return total > 0 and len(points['value']) >= self.dense_fraction * total
+
+    def run(self, bbox):
+        """
+        Sweeps bbox, yielding (cell_bbox, points) for every settled cell
+        that has values; points is a baron.points column dict.
+
+        A failed query (None) is not an empty answer: the cell is retried
+        and, if it still fails, SweepIncomplete is raised once every other
+        cell has been yielded, so a partial sweep never looks complete.
+        """
+        # Each entry is (cell, depth, attempt).
+        level = [(bbox, 0, 0)] if self.intersects(bbox) else []
+        incomplete = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while level:
+                self.requests += len(level)
+                next_level = []
+                contents = executor.map(self.query, [cell for cell, _, _ in level])
+                for (cell, depth, attempt), content in zip(level, contents):
+                    if content is None:
+                        self.failed += 1
+                        if attempt < self.retries:
+                            log.warning("[VelocityWeather] Sweep query failed for %s, retrying",
+                                        cell)
+                            next_level.append((cell, depth, attempt + 1))
+                        else:
+                            log.warning("[VelocityWeather] Sweep query failed for %s after "
+                                        "%d attempts", cell, attempt + 1)
+                            incomplete.append(cell)
+                        continue
+                    points = parse_region_response(content)
+                    if not len(points['value']):
+                        self.empty += 1
+                        continue
+                    if depth < self.max_depth and self.should_split(content, points):
+                        self.splits += 1
+                        for quadrant in split_bbox(cell):
+                            if self.intersects(quadrant):
+                                next_level.append((quadrant, depth + 1, 0))
+                            else:
+                                self.outside += 1
+                        continue
+                    yield cell, points
+                level = next_level
+        self.incomplete.extend(incomplete)
+        if incomplete:
+            raise SweepIncomplete(incomplete)
@@ -0,0 +1,280 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .metrics import redact_url, registry
+
+
+log = logging.getLogger(__name__)
+
+
+class MemoryTileCache(object):
+    """ Size-bounded in-memory LRU of tile bytes
+    """
+
+    def __init__(self, max_bytes=64 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._tiles.get(key)
+            if data is not None:
+                self._tiles.move_to_end(key)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            old = self._tiles.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._tiles[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes and self._tiles:
+                _, evicted = self._tiles.popitem(last=False)
+                self.size -= len(evicted)
+
+    def discard_instances(self, product, product_config, keep_time):
+        """ Drops tiles of (product, product_config) from instances other than keep_time
+        """
+        with self._lock:
+            for key in [k for k in self._tiles
+                        if k[:2] == (product, product_config) and k[2] != keep_time]:
+                self.size -= len(self._tiles.pop(key))
+
+
+class DiskTileCache(object):
+    """
+    MBTiles-style SQLite tile store keyed by
+    (product, config, instance time, z, x, y), evicting the least recently
+    used tiles once the stored bytes exceed max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=1024 * 2 ** 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS tiles (
+                product TEXT, product_config TEXT, instance_time TEXT,
+                zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER,
+                tile_data BLOB, etag TEXT, size INTEGER, fetched REAL, accessed REAL,
+                PRIMARY KEY (product, product_config, instance_time,
+                             zoom_level, tile_column, tile_row))""")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS tiles_accessed ON tiles (accessed)")
+        self._db.commit()
+        self.size = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+
+    def get(self, key):
+        """ Returns (tile_data, etag, fetched) or None
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT tile_data, etag, fetched FROM tiles WHERE product=? AND product_config=?"
+                " AND instance_time=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                key).fetchone()
+            if row is not None:
+                self._db.execute(
+                    "UPDATE tiles SET accessed=? WHERE product=? AND product_config=?"
+                    " AND instance_time=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                    (time.time(),) + key)
+                self._db.commit()
+            return row
+
+    def put(self, key, data, etag=None):
+        now = time.time()
+        with self._lock:
+            old = self._db.execute(
+                "SELECT size FROM tiles WHERE product=? AND product_config=?"
+                " AND instance_time=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                key).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO tiles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                key + (data, etag, len(data), now, now))
+            self.size += len(data) - (old[0] if old else 0)
+            if self.size > self.max_bytes:
+                self._evict()
+            self._db.commit()
+
+    def touch(self, key):
+        """ Marks a revalidated tile as freshly fetched
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE tiles SET fetched=? WHERE product=? AND product_config=?"
+                " AND instance_time=? AND zoom_level=? AND tile_column=? AND tile_row=?",
+                (time.time(),) + key)
+            self._db.commit()
+
+    def _evict(self):
+        # Must be called with self._lock held. Frees down to 90% of the bound
+        # so that the next few puts do not each trigger an eviction.
+        target = self.max_bytes * 0.9
+        rows = self._db.execute(
+            "SELECT rowid, size FROM tiles ORDER BY accessed").fetchall()
+        doomed = []
+        for rowid, size in rows:
+            if self.size <= target:
+                break
+            doomed.append((rowid,))
+            self.size -= size
+        self._db.executemany("DELETE FROM tiles WHERE rowid=?", doomed)
+
+    def discard_instances(self, product, product_config, keep_time):
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM tiles WHERE product=? AND product_config=? AND instance_time!=?",
+                (product, product_config, keep_time))
+            self._db.commit()
+            self.size = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+
+    def close(self):
+        self._db.close()
+
+
+def tms_tiles_for_bbox(product_config, bbox, z):
+    """
+    Returns the (x, y) TMS tile indices at zoom z that cover bbox, given as
+    [west_longitude, north_latitude, east_longitude, south_latitude].
+
+    Mercator configs use the global-mercator profile (one tile at z=0),
+    Geodetic configs the global-geodetic profile (two tiles at z=0). TMS
+    rows count up from the south edge.
+    """
+    w_lon, n_lat, e_lon, s_lat = bbox[:4]
+
+    if product_config.endswith('-Geodetic'):
+        size = 180.0 / 2 ** z
+        columns, rows = 2 ** (z + 1), 2 ** z
+        x_min = int((w_lon + 180.0) // size)
+        x_max = int((e_lon + 180.0) // size)
+        y_min = int((s_lat + 90.0) // size)
+        y_max = int((n_lat + 90.0) // size)
+    else:
+        n = 2 ** z
+        columns = rows = n
+
+        def row(lat):
+            lat = max(min(lat, 85.05112877980659), -85.05112877980659)
+            y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+            # Flip the XYZ row (north origin) to a TMS row (south origin).
+            return n - 1 - int(y)
+
+        x_min = int((w_lon + 180.0) / 360.0 * n)
+        x_max = int((e_lon + 180.0) / 360.0 * n)
+        y_min, y_max = row(s_lat), row(n_lat)
+
+    x_min, x_max = max(x_min, 0), min(x_max, columns - 1)
+    y_min, y_max = max(y_min, 0), min(y_max, rows - 1)
+    return [(x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+
+
+class TileFetcher(object):
+    """
+    Fetches TMS tiles through a two-tier cache: an in-memory LRU in front of
+    an optional on-disk SQLite store.
+
+    Tiles are keyed by the product instance time, so a new instance is a
+    cache miss by construction; when one appears, tiles of older instances of
+    the same product are dropped from both tiers. Disk entries older than
+    revalidate_after seconds are revalidated with If-None-Match before use.
+
+    Args:
+        client (APIClient): Client used for instance lookups and requests.
+        memory (MemoryTileCache): In-memory tier, created if not given.
+        disk (DiskTileCache): Optional on-disk tier.
+        revalidate_after (float): Age in seconds after which disk entries
+            are revalidated against the server.
+    """
+
+    def __init__(self, client, memory=None, disk=None, revalidate_after=3600):
+        self.client = client
+        self.memory = memory or MemoryTileCache()
+        self.disk = disk
+        self.revalidate_after = revalidate_after
+        self._instances = {}
+
+    def _instance_time(self, product, product_config):
+        instance_time = self.client.get_instance_time(product, product_config)
+        if instance_time is None:
+            return None
+        if self._instances.get((product, product_config)) != instance_time:
+            self._instances[(product, product_config)] = instance_time
+            self.memory.discard_instances(product, product_config, instance_time)
+            if self.disk is not None:
+                self.disk.discard_instances(product, product_config, instance_time)
+        return instance_time
+
+    def get_tile(self, product, product_config, z, x, y):
+        """ Returns the PNG bytes of a tile from the latest instance, or None
+        """
+        instance_time = self._instance_time(product, product_config)
+        if instance_time is None:
+            return None
+        key = (product, product_config, instance_time, z, x, y)
+
+        data = self.memory.get(key)
+        if registry.enabled:
+            registry.observe_cache('tile_memory', 'miss' if data is None else 'hit')
+        if data is not None:
+            return data
+
+        headers = {}
+        cached = self.disk.get(key) if self.disk is not None else None
+        if cached is not None:
+            data, etag, fetched = cached
+            if time.time() - fetched < self.revalidate_after or not etag:
+                if registry.enabled:
+                    registry.observe_cache('tile_disk', 'hit')
+                self.memory.put(key, data)
+                return data
+            headers['If-None-Match'] = etag
+        if registry.enabled and self.disk is not None:
+            registry.observe_cache('tile_disk', 'miss' if cached is None else 'revalidated')
+
+        url = self.client.make_url("/tms/1.0.0/%s+%s+%s/%d/%d/%d.png" % (
+            product, product_config, instance_time, z, x, y))
+        try:
+            response = self.client.get(url, headers=headers)
+            if response.status_code == 304:
+                self.disk.touch(key)
+                self.memory.put(key, data)
+                return data
+            response.raise_for_status()
+        except requests.RequestException as e:
+            log.warning("[VelocityWeather] Tile request failed: %s", redact_url(str(e)))
+            return None
+
+        data = response.content
+        self.memory.put(key, data)
+        if self.disk is not None:
+            self.disk.put(key, data, response.headers.get('ETag'))
+        return data
+
+    def prefetch(self, product, product_config, bbox, zooms, workers=8):
+        """
+        Warms the cache with every tile covering bbox at each zoom level in
+        zooms, fetching in parallel. Returns the number of tiles fetched.
+        """
+        tiles = [(z, x, y) for z in zooms
+                 for x, y in tms_tiles_for_bbox(product_config, bbox, z)]
+        # Resolve the instance once up front rather than in every worker.
+        if self._instance_time(product, product_config) is None:
+            return 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda tile: self.get_tile(product, product_config, *tile), tiles)
+            return sum(1 for data in results if data is not None)
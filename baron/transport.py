@@ -0,0 +1,128 @@
+import time
+
+from .metrics import registry
+
+
+DEFAULT_TIMEOUT = (3.05, 30)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _retry(limiter, **options):
+    """
+    Returns a urllib3 Retry that takes a limiter token before every
+    re-sent attempt (status retries, connection retries and redirects), so
+    each attempt on the wire is rate limited and counted as billed, as in
+    baron.aio.
+    """
+    from urllib3.util.retry import Retry
+
+    if limiter is None:
+        return Retry(**options)
+
+    class LimitedRetry(Retry):
+
+        def new(self, **kw):
+            retry = super().new(**kw)
+            retry.limiter = self.limiter
+            return retry
+
+        def increment(self, *args, **kwargs):
+            # Raises MaxRetryError instead when no attempt is left.
+            retry = super().increment(*args, **kwargs)
+            self.limiter.acquire()
+            return retry
+
+    retry = LimitedRetry(**options)
+    retry.limiter = limiter
+    return retry
+
+
+class Transport(object):
+    """
+    Pooled, keep-alive HTTP transport shared by every request helper.
+
+    Wraps a single requests.Session so that consecutive calls to the same
+    host reuse an open TCP/TLS connection instead of paying the handshake
+    on every request.
+
+    Args:
+        pool_size (int): Maximum number of connections kept open per host.
+        timeout (float or tuple): Default (connect, read) timeout in seconds.
+        retries (int): Number of retries for connection errors and
+            retryable status codes (429 and 5xx).
+        backoff_factor (float): Exponential backoff factor between retries,
+            see urllib3.util.retry.Retry.
+        gzip (bool): Ask the server for gzip/deflate encoded responses.
+        limiter (RateLimiter): Optional shared rate limiter; every attempt,
+            retries included, waits for a token before it is sent.
+    """
+
+    def __init__(self, pool_size=10, timeout=DEFAULT_TIMEOUT, retries=3,
+                 backoff_factor=0.5, gzip=True, limiter=None):
+        # requests is imported here, on first use, so that importing baron
+        # stays cheap.
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.limiter = limiter
+        self.session = requests.Session()
+
+        retry = _retry(
+            limiter,
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'HEAD']),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        if gzip:
+            self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+        else:
+            self.session.headers['Accept-Encoding'] = 'identity'
+
+    def get(self, url, **kwargs):
+        """ Returns the requests.Response for a GET on url
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        if self.limiter is not None:
+            self.limiter.acquire()
+        if not registry.enabled:
+            return self.session.get(url, **kwargs)
+        return self._observed_get(url, **kwargs)
+
+    def _observed_get(self, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception as e:
+            registry.observe_request(url, type(e).__name__, time.perf_counter() - start)
+            raise
+        elapsed = time.perf_counter() - start
+
+        raw = response.raw
+        retries = getattr(raw, 'retries', None)
+        wire_bytes = body_bytes = None
+        if not kwargs.get('stream'):
+            # The body has been read: tell() is what came over the wire,
+            # before gzip decoding.
+            body_bytes = len(response.content)
+            wire_bytes = raw.tell() if hasattr(raw, 'tell') else None
+        registry.observe_request(url, response.status_code, elapsed, wire_bytes, body_bytes,
+                                 len(retries.history) if retries is not None else 0)
+        return response
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
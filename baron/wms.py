@@ -0,0 +1,241 @@
+import logging
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from .metrics import redact_url
+from .tiles import MemoryTileCache
+
+
+log = logging.getLogger(__name__)
+
+
+def epsg_code(product_config):
+    """
+    WMS uses EPSG codes, while our product configuration code uses
+    'Geodetic' or 'Mercator'.
+    """
+    return 'EPSG:4326' if product_config.endswith('-Geodetic') else 'EPSG:3857'
+
+
+def to_xy(product_config, image_bounds):
+    """
+    Returns (xmin, ymin, xmax, ymax) from WMS 1.3.0 bounds, which are
+    [lat_min, lon_min, lat_max, lon_max] for Geodetic (EPSG:4326) and
+    [xmin, ymin, xmax, ymax] for Mercator (EPSG:3857).
+    """
+    if product_config.endswith('-Geodetic'):
+        lat_min, lon_min, lat_max, lon_max = image_bounds
+        return lon_min, lat_min, lon_max, lat_max
+    return tuple(image_bounds)
+
+
+def from_xy(product_config, xmin, ymin, xmax, ymax):
+    """ Inverse of to_xy
+    """
+    if product_config.endswith('-Geodetic'):
+        return [ymin, xmin, ymax, xmax]
+    return [xmin, ymin, xmax, ymax]
+
+
+def wms_url(client, product, product_config, product_instance_time,
+            image_size_in_pixels, image_bounds):
+    """ Returns the signed GetMap url, built as baron-sample.request_wms does
+    """
+    bbox = ','.join(str(x) for x in image_bounds)
+    return client.make_url(
+        '/wms/{}/{}?VERSION=1.3.0&SERVICE=WMS&REQUEST=GetMap&CRS={}&LAYERS={}&BBOX={}&WIDTH={}&HEIGHT={}&TIME={}'.format(
+            product, product_config, epsg_code(product_config), product_instance_time,
+            bbox, image_size_in_pixels[0], image_size_in_pixels[1], product_instance_time))
+
+
+def split_request(product_config, image_size_in_pixels, image_bounds, tile_size=1024):
+    """
+    Splits one GetMap request into sub-requests of at most tile_size pixels
+    a side.
+
+    Sub-images are aligned to whole pixels of the full image, so every
+    sub-request keeps the pixel size (and therefore the width/height to
+    bounds proportion) of the original request. Bounds keep the axis order
+    of the projection.
+
+    Returns:
+        list: (row, col, [width, height], sub_bounds) tuples, where row and
+            col are the pixel offset of the sub-image in the mosaic.
+    """
+    width, height = image_size_in_pixels
+    xmin, ymin, xmax, ymax = to_xy(product_config, image_bounds)
+    x_res = (xmax - xmin) / float(width)
+    y_res = (ymax - ymin) / float(height)
+
+    tiles = []
+    for row in range(0, height, tile_size):
+        tile_height = min(tile_size, height - row)
+        # Image rows count down from the top (north) edge.
+        top = ymax - row * y_res
+        bottom = ymax - (row + tile_height) * y_res
+        for col in range(0, width, tile_size):
+            tile_width = min(tile_size, width - col)
+            left = xmin + col * x_res
+            right = xmin + (col + tile_width) * x_res
+            tiles.append((row, col, [tile_width, tile_height],
+                          from_xy(product_config, left, bottom, right, top)))
+    return tiles
+
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# The IEND chunk that closes every PNG: zero length, type and CRC.
+PNG_END = b'\x00\x00\x00\x00IEND\xaeB`\x82'
+
+
+def decode_png(content):
+    """
+    Returns a (height, width, 4) RGBA uint8 array from PNG bytes. Grey,
+    grey+alpha, palette and RGB images are expanded to RGBA, so tiles
+    the server encodes differently still stitch into one mosaic. Raises
+    ValueError if content is not a complete PNG; GDAL would otherwise
+    decode a truncated one without complaint.
+    """
+    if not content.startswith(PNG_SIGNATURE) or not content.endswith(PNG_END):
+        raise ValueError("Not a complete PNG image (%d bytes)" % len(content))
+    from rasterio.enums import ColorInterp
+    from rasterio.errors import NotGeoreferencedWarning
+    from rasterio.io import MemoryFile
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', NotGeoreferencedWarning)
+        with MemoryFile(content) as memfile:
+            with memfile.open() as src:
+                image = src.read()
+                palette = None
+                if src.count == 1 and src.colorinterp[0] == ColorInterp.palette:
+                    palette = np.zeros((256, 4), dtype=np.uint8)
+                    for index, color in src.colormap(1).items():
+                        palette[index] = color
+
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    bands, height, width = image.shape
+    opaque = np.full((height, width), 255, dtype=np.uint8)
+    if palette is not None:
+        return palette[image[0]]
+    if bands == 1:
+        return np.dstack([image[0], image[0], image[0], opaque])
+    if bands == 2:
+        return np.dstack([image[0], image[0], image[0], image[1]])
+    if bands == 3:
+        return np.dstack([image[0], image[1], image[2], opaque])
+    if bands == 4:
+        return np.moveaxis(image, 0, -1)
+    raise ValueError("Unsupported WMS image with %d bands" % bands)
+
+
+class WMSMosaic(object):
+    """
+    Fetches large WMS images as a mosaic of concurrent sub-requests.
+
+    A single 2048x2048 GetMap for all of Texas is slow and capped at the
+    server's maximum image size. WMSMosaic splits the request into aligned
+    sub-images of at most tile_size pixels, fetches them in parallel and
+    stitches them into one array. Sub-images are cached per instance, so
+    re-rendering an overlapping mosaic only fetches what changed.
+
+    Args:
+        client (APIClient): Client used for instance lookups and requests.
+        tile_size (int): Largest sub-image side in pixels.
+        workers (int): Sub-images fetched concurrently.
+        cache (MemoryTileCache): Cache of sub-image bytes.
+    """
+
+    def __init__(self, client, tile_size=1024, workers=8, cache=None):
+        self.client = client
+        self.tile_size = tile_size
+        self.workers = workers
+        self.cache = cache or MemoryTileCache()
+
+    def _fetch(self, product, product_config, product_instance_time, size, bounds):
+        """
+        Returns the sub-image of size [width, height] as an RGBA array, or
+        None if the request fails or the response is not a PNG of that
+        size, e.g. an error page or a truncated image. Only sub-images that
+        decode are cached.
+        """
+        from rasterio.errors import RasterioError
+
+        key = (product, product_config, product_instance_time, tuple(size), tuple(bounds))
+        content = self.cache.get(key)
+        fetched = content is None
+        try:
+            if fetched:
+                url = wms_url(self.client, product, product_config, product_instance_time,
+                              size, bounds)
+                response = self.client.get(url)
+                response.raise_for_status()
+                content = response.content
+            image = decode_png(content)
+        except requests.RequestException as e:
+            log.warning("[VelocityWeather] WMS request failed: %s", redact_url(str(e)))
+            return None
+        except (RasterioError, ValueError) as e:
+            log.warning("[VelocityWeather] WMS sub-image %s could not be decoded: %s",
+                        list(bounds), e)
+            return None
+        if image.shape[:2] != (size[1], size[0]):
+            log.warning("[VelocityWeather] WMS sub-image %s is %dx%d, expected %dx%d",
+                        list(bounds), image.shape[1], image.shape[0], size[0], size[1])
+            return None
+        if fetched:
+            self.cache.put(key, content)
+        return image
+
+    def get_map(self, product, product_config, image_size_in_pixels, image_bounds):
+        """
+        Returns the mosaic for the latest product instance as a
+        (height, width, 4) RGBA uint8 array, or None if a sub-request
+        fails or returns an image that is not a PNG of the requested size.
+        image_size_in_pixels and image_bounds are as for request_wms.
+        """
+        product_instance_time = self.client.get_instance_time(product, product_config)
+        if product_instance_time is None:
+            return None
+
+        tiles = split_request(product_config, image_size_in_pixels, image_bounds,
+                              self.tile_size)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            images = list(executor.map(
+                lambda tile: self._fetch(product, product_config, product_instance_time,
+                                         tile[2], tile[3]),
+                tiles))
+        if any(image is None for image in images):
+            return None
+
+        width, height = image_size_in_pixels
+        mosaic = np.zeros((height, width, 4), dtype=np.uint8)
+        for (row, col, size, _), image in zip(tiles, images):
+            mosaic[row:row + size[1], col:col + size[0]] = image
+        return mosaic
+
+
+def save_mosaic(mosaic, filename, product_config=None, image_bounds=None):
+    """
+    Writes a mosaic as PNG, or as a GeoTIFF when filename ends in .tif/.tiff;
+    the GeoTIFF is georeferenced from product_config and image_bounds.
+    """
+    import rasterio
+    from rasterio.errors import NotGeoreferencedWarning
+    from rasterio.transform import from_bounds
+
+    height, width, bands = mosaic.shape
+    profile = {'width': width, 'height': height, 'count': bands, 'dtype': 'uint8'}
+    if filename.lower().endswith(('.tif', '.tiff')):
+        profile.update(driver='GTiff', tiled=True, compress='deflate',
+                       crs=epsg_code(product_config),
+                       transform=from_bounds(*to_xy(product_config, image_bounds), width, height))
+    else:
+        profile['driver'] = 'PNG'
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', NotGeoreferencedWarning)
+        with rasterio.open(filename, 'w', **profile) as dst:
+            dst.write(np.moveaxis(mosaic, -1, 0))
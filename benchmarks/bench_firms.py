@@ -0,0 +1,90 @@
+"""
+Compares the row-by-row GeoDataFrame construction of the FIRMS notebook
+and nasa_firms.main against nasa_firms.firms_to_geodataframe on a
+synthetic VIIRS area CSV.
+
+    python benchmarks/bench_firms.py --rows 100000
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from nasa_firms import firms_to_geodataframe, read_firms_csv  # noqa: E402
+
+
+def synthetic_csv(rows):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'latitude': rng.uniform(25.6, 49.4, rows).round(5),
+        'longitude': rng.uniform(-125.9, -63.2, rows).round(5),
+        'bright_ti4': rng.uniform(295.0, 367.0, rows).round(2),
+        'scan': rng.uniform(0.32, 0.8, rows).round(2),
+        'track': rng.uniform(0.36, 0.78, rows).round(2),
+        'acq_date': '2025-05-15',
+        'acq_time': rng.integers(0, 2400, rows),
+        'satellite': rng.choice(['N', '1'], rows),
+        'instrument': 'VIIRS',
+        'confidence': rng.choice(['l', 'n', 'h'], rows, p=[0.1, 0.8, 0.1]),
+        'version': '2.0NRT',
+        'bright_ti5': rng.uniform(270.0, 310.0, rows).round(2),
+        'frp': rng.uniform(0.3, 80.0, rows).round(2),
+        'daynight': rng.choice(['D', 'N'], rows),
+    })
+    return df.to_csv(index=False).encode('utf-8')
+
+
+def notebook(data):
+    """ The FIRMS notebook: one shapely.Point per row, filter afterwards """
+    import geopandas as gpd
+    from shapely.geometry import Point
+
+    df = pd.read_csv(io.BytesIO(data))
+    df['geometry'] = df.apply(lambda x: Point(x['longitude'], x['latitude']), axis=1)
+    gdf = gpd.GeoDataFrame(df, geometry='geometry')
+    gdf = gdf.drop(columns=['longitude', 'latitude'])
+    gdf = gdf[gdf['confidence'] == 'h']
+    return gdf.set_crs(epsg=4326)
+
+
+def wkt_apply(data):
+    """ The previous nasa_firms.main: one WKT string per row """
+    df = pd.read_csv(io.BytesIO(data))
+    gdf = pd.DataFrame(df, columns=['latitude', 'longitude'])
+    gdf['geometry'] = gdf.apply(
+        lambda row: f"POINT({row['longitude']} {row['latitude']})", axis=1)
+    return gdf
+
+
+def vectorized(data):
+    return firms_to_geodataframe(read_firms_csv(io.BytesIO(data)), confidence='h')
+
+
+def measure(name, func, data, rows):
+    start = time.perf_counter()
+    result = func(data)
+    elapsed = time.perf_counter() - start
+    print('{:<12} {:>8.3f} s  {:>12,.0f} rows/s  {:>8.1f} MiB  {:>7,} rows out'.format(
+        name, elapsed, rows / elapsed,
+        result.memory_usage(deep=True).sum() / 2 ** 20, len(result)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args()
+
+    data = synthetic_csv(args.rows)
+    measure('notebook', notebook, data, args.rows)
+    measure('wkt apply', wkt_apply, data, args.rows)
+    measure('vectorized', vectorized, data, args.rows)
+
+
+if __name__ == '__main__':
+    main()
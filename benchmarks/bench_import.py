@@ -0,0 +1,80 @@
+"""
+Measures import time with `python -X importtime` for the core client and
+the optional modules, against a 50 ms budget for the core client.
+
+Each statement runs in a fresh interpreter; the modules the interpreter
+imports at startup are left out of the totals.
+
+    python benchmarks/bench_import.py --repeat 5
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+BUDGET_MS = 50.0
+
+STATEMENTS = [
+    ('core client', 'from baron import APIClient, sign_request', True),
+    ('reports', 'from baron.reports import request_metar', True),
+    ('client + transport', 'from baron import APIClient; APIClient("key", "secret")', False),
+    ('nasa_firms', 'import nasa_firms', False),
+    ('baron.points', 'import baron.points', False),
+    ('baron.raster', 'import baron.raster', False),
+]
+
+
+def import_times(statement):
+    """ Returns {module: cumulative microseconds} for the top-level imports of statement """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith(' ') or name.startswith('  '):
+            continue
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def measure(statement, baseline, repeat):
+    """ Returns the best total in ms of repeat runs, with the three slowest imports of that run """
+    best = None
+    for _ in range(repeat):
+        times = {name: t for name, t in import_times(statement).items() if name not in baseline}
+        total = sum(times.values()) / 1000.0
+        if best is None or total < best[0]:
+            best = (total, sorted(((t, name) for name, t in times.items()), reverse=True)[:3])
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = set(import_times('pass'))
+    failed = False
+    for name, statement, budgeted in STATEMENTS:
+        try:
+            best, slowest = measure(statement, baseline, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print('{:<20} failed: {}'.format(name, e.stderr.strip().splitlines()[-1]))
+            continue
+        status = ''
+        if budgeted:
+            status = 'ok' if best <= BUDGET_MS else 'OVER {:.0f} ms budget'.format(BUDGET_MS)
+            failed = failed or best > BUDGET_MS
+        print('{:<20} {:>8.1f} ms  {:<22} slowest: {}'.format(
+            name, best, status,
+            ', '.join('{} {:.1f} ms'.format(module, t / 1000.0) for t, module in slowest)))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Times baron.join on synthetic FIRMS-like detections: sampling a
+multi-band raster at every point, and a nearest-neighbour join against
+the tx_wind_points point set.
+
+    python benchmarks/bench_join.py --points 100000 --bands 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import geopandas as gpd
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from baron.join import join_nearest, join_raster  # noqa: E402
+
+
+# Texas, [west_longitude, north_latitude, east_longitude, south_latitude].
+TEXAS_BBOX = [-106.645646, 36.500704, -93.508292, 25.837377]
+
+
+def synthetic_raster(path, bands, resolution=0.01):
+    w_lon, n_lat, e_lon, s_lat = TEXAS_BBOX
+    width = int(np.ceil((e_lon - w_lon) / resolution))
+    height = int(np.ceil((n_lat - s_lat) / resolution))
+    image = np.random.default_rng(0).uniform(0, 80, (bands, height, width)).astype('float32')
+    with rasterio.open(path, 'w', driver='GTiff', height=height, width=width, count=bands,
+                       dtype='float32', crs='EPSG:4326', nodata=-9999,
+                       transform=from_origin(w_lon, n_lat, resolution, resolution)) as dst:
+        dst.write(image)
+
+
+def synthetic_detections(count):
+    rng = np.random.default_rng(1)
+    w_lon, n_lat, e_lon, s_lat = TEXAS_BBOX
+    return gpd.GeoDataFrame(
+        {'frp': rng.uniform(0.3, 80.0, count)},
+        geometry=gpd.points_from_xy(rng.uniform(w_lon, e_lon, count),
+                                    rng.uniform(s_lat, n_lat, count)),
+        crs='EPSG:4326')
+
+
+def timed(name, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print('{:<14} {:>8.1f} ms  {:>12,.0f} points/s'.format(name, elapsed * 1000, count / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--bands', type=int, default=3)
+    parser.add_argument('--wind', default=os.path.join(
+        os.path.dirname(__file__), '..', 'tx_wind_points_15May25.geojson'))
+    args = parser.parse_args()
+
+    detections = synthetic_detections(args.points)
+    wind = gpd.read_file(args.wind)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'raster.tif')
+        synthetic_raster(path, args.bands)
+        timed('join_raster', lambda: join_raster(detections, path), args.points)
+    timed('join_nearest', lambda: join_nearest(detections, wind, max_distance=10000), args.points)
+
+
+if __name__ == '__main__':
+    main()
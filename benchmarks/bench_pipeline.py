@@ -0,0 +1,98 @@
+"""
+Compares the notebooks' serial post-processing (concatenate the per-cell
+GeoDataFrames, drop_duplicates, within(texas_union), write one file)
+against baron.pipeline.Pipeline at increasing worker counts, on a
+synthetic statewide sweep.
+
+    python benchmarks/bench_pipeline.py --cells 32 --points 5000 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from baron.pipeline import Pipeline  # noqa: E402
+from baron.points import points_to_geodataframe  # noqa: E402
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+TEXAS = os.path.join(ROOT, 'texas.geojson')
+
+# [west_longitude, north_latitude, east_longitude, south_latitude]
+TEXAS_BBOX = [-106.645646, 36.500704, -93.508292, 25.837377]
+
+
+def synthetic_sweep(cells, points):
+    """ Returns cells x cells (cell_bbox, points) pairs tiling Texas, with points on shared edges """
+    rng = np.random.default_rng(0)
+    w_lon, n_lat, e_lon, s_lat = TEXAS_BBOX
+    xs = np.linspace(w_lon, e_lon, cells + 1)
+    ys = np.linspace(n_lat, s_lat, cells + 1)
+    sweep = []
+    for i in range(cells):
+        for j in range(cells):
+            cell = [xs[i], ys[j], xs[i + 1], ys[j + 1]]
+            lon = np.round(rng.uniform(cell[0], cell[2], points), 4)
+            lat = np.round(rng.uniform(cell[3], cell[1], points), 4)
+            # Both neighbours return the points on their shared edge.
+            edge = points // 100
+            lon[:edge] = cell[0]
+            lon[-edge:] = cell[2]
+            lat[:edge] = lat[-edge:] = np.round(np.linspace(cell[1], cell[3], edge), 4)
+            sweep.append((cell, {'longitude': lon, 'latitude': lat,
+                                 'value': rng.uniform(1.0, 60.0, points)}))
+    return sweep
+
+
+def serial(sweep, dest):
+    """ The notebooks: one GeoDataFrame per cell, concatenated, deduplicated and clipped """
+    import geopandas as gpd
+    import pandas as pd
+
+    texas_union = gpd.read_file(TEXAS).geometry.union_all()
+    gdf = pd.concat([points_to_geodataframe(points) for _, points in sweep], ignore_index=True)
+    gdf = gdf.drop_duplicates(subset=['latitude', 'longitude'])
+    gdf = gdf[gdf.within(texas_union)]
+    gdf.to_parquet(os.path.join(dest, 'points.parquet'))
+    return len(gdf)
+
+
+def parallel(sweep, dest, workers):
+    parts = Pipeline(dest, region=TEXAS, workers=workers).write_sweep(sweep)
+    return sum(rows for _, rows in parts)
+
+
+def measure(name, func, *args):
+    start = time.perf_counter()
+    rows = func(*args)
+    elapsed = time.perf_counter() - start
+    print('{:<14} {:>8.2f} s  {:>12,.0f} points/s  {:>10,} rows out'.format(
+        name, elapsed, rows / elapsed, rows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--cells', type=int, default=32, help='cells per side')
+    parser.add_argument('--points', type=int, default=5000, help='points per cell')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    sweep = synthetic_sweep(args.cells, args.points)
+    print('{:,} points in {:,} cells, {} cores'.format(
+        args.cells ** 2 * args.points, args.cells ** 2, os.cpu_count()))
+    # Builds the cached region index outside the timed runs.
+    Pipeline(tempfile.mkdtemp(), region=TEXAS)
+    with tempfile.TemporaryDirectory() as dest:
+        measure('serial', serial, sweep, dest)
+    for workers in sorted(set(args.workers)):
+        with tempfile.TemporaryDirectory() as dest:
+            measure('%d workers' % workers, parallel, sweep, dest, workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+End-to-end benchmarks against the local baron.replay.ReplayServer, so no
+API key is billed. Needs pytest-benchmark; bench_* files are not collected
+by a plain pytest run, so name the file explicitly:
+
+    python -m pytest benchmarks/bench_replay.py --benchmark-only
+"""
+import datetime
+import functools
+
+import numpy as np
+
+from baron.batch import batch_ndfd_hourly
+from baron.cache import InstanceCache
+from baron.cube import RasterCube
+from baron.raster import raster_to_points
+from baron.rastercache import GeoTiffCache
+from baron.sweep import QuadtreeSweep
+from baron.tiles import MemoryTileCache, TileFetcher
+
+
+# [west_longitude, north_latitude, east_longitude, south_latitude]
+TEXAS_BBOX = [-106.645646, 36.500704, -93.508292, 25.837377]
+PANHANDLE_BBOX = [-103.05, 36.53, -99.99, 34.65]
+
+PRODUCT = 'C39-0x03A1-0'
+
+
+def sweep(client, bbox, workers=8):
+    query = functools.partial(client.point_query_region, PRODUCT, 'Standard-Geodetic')
+    run = QuadtreeSweep(query, max_depth=3, workers=workers)
+    points = sum(len(cell_points['value']) for _, cell_points in run.run(bbox))
+    return run.requests, points
+
+
+def test_sweep_throughput(benchmark, replay):
+    client = replay.client()
+    requests, points = benchmark(sweep, client, TEXAS_BBOX)
+    benchmark.extra_info.update(requests=requests, points=points)
+    assert points > 0
+
+
+def test_sweep_with_latency_and_errors(benchmark, slow_replay):
+    client = slow_replay.client(backoff_factor=0)
+    requests, points = benchmark.pedantic(sweep, args=(client, TEXAS_BBOX), rounds=3)
+    benchmark.extra_info.update(requests=requests, points=points)
+    assert points > 0
+
+
+def test_tile_prefetch(benchmark, replay):
+    client = replay.client()
+
+    def setup():
+        return (TileFetcher(client, memory=MemoryTileCache()),), {}
+
+    fetched = benchmark.pedantic(
+        lambda fetcher: fetcher.prefetch(PRODUCT, 'Standard-Mercator', TEXAS_BBOX, [5, 6, 7]),
+        setup=setup, rounds=5)
+    benchmark.extra_info['tiles'] = fetched
+    assert fetched > 0
+
+
+def test_tile_fetch_cached(benchmark, replay):
+    fetcher = TileFetcher(replay.client(), memory=MemoryTileCache())
+    fetcher.prefetch(PRODUCT, 'Standard-Mercator', TEXAS_BBOX, [6])
+    assert benchmark(fetcher.get_tile, PRODUCT, 'Standard-Mercator', 6, 14, 38) is not None
+
+
+def test_geotiff_ingest(benchmark, replay, tmp_path):
+    client = replay.client()
+    counter = iter(range(10 ** 6))
+
+    def ingest():
+        n = next(counter)
+        dest = str(tmp_path / ('%d.tiff' % n))
+        client.download_geotiff(PRODUCT, 'Standard-Geodetic', PANHANDLE_BBOX, dest)
+        points = raster_to_points(dest)
+        if n == 0:
+            ingest.cube = RasterCube.from_geotiff(str(tmp_path / 'cube'), dest)
+        ingest.cube.append(dest, '2025-05-15T%02d:%02d:00Z' % divmod(n, 60))
+        return len(points['value'])
+
+    pixels = benchmark.pedantic(ingest, rounds=10)
+    assert pixels > 0
+
+
+def test_geotiff_window_read(benchmark, replay, tmp_path):
+    cache = GeoTiffCache(replay.client(), str(tmp_path), coverage=TEXAS_BBOX)
+    cache.get(PRODUCT, 'Standard-Geodetic', PANHANDLE_BBOX)
+    image, _, _ = benchmark(cache.read, PRODUCT, 'Standard-Geodetic', PANHANDLE_BBOX)
+    assert cache.stats()['misses'] == 1 and image.size > 0
+
+
+def test_batch_ndfd_hourly(benchmark, slow_replay):
+    client = slow_replay.client(pool_size=16, backoff_factor=0)
+    rng = np.random.default_rng(0)
+    latitude, longitude = rng.uniform(26, 36, 500), rng.uniform(-106, -94, 500)
+    utc = datetime.datetime(2025, 5, 15, 12)
+
+    def setup():
+        return (), {'cache': InstanceCache(ttl=300, ttls={}, name='reports')}
+
+    table = benchmark.pedantic(
+        lambda cache: batch_ndfd_hourly(latitude, longitude, utc, client=client, cache=cache),
+        setup=setup, rounds=3)
+    assert table['temperature'].notna().all()
@@ -0,0 +1,84 @@
+"""
+Compares the GeoJSON export used by the notebooks with GeoParquet from
+baron.storage: write/read throughput, bbox read time and file size.
+
+    python benchmarks/bench_storage.py --input tx_wind_points_15May25.geojson --repeat 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import geopandas as gpd
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from baron.storage import read_geoparquet, write_geodataframe  # noqa: E402
+
+
+# South Texas, [west_longitude, north_latitude, east_longitude, south_latitude].
+QUERY_BBOX = [-99.0, 28.0, -97.0, 26.0]
+
+# Texas Centric Albers Equal Area, a projected CRS for the round trip.
+PROJECTED_CRS = "EPSG:3083"
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def report(name, rows, path, write_s, read_s, bbox_s):
+    print('{:<11} write {:>10,.0f} rows/s   read {:>10,.0f} rows/s   bbox read {:>7.1f} ms   {:>8.1f} KiB'.format(
+        name, rows / write_s, rows / read_s, bbox_s * 1000, os.path.getsize(path) / 1024.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--input', default=os.path.join(
+        os.path.dirname(__file__), '..', 'tx_wind_points_15May25.geojson'))
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='concatenate the input this many times')
+    args = parser.parse_args()
+
+    gdf = gpd.read_file(args.input)
+    gdf = gpd.GeoDataFrame(pd.concat([gdf] * args.repeat, ignore_index=True), crs=gdf.crs)
+    rows = len(gdf)
+    print(f'{rows:,} rows')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        geojson = os.path.join(tmp, 'points.geojson')
+        _, write_s = timed(lambda: gdf.to_file(geojson, driver="GeoJSON"))
+        _, read_s = timed(lambda: gpd.read_file(geojson))
+        _, bbox_s = timed(lambda: gpd.read_file(
+            geojson, bbox=(QUERY_BBOX[0], QUERY_BBOX[3], QUERY_BBOX[2], QUERY_BBOX[1])))
+        report('GeoJSON', rows, geojson, write_s, read_s, bbox_s)
+
+        parquet = os.path.join(tmp, 'points.parquet')
+        _, write_s = timed(lambda: write_geodataframe(
+            parquet, gdf, metadata={'product': 'C39-0x03A1-0'}))
+        _, read_s = timed(lambda: read_geoparquet(parquet))
+        _, bbox_s = timed(lambda: read_geoparquet(parquet, bbox=QUERY_BBOX))
+        report('GeoParquet', rows, parquet, write_s, read_s, bbox_s)
+        expected = len(read_geoparquet(parquet, bbox=QUERY_BBOX))
+
+        # Round trip in a projected CRS; the lon/lat query bbox is
+        # transformed into the file's CRS, so the same features come back.
+        projected = os.path.join(tmp, 'points-projected.parquet')
+        gdf_projected = gdf.to_crs(PROJECTED_CRS)
+        _, write_s = timed(lambda: write_geodataframe(
+            projected, gdf_projected, metadata={'product': 'C39-0x03A1-0'}))
+        _, read_s = timed(lambda: read_geoparquet(projected))
+        result, bbox_s = timed(lambda: read_geoparquet(projected, bbox=QUERY_BBOX))
+        report(PROJECTED_CRS, rows, projected, write_s, read_s, bbox_s)
+        if not expected or len(result) != expected:
+            raise SystemExit('projected bbox read returned %d rows, expected %d' % (
+                len(result), expected))
+        print(f'{PROJECTED_CRS} bbox read: {len(result):,} rows ({expected:,} in EPSG:4326)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Compares per-call requests.get against the pooled baron.Transport.
+
+Runs a local stub server so no API key or network access is needed:
+
+    python benchmarks/bench_transport.py --requests 2000
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from baron import Transport  # noqa: E402
+
+
+PAYLOAD = json.dumps([{'time': '2025-05-15T00:00:00Z'}]).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(name, get, url, count):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        get(url).content
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print('{:<14} {:>10.1f} req/s   p50 {:>7.3f} ms   p99 {:>7.3f} ms'.format(
+        name, count / elapsed, percentile(latencies, 50) * 1000,
+        percentile(latencies, 99) * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:%d/v1/key/meta/tiles/product-instances/p/c' % server.server_port
+
+    try:
+        run('requests.get', requests.get, url, args.requests)
+        with Transport() as transport:
+            run('Transport', transport.get, url, args.requests)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from baron.replay import ReplayServer  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def replay():
+    """ Local stand-in API server shared by the end-to-end benchmarks """
+    with ReplayServer(seed=0) as server:
+        yield server
+
+
+@pytest.fixture(scope='session')
+def slow_replay():
+    """ Stand-in server with 20 ms +-10 ms latency and 2% injected 503s """
+    with ReplayServer(latency=0.01, jitter=0.02, error_rate=0.02, seed=0) as server:
+        yield server
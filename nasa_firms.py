@@ -1,19 +1,87 @@
-import pandas as pd
-from dotenv import load_dotenv
+import datetime
+import hashlib
+import io
 import os
-from io import StringIO
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import leafmap.kepler as leafmap
+from baron.ratelimit import get_limiter
+from baron.transport import Transport
 
-load_dotenv("local.env")
+FIRMS_API = "https://firms.modaps.eosdis.nasa.gov/api/area/csv"
 
-MAP_KEY = os.getenv("NASA_FIRMS_MAP_KEY")
-if MAP_KEY is None:
-    raise ValueError("NASA FIRMS MAP_KEY not found in environment variables.")
+SENSORS = ['VIIRS_SNPP_NRT', 'VIIRS_NOAA20_NRT', 'MODIS_NRT']
+
+# Bounding boxes as west,south,east,north
+TEXAS_BBOX = '-106.645646,25.837377,-93.508292,36.500704'
+CONUS_BBOX = '-125.859375,25.618963,-63.193359,49.378416'
+
+FIRMS_CACHE_DIR = ".firms-cache"
+
+# Today's file keeps growing as new overpasses are processed, so it is only
+# reused for this many seconds; earlier days are final and cached for good.
+TODAY_MAX_AGE = 15 * 60
+
+# Explicit dtypes for the VIIRS and MODIS CSV columns. confidence is l/n/h
+# for VIIRS and 0-100 for MODIS, so it is read as text.
+FIRMS_DTYPES = {
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'bright_ti4': 'float32',
+    'bright_ti5': 'float32',
+    'brightness': 'float32',
+    'bright_t31': 'float32',
+    'scan': 'float32',
+    'track': 'float32',
+    'frp': 'float32',
+    'acq_date': 'str',
+    'acq_time': 'str',
+    'satellite': 'category',
+    'instrument': 'category',
+    'confidence': 'str',
+    'version': 'category',
+    'daynight': 'category',
+}
+
+CATEGORICAL_COLUMNS = ('satellite', 'instrument', 'confidence', 'version', 'daynight')
+
+# One detection per place, time and satellite.
+DETECTION_KEY = ['latitude', 'longitude', 'acq_date', 'acq_time', 'satellite']
+
+# Columns every FIRMS area CSV header has, even on days without detections.
+REQUIRED_COLUMNS = ('latitude', 'longitude', 'acq_date')
+
+_map_key = None
+_transport = None
+
+
+def get_map_key():
+    """ Returns the FIRMS MAP_KEY from local.env, read on first use
+    """
+    global _map_key
+    if _map_key is None:
+        from dotenv import load_dotenv
+
+        load_dotenv("local.env")
+        _map_key = os.getenv("NASA_FIRMS_MAP_KEY")
+        if _map_key is None:
+            raise ValueError("NASA FIRMS MAP_KEY not found in environment variables.")
+    return _map_key
+
+
+def get_transport():
+    """ Returns the pooled transport used for FIRMS requests, rate limited to the FIRMS quota
+    """
+    global _transport
+    if _transport is None:
+        _transport = Transport(limiter=get_limiter('firms'))
+    return _transport
 
 
 def get_transaction_count():
-    txn_url = f"https://firms.modaps.eosdis.nasa.gov/mapserver/mapkey_status/?MAP_KEY={MAP_KEY}"
+    import pandas as pd
+
+    txn_url = f"https://firms.modaps.eosdis.nasa.gov/mapserver/mapkey_status/?MAP_KEY={get_map_key()}"
     count = 0
     try:
         df = pd.read_json(txn_url,  typ='series')
@@ -23,32 +91,149 @@ def get_transaction_count():
     return count
 
 
-def get_wildfires():
-    tcount = get_transaction_count()
-    print('Our current transaction count is %i' % tcount)
+def read_firms_csv(source):
+    """ Parses a FIRMS area CSV into a compact frame with explicit dtypes
+    """
+    import pandas as pd
 
-    # Sensor type
-    # SENSOR = 'VIIRS_SNPP_NRT'
-    SENSOR = 'VIIRS_NOAA20_NRT'
-    # SENSOR = 'MODIS_NRT'
+    df = pd.read_csv(source, dtype=FIRMS_DTYPES)
+    if 'acq_time' in df:
+        df['acq_time'] = df['acq_time'].str.zfill(4)
+    if 'confidence' in df:
+        df['confidence'] = df['confidence'].astype('category')
+    return df
+
+
+def check_firms_csv(content):
+    """
+    Raises ValueError unless content starts with a FIRMS CSV header. FIRMS
+    answers errors such as an invalid MAP_KEY or an exceeded transaction
+    limit with status 200 and a plain text message.
+    """
+    header = content.split(b'\n', 1)[0].decode('utf-8', 'replace').strip()
+    columns = [column.strip() for column in header.split(',')]
+    if not all(column in columns for column in REQUIRED_COLUMNS):
+        raise ValueError("FIRMS response is not an area CSV: %r" % header[:200])
+
+
+def cache_path(sensor, bbox, date, cache_dir=FIRMS_CACHE_DIR):
+    bbox_key = hashlib.sha1(bbox.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, sensor, bbox_key, f"{date}.csv")
 
-    # Date of interest
-    # DATE = '2025-04-09'  # Replace with your desired date
-    DAYS = '1'
 
-    # Bounding box for Texas
-    BBOX = '-106.645646,25.837377,-93.508292,36.500704'
+def fetch_day(sensor, bbox, date, cache_dir=FIRMS_CACHE_DIR):
+    """
+    Returns the detections of one sensor over bbox on date (YYYY-MM-DD),
+    from the local cache when possible. Only cache misses cost a FIRMS
+    transaction. Raises ValueError, without caching anything, if FIRMS
+    answers with an error message instead of a CSV.
+    """
+    path = cache_path(sensor, bbox, date, cache_dir)
+    today = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d')
+    if os.path.exists(path) and (
+            date != today or time.time() - os.path.getmtime(path) < TODAY_MAX_AGE):
+        with open(path, 'rb') as f:
+            header = f.readline()
+        try:
+            check_firms_csv(header)
+            return read_firms_csv(path)
+        except ValueError:
+            # An error message cached before responses were checked; refetch.
+            os.remove(path)
 
-    # Construct the API URL
-    url = f'https://firms.modaps.eosdis.nasa.gov/api/area/csv/{MAP_KEY}/{SENSOR}/{BBOX}/{DAYS}'
+    url = f"{FIRMS_API}/{get_map_key()}/{sensor}/{bbox}/1/{date}"
+    response = get_transport().get(url)
+    response.raise_for_status()
+    check_firms_csv(response.content)
 
-    start_count = get_transaction_count()
-    df_area = pd.read_csv(url)
-    end_count = get_transaction_count()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(response.content)
+    os.replace(tmp, path)
+    return read_firms_csv(io.BytesIO(response.content))
+
+
+def fetch_firms(bbox=TEXAS_BBOX, days=1, sensors=SENSORS, end_date=None,
+                cache_dir=FIRMS_CACHE_DIR, workers=6):
+    """
+    Returns the FIRMS detections of sensors over bbox for the days ending on
+    end_date (today, UTC, by default), merged into one frame.
+
+    Each (sensor, bbox, day) CSV is cached under cache_dir and only missing
+    days are downloaded, concurrently across sensors and days. Detections
+    are deduplicated on DETECTION_KEY when merged.
+    """
+    import pandas as pd
+
+    if end_date is None:
+        end_date = datetime.datetime.now(datetime.timezone.utc).date()
+    dates = [(end_date - datetime.timedelta(days=i)).strftime('%Y-%m-%d')
+             for i in range(days)]
+    jobs = [(sensor, date) for sensor in sensors for date in dates]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(
+            lambda job: fetch_day(job[0], bbox, job[1], cache_dir), jobs))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=list(FIRMS_DTYPES))
+    df = pd.concat(frames, ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype('category')
+    return df.drop_duplicates(subset=DETECTION_KEY, ignore_index=True)
+
+
+def firms_to_geodataframe(df, confidence=None, drop_coordinates=True):
+    """
+    Converts FIRMS detections into a GeoDataFrame of points in EPSG:4326.
+
+    Rows are filtered before any geometry is built and the points are
+    created in one vectorized call from the coordinate arrays, instead of
+    one shapely.Point (or WKT string) per row.
+
+    Args:
+        df (DataFrame): Detections as returned by fetch_firms().
+        confidence (str or list): Confidence value(s) to keep, e.g. 'h' for
+            VIIRS; all rows are kept when None.
+        drop_coordinates (bool): Drop the latitude and longitude columns
+            once they are in the geometry.
+
+    Returns:
+        GeoDataFrame: The detections with categorical satellite,
+        confidence and daynight columns.
+    """
+    import geopandas as gpd
+
+    if confidence is not None:
+        if isinstance(confidence, str):
+            confidence = [confidence]
+        df = df[df['confidence'].isin(confidence)]
+
+    df = df.copy()
+    for column in CATEGORICAL_COLUMNS:
+        if column in df and df[column].dtype.name != 'category':
+            df[column] = df[column].astype('category')
+
+    geometry = gpd.points_from_xy(df['longitude'].to_numpy(), df['latitude'].to_numpy(),
+                                  crs="EPSG:4326")
+    if drop_coordinates:
+        df = df.drop(columns=['longitude', 'latitude'])
+    return gpd.GeoDataFrame(df, geometry=geometry)
+
+
+def get_wildfires():
+    # Date of interest
+    DAYS = 1
+
+    df_area = fetch_firms(TEXAS_BBOX, days=DAYS)
 
     print(df_area.head())
 
-    print('We used %i transactions.' % (end_count-start_count))
+    # Billed transactions are counted locally, no status endpoint calls needed.
+    print('We have used %i transactions today.' % get_limiter('firms').billed())
 
     return df_area
 
@@ -57,12 +242,11 @@ def main():
     # Get the wildfires data
     wildfires_data = get_wildfires()
 
-    # generate a Pandas GeoDataFrame with point data based on columns latitude and longitude
-    # from the wildfires data
-    gdf = pd.DataFrame(wildfires_data, columns=['latitude', 'longitude'])
-    gdf['geometry'] = gdf.apply(
-        lambda row: f"POINT({row['longitude']} {row['latitude']})", axis=1)
-    # gdf = gdf.set_index('geometry')
+    # generate a GeoDataFrame with point data based on columns latitude and longitude
+    # from the high confidence detections
+    gdf = firms_to_geodataframe(wildfires_data, confidence='h')
+
+    import leafmap.kepler as leafmap
 
     hc_long = -100
     hc_lat = 31
@@ -0,0 +1,15 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from baron.replay import ReplayServer  # noqa: E402
+
+
+@pytest.fixture
+def replay():
+    """ A fresh local stand-in API server, so request counts start at zero """
+    with ReplayServer(seed=0) as server:
+        yield server
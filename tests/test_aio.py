@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from baron.aio import AsyncAPIClient  # noqa: E402
+from baron.replay import ReplayServer  # noqa: E402
+
+INSTANCES = '/meta/tiles/product-instances/C39-0x03A1-0/Standard-Geodetic?page_size=1'
+
+
+def fetch(server, api, **options):
+    async def run():
+        async with AsyncAPIClient(server.key, server.secret, base=server.base, **options) as client:
+            return await client.fetch_json(api)
+
+    return asyncio.run(run())
+
+
+def test_retry_after_is_honoured():
+    with ReplayServer(error_rate=0.5, error_status=429, retry_after=1, seed=1) as server:
+        start = time.perf_counter()
+        instances = fetch(server, INSTANCES, backoff_factor=0)
+        elapsed = time.perf_counter() - start
+    assert instances
+    assert server.counts['meta/tiles/product-instances'] == 2
+    assert elapsed >= 0.9
+
+
+def test_exponential_backoff_without_retry_after():
+    with ReplayServer(error_rate=1.0, error_status=503, seed=0) as server:
+        start = time.perf_counter()
+        assert fetch(server, INSTANCES, retries=2, backoff_factor=0.1) is None
+        elapsed = time.perf_counter() - start
+    assert server.counts['meta/tiles/product-instances'] == 3
+    # 0.1 s then 0.2 s between the three attempts.
+    assert elapsed >= 0.3
+
+
+def test_malformed_body_returns_none(tmp_path):
+    (tmp_path / 'bad').mkdir()
+    (tmp_path / 'bad' / 'body.json').write_bytes(b'{"truncated": ')
+    (tmp_path / 'bad' / 'latin1.json').write_bytes(b'\xff\xfe{}')
+    with ReplayServer(recordings=str(tmp_path), seed=0) as server:
+        assert fetch(server, '/bad/body.json') is None
+        assert fetch(server, '/bad/latin1.json') is None
+        assert fetch(server, INSTANCES)
@@ -0,0 +1,57 @@
+import datetime
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyproj')
+pytest.importorskip('pandas')
+
+from baron.batch import NDFD_SPACING, batch_ndfd_hourly, snap_to_grid  # noqa: E402
+
+UTC = datetime.datetime(2025, 5, 15, 12)
+
+
+def test_snap_to_ndfd_grid():
+    # The corners of the NDFD CONUS grid.
+    keys, lon, lat = snap_to_grid([-121.554001, -60.885], [20.191999, 50.10619])
+    assert [(int(k) >> 32, int(k) & 0xFFFFFFFF) for k in keys] == [(0, 0), (1376, 2144)]
+    assert lon[0] == pytest.approx(-121.554, abs=1e-4)
+    assert lat[1] == pytest.approx(50.1062, abs=1e-3)
+
+
+def test_points_in_one_cell_share_a_key():
+    keys, lon, lat = snap_to_grid([-97.7431], [30.2672])
+    # Within a quarter of the spacing of the grid point, in degrees.
+    offset = 0.25 * NDFD_SPACING / 111000.0
+    near, _, _ = snap_to_grid([lon[0] + offset, lon[0] - offset], [lat[0], lat[0] + offset])
+    assert set(near.tolist()) == {keys[0]}
+    far, _, _ = snap_to_grid([lon[0] + 4 * offset], [lat[0]])
+    assert far[0] != keys[0]
+
+
+def test_one_request_per_cell_at_an_input_point(replay):
+    client = replay.client()
+    queried = []
+    get = client.get
+
+    def recording_get(url, **kwargs):
+        query = parse_qs(urlsplit(url).query)
+        queried.append((float(query['lat'][0]), float(query['lon'][0])))
+        return get(url, **kwargs)
+
+    client.get = recording_get
+    latitude = [30.2672, 30.2673, 31.0]
+    longitude = [-97.7431, -97.7432, -97.0]
+    table = batch_ndfd_hourly(latitude, longitude, UTC, client=client)
+    assert replay.counts['reports/ndfd/hourly'] == 2
+    assert sorted(queried) == [(30.2672, -97.7431), (31.0, -97.0)]
+    assert table['temperature'].notna().all()
+    assert table['cell'][0] == table['cell'][1]
+
+    # The report cache belongs to the client.
+    batch_ndfd_hourly(latitude, longitude, UTC, client=client)
+    assert replay.counts['reports/ndfd/hourly'] == 2
+    batch_ndfd_hourly(latitude, longitude, UTC, client=replay.client())
+    assert replay.counts['reports/ndfd/hourly'] == 4
+    assert np.array_equal(table['latitude'].to_numpy(), latitude)
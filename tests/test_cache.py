@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from baron.cache import InstanceCache
+
+
+def test_concurrent_misses_share_one_load():
+    cache = InstanceCache(ttl=60)
+    calls = []
+
+    def load(product, product_config):
+        calls.append((product, product_config))
+        time.sleep(0.2)
+        return {'time': '2025-05-15T12:00:00Z'}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get('p', 'c', load)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{'time': '2025-05-15T12:00:00Z'}] * 8
+    assert cache.get('p', 'c', load) == results[0]
+    stats = cache.stats()
+    assert (stats['misses'], stats['coalesced'], stats['hits']) == (1, 7, 1)
+    assert stats['hit_rate'] == pytest.approx(1 / 9.0)
+
+
+def test_failed_load_is_shared_and_not_cached():
+    cache = InstanceCache(ttl=60)
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing(product, product_config):
+        started.set()
+        release.wait()
+        raise RuntimeError('upstream down')
+
+    errors = []
+
+    def get():
+        try:
+            cache.get('p', 'c', failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=get)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=get)
+    follower.start()
+    while cache.stats()['coalesced'] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(errors) == 2
+    assert cache.get('p', 'c', lambda *key: {'time': 't'}) == {'time': 't'}
+
+
+def test_empty_answers_are_not_cached():
+    cache = InstanceCache(ttl=60)
+    assert cache.get('p', 'c', lambda *key: None) is None
+    assert cache.get('p', 'c', lambda *key: {'time': 't'}) == {'time': 't'}
+
+
+def test_entries_expire_after_ttl():
+    now = [0.0]
+    cache = InstanceCache(ttl=10, ttls={}, clock=lambda: now[0])
+    assert cache.get('p', 'c', lambda *key: {'time': 'a'}) == {'time': 'a'}
+    now[0] = 9.0
+    assert cache.get('p', 'c', lambda *key: {'time': 'b'}) == {'time': 'a'}
+    now[0] = 11.0
+    assert cache.get('p', 'c', lambda *key: {'time': 'b'}) == {'time': 'b'}
+
+
+def test_concurrent_tasks_share_one_load():
+    cache = InstanceCache(ttl=60)
+    calls = []
+
+    async def load(product, product_config):
+        calls.append(product)
+        await asyncio.sleep(0.05)
+        return {'time': 't'}
+
+    async def run():
+        return await asyncio.gather(*[cache.aget('p', 'c', load) for _ in range(5)])
+
+    assert asyncio.run(run()) == [{'time': 't'}] * 5
+    assert len(calls) == 1
+    assert cache.stats()['coalesced'] == 4
@@ -0,0 +1,72 @@
+import datetime
+import os
+
+import pytest
+
+pytest.importorskip('pandas')
+
+import nasa_firms  # noqa: E402
+
+CSV = (b'latitude,longitude,bright_ti4,scan,track,acq_date,acq_time,satellite,instrument,'
+       b'confidence,version,bright_ti5,frp,daynight\n'
+       b'30.1,-100.2,330.5,0.4,0.4,2025-05-14,805,N,VIIRS,n,2.0NRT,290.1,3.2,D\n')
+
+
+class Response(object):
+
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class Transport(object):
+
+    def __init__(self, *bodies):
+        self.bodies = list(bodies)
+        self.urls = []
+
+    def get(self, url):
+        self.urls.append(url)
+        return Response(self.bodies.pop(0))
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    monkeypatch.setattr(nasa_firms, '_map_key', 'test-key')
+    return lambda *bodies: monkeypatch.setattr(nasa_firms, '_transport', Transport(*bodies))
+
+
+def test_error_message_is_not_cached(transport, tmp_path):
+    transport(b'Invalid MAP_KEY.', CSV)
+    cache_dir = str(tmp_path)
+    with pytest.raises(ValueError):
+        nasa_firms.fetch_day('VIIRS_SNPP_NRT', nasa_firms.TEXAS_BBOX, '2025-05-14', cache_dir)
+    path = nasa_firms.cache_path('VIIRS_SNPP_NRT', nasa_firms.TEXAS_BBOX, '2025-05-14', cache_dir)
+    assert not os.path.exists(path)
+
+    df = nasa_firms.fetch_day('VIIRS_SNPP_NRT', nasa_firms.TEXAS_BBOX, '2025-05-14', cache_dir)
+    assert len(df) == 1 and os.path.exists(path)
+
+
+def test_past_days_come_from_the_cache(transport, tmp_path):
+    transport(CSV)
+    end = datetime.date(2025, 5, 14)
+    first = nasa_firms.fetch_firms(days=1, sensors=['VIIRS_SNPP_NRT'], end_date=end,
+                                   cache_dir=str(tmp_path))
+    transport()
+    second = nasa_firms.fetch_firms(days=1, sensors=['VIIRS_SNPP_NRT'], end_date=end,
+                                    cache_dir=str(tmp_path))
+    assert len(first) == len(second) == 1
+    assert nasa_firms._transport.urls == []
+
+
+def test_cached_error_message_is_refetched(transport, tmp_path):
+    path = nasa_firms.cache_path('MODIS_NRT', nasa_firms.TEXAS_BBOX, '2025-05-14', str(tmp_path))
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(b'Exceeding allowed transaction limit.')
+    transport(CSV)
+    df = nasa_firms.fetch_day('MODIS_NRT', nasa_firms.TEXAS_BBOX, '2025-05-14', str(tmp_path))
+    assert len(df) == 1
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from baron.geotiff import download_file, request_geotiff_source
+from baron.metrics import redact_url
+
+
+PRODUCT = 'C39-0x03A1-0'
+PRODUCT_CONFIG = 'Standard-Geodetic'
+BBOX = [-103.05, 36.53, -99.99, 34.65]
+
+
+@pytest.fixture
+def source(replay):
+    """ (client, url, bytes) of a GeoTIFF served by the replay server """
+    client = replay.client()
+    url = request_geotiff_source(client, PRODUCT, PRODUCT_CONFIG, BBOX)
+    data = client.get(url).content
+    return client, url, data
+
+
+def test_download(source, tmp_path):
+    client, url, data = source
+    dest = str(tmp_path / 'out.tiff')
+    checksum = 'sha256:' + hashlib.sha256(data).hexdigest()
+    assert download_file(client, url, dest, checksum=checksum) == dest
+    assert open(dest, 'rb').read() == data
+    assert not os.path.exists(dest + '.part') and not os.path.exists(dest + '.part.json')
+
+
+def write_part(dest, content, url=None, etag=None):
+    with open(dest + '.part', 'wb') as f:
+        f.write(content)
+    if url is not None:
+        with open(dest + '.part.json', 'w') as f:
+            json.dump({'url': redact_url(url), 'etag': etag, 'last_modified': None}, f)
+
+
+def test_resume_continues_matching_part(source, tmp_path):
+    client, url, data = source
+    dest = str(tmp_path / 'out.tiff')
+    etag = '"%s"' % hashlib.sha1(data).hexdigest()
+    write_part(dest, data[:1000], url, etag)
+    assert download_file(client, url, dest) == dest
+    assert open(dest, 'rb').read() == data
+
+
+def test_part_without_validator_is_discarded(source, tmp_path):
+    client, url, data = source
+    dest = str(tmp_path / 'out.tiff')
+    write_part(dest, b'garbage' * 100)
+    assert download_file(client, url, dest) == dest
+    assert open(dest, 'rb').read() == data
+
+
+def test_stale_if_range_restarts(source, tmp_path):
+    # The file changed since the part was written: the server ignores the
+    # Range and sends the whole new file, which must replace the part.
+    client, url, data = source
+    dest = str(tmp_path / 'out.tiff')
+    write_part(dest, b'x' * 1000, url, '"stale-etag"')
+    assert download_file(client, url, dest) == dest
+    assert open(dest, 'rb').read() == data
+
+
+def test_part_longer_than_file_restarts(source, tmp_path):
+    client, url, data = source
+    dest = str(tmp_path / 'out.tiff')
+    etag = '"%s"' % hashlib.sha1(data).hexdigest()
+    write_part(dest, data + b'trailing', url, etag)
+    assert download_file(client, url, dest) == dest
+    assert open(dest, 'rb').read() == data
+
+
+def test_corrupt_part_fails_checksum_then_recovers(source, tmp_path):
+    client, url, data = source
+    dest = str(tmp_path / 'out.tiff')
+    etag = '"%s"' % hashlib.sha1(data).hexdigest()
+    checksum = 'sha256:' + hashlib.sha256(data).hexdigest()
+    # Right validator, wrong bytes: only the checksum can tell.
+    write_part(dest, b'\0' * 1000, url, etag)
+    assert download_file(client, url, dest, checksum=checksum) is None
+    assert not os.path.exists(dest + '.part')
+    assert download_file(client, url, dest, checksum=checksum) == dest
+    assert open(dest, 'rb').read() == data
@@ -0,0 +1,55 @@
+import os
+
+from baron.incremental import Checkpoint, update
+
+
+PRODUCT = 'C39-0x03A1-0'
+PRODUCT_CONFIG = 'Standard-Geodetic'
+BBOX = [-103.05, 36.53, -99.99, 34.65]
+
+
+def run(client, checkpoint, root):
+    return update(client, PRODUCT, PRODUCT_CONFIG, 'panhandle', BBOX, checkpoint, root)
+
+
+def test_fresh_checkpoint_takes_latest(replay, tmp_path):
+    client = replay.client()
+    checkpoint = Checkpoint(str(tmp_path / 'checkpoint.json'))
+    written = run(client, checkpoint, str(tmp_path / 'store'))
+    assert len(written) == 1
+    assert checkpoint.get(PRODUCT, PRODUCT_CONFIG, 'panhandle') == replay.instance_times()[0]
+
+
+def test_restart_resumes_after_failure(replay, tmp_path):
+    times = replay.instance_times()
+    path = str(tmp_path / 'checkpoint.json')
+    root = str(tmp_path / 'store')
+    checkpoint = Checkpoint(path)
+    checkpoint.set(PRODUCT, PRODUCT_CONFIG, 'panhandle', times[5])
+
+    client = replay.client()
+    query = client.point_query_region
+
+    def fail_on_third(*args, **kwargs):
+        if kwargs.get('product_instance_time') == times[2]:
+            return None
+        return query(*args, **kwargs)
+
+    client.point_query_region = fail_on_third
+    first = run(client, checkpoint, root)
+    assert len(first) == 2
+    assert checkpoint.get(PRODUCT, PRODUCT_CONFIG, 'panhandle') == times[3]
+
+    # A new process reads the checkpoint back and picks up where it stopped.
+    restarted = Checkpoint(path)
+    assert restarted.get(PRODUCT, PRODUCT_CONFIG, 'panhandle') == times[3]
+    second = run(replay.client(), restarted, root)
+    assert len(second) == 3
+    assert restarted.get(PRODUCT, PRODUCT_CONFIG, 'panhandle') == times[0]
+    assert not set(first) & set(second)
+    assert all(os.path.exists(p) for p in first + second)
+
+    # Nothing new: no partitions and no region queries.
+    regions = replay.counts.get('point/region', 0)
+    assert run(replay.client(), restarted, root) == []
+    assert replay.counts.get('point/region', 0) == regions
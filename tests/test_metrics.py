@@ -0,0 +1,31 @@
+from baron.metrics import Metrics, endpoint_of, redact_url
+
+
+def test_redacts_signature_and_firms_key():
+    url = ('https://firms.modaps.eosdis.nasa.gov/api/area/csv/0123abcd/VIIRS_SNPP_NRT/'
+           '-106,25,-93,36/1/2025-05-15')
+    assert '0123abcd' not in redact_url(url)
+    assert 'abcd' not in redact_url('https://h/mapkey_status/?MAP_KEY=abcd')
+    signed = redact_url('http://h/v1/key/wms?x=1&sig=secret&ts=1747310400')
+    assert 'secret' not in signed and '1747310400' not in signed
+
+
+def test_endpoint_labels_hold_no_ids():
+    assert endpoint_of('http://h/v1/key/point/region/C39-0x0302-0/Standard/'
+                       '2025-05-15T12:00:00Z.json?w_lon=1') == 'point/region'
+    assert endpoint_of('http://h/v1/key/reports/metar/station/KAUS.json') == 'reports/metar/station'
+    assert endpoint_of('https://firms.modaps.eosdis.nasa.gov/api/area/csv/0123abcd/'
+                       'MODIS_NRT/x/1') == 'api/area/csv'
+    assert endpoint_of('http://h/files/geotiff/ab12.tiff') == 'files/geotiff'
+    assert endpoint_of('http://h/unknown/thing') == 'other'
+
+
+def test_exposition_and_hit_rates():
+    metrics = Metrics(enabled=True)
+    metrics.observe_request('http://h/v1/key/wms?sig=a&ts=1', 200, 0.02, 100, 200)
+    for result in ('hit', 'miss', 'coalesced', 'hit'):
+        metrics.observe_cache('instance', result)
+    text = metrics.exposition()
+    assert 'baron_requests_total{endpoint="wms",method="GET",status="200"} 1' in text
+    assert 'key' not in text
+    assert metrics.cache_hit_rates() == {'instance': 0.5}
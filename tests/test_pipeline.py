@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from baron.pipeline import Pipeline  # noqa: E402
+from baron.points import dedupe_points  # noqa: E402
+from baron.storage import read_geoparquet  # noqa: E402
+
+
+def sweep(cells=4, points=500):
+    """ Cells whose points overlap their neighbours', as a quadtree sweep's edges do """
+    rng = np.random.default_rng(0)
+    lon = np.round(rng.uniform(-100, -98, cells * points), 3)
+    lat = np.round(rng.uniform(30, 32, cells * points), 3)
+    value = rng.uniform(1, 50, cells * points)
+    result = []
+    for i in range(cells):
+        rows = slice(max(i * points - points // 10, 0), (i + 1) * points)
+        result.append(([0, 0, 0, 0], {'longitude': lon[rows], 'latitude': lat[rows],
+                                      'value': value[rows]}))
+    return result, dedupe_points({'longitude': lon, 'latitude': lat, 'value': value})
+
+
+def test_write_sweep_dedupes_exactly(tmp_path):
+    cells, expected = sweep()
+    root = str(tmp_path / 'out')
+    parts = Pipeline(root, workers=2).write_sweep(cells, shards=4)
+    assert sum(rows for _, rows in parts) == len(expected['value'])
+    table = read_geoparquet(root, as_geodataframe=False)
+    assert table.num_rows == len(expected['value'])
+    assert not list((tmp_path / "out").glob('spill-*'))
+
+
+def test_failed_sweep_leaves_no_spill_files(tmp_path):
+    cells, _ = sweep()
+
+    def broken():
+        yield cells[0]
+        raise RuntimeError('sweep failed')
+
+    root = tmp_path / 'out'
+    with pytest.raises(RuntimeError):
+        Pipeline(str(root), workers=1).write_sweep(broken())
+    assert not list(root.glob('spill-*'))
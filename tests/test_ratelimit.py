@@ -0,0 +1,58 @@
+import multiprocessing
+import time
+
+import pytest
+
+from baron.ratelimit import QuotaExceeded, RateLimiter
+
+
+def _acquire(state_dir, count):
+    limiter = RateLimiter('shared', rate=20, burst=5, state_dir=state_dir)
+    for _ in range(count):
+        limiter.acquire()
+
+
+def test_limit_is_shared_across_processes(tmp_path):
+    state_dir = str(tmp_path)
+    start = time.perf_counter()
+    processes = [multiprocessing.Process(target=_acquire, args=(state_dir, 10))
+                 for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    assert all(process.exitcode == 0 for process in processes)
+    limiter = RateLimiter('shared', rate=20, burst=5, state_dir=state_dir)
+    assert limiter.billed() == 30
+    # 30 tokens from one bucket of 5 refilled at 20/s take at least 1.25 s.
+    assert elapsed >= 1.2
+
+
+def test_daily_quota_stops_requests(tmp_path):
+    limiter = RateLimiter('daily', rate=1000, burst=1000, daily_quota=3, state_dir=str(tmp_path))
+    for _ in range(3):
+        limiter.acquire()
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire()
+    assert limiter.usage()['day'] == 3
+
+
+def test_monthly_quota_stops_requests(tmp_path):
+    limiter = RateLimiter('monthly', rate=1000, burst=1000, monthly_quota=2,
+                          state_dir=str(tmp_path))
+    limiter.acquire(2)
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire()
+
+
+def test_window_quota_waits_for_next_window(tmp_path):
+    limiter = RateLimiter('window', rate=1000, burst=1000, window_quota=2, window=0.5,
+                          state_dir=str(tmp_path))
+    start = time.perf_counter()
+    for _ in range(5):
+        limiter.acquire()
+    # Five requests at two per window need at least two window changes.
+    assert time.perf_counter() - start >= 0.5
+    assert limiter.billed() == 5
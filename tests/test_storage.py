@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip('geopandas')
+pytest.importorskip('pyarrow')
+
+from baron.storage import read_geoparquet, read_metadata, write_geodataframe  # noqa: E402
+
+# South Texas, [west_longitude, north_latitude, east_longitude, south_latitude].
+QUERY_BBOX = [-99.0, 28.0, -97.0, 26.0]
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    lon = rng.uniform(-106, -94, 2000)
+    lat = rng.uniform(26, 36, 2000)
+    return gpd.GeoDataFrame({'value': rng.uniform(0, 50, 2000)},
+                            geometry=gpd.points_from_xy(lon, lat), crs='EPSG:4326')
+
+
+def inside(gdf):
+    w_lon, n_lat, e_lon, s_lat = QUERY_BBOX
+    return int(((gdf.geometry.x >= w_lon) & (gdf.geometry.x <= e_lon) &
+                (gdf.geometry.y >= s_lat) & (gdf.geometry.y <= n_lat)).sum())
+
+
+def test_round_trip(points, tmp_path):
+    path = str(tmp_path / 'points.parquet')
+    write_geodataframe(path, points, metadata={'product': 'C39-0x03A1-0'})
+    assert read_metadata(path) == {'product': 'C39-0x03A1-0'}
+    assert len(read_geoparquet(path)) == len(points)
+    assert len(read_geoparquet(path, bbox=QUERY_BBOX)) == inside(points) > 0
+
+
+def test_projected_round_trip(points, tmp_path):
+    path = str(tmp_path / 'points.parquet')
+    write_geodataframe(path, points.to_crs('EPSG:3083'))
+    gdf = read_geoparquet(path, bbox=QUERY_BBOX)
+    assert gdf.crs.to_epsg() == 3083
+    assert len(gdf) == inside(points) > 0
+    assert inside(gdf.to_crs('EPSG:4326')) == len(gdf)
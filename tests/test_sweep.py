@@ -0,0 +1,63 @@
+import functools
+
+import pytest
+
+from baron.sweep import QuadtreeSweep, SweepIncomplete, split_bbox
+
+
+PRODUCT = 'C39-0x03A1-0'
+PRODUCT_CONFIG = 'Standard-Geodetic'
+
+# [west_longitude, north_latitude, east_longitude, south_latitude]
+TEXAS_BBOX = [-106.645646, 36.500704, -93.508292, 25.837377]
+
+
+def total(sweep, bbox):
+    return sum(len(points['value']) for _, points in sweep.run(bbox))
+
+
+@pytest.fixture
+def query(replay):
+    return functools.partial(replay.client().point_query_region, PRODUCT, PRODUCT_CONFIG)
+
+
+def failing(query, bad, times):
+    """ Returns query, answering None for bbox bad the first times calls """
+    left = [times]
+
+    def wrapped(bbox):
+        if bbox == bad and left[0]:
+            left[0] -= 1
+            return None
+        return query(bbox)
+
+    return wrapped
+
+
+def test_failed_cell_is_retried(query):
+    expected = total(QuadtreeSweep(query, max_depth=2), TEXAS_BBOX)
+    bad = split_bbox(TEXAS_BBOX)[1]
+    sweep = QuadtreeSweep(failing(query, bad, 1), max_depth=2)
+    assert total(sweep, TEXAS_BBOX) == expected
+    assert sweep.failed == 1
+    assert sweep.incomplete == []
+
+
+def test_persistent_failure_raises(query):
+    bad = split_bbox(TEXAS_BBOX)[1]
+    sweep = QuadtreeSweep(failing(query, bad, 100), max_depth=2, retries=2)
+    yielded = []
+    with pytest.raises(SweepIncomplete) as raised:
+        for cell, points in sweep.run(TEXAS_BBOX):
+            yielded.append(cell)
+    assert raised.value.cells == [bad]
+    assert sweep.incomplete == [bad]
+    assert sweep.failed == 3
+    # Every other cell was still swept.
+    assert yielded
+
+
+def test_empty_answers_are_counted():
+    sweep = QuadtreeSweep(lambda bbox: [], max_depth=2)
+    assert list(sweep.run(TEXAS_BBOX)) == []
+    assert (sweep.requests, sweep.empty, sweep.failed) == (1, 1, 0)
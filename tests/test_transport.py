@@ -0,0 +1,34 @@
+import time
+
+from baron.ratelimit import RateLimiter
+from baron.replay import ReplayServer
+
+INSTANCES = '/meta/tiles/product-instances/C39-0x03A1-0/Standard-Geodetic?page_size=1'
+
+
+def test_retry_after_is_honoured():
+    # With seed 1 and error_rate 0.5 the first attempt fails and the second succeeds.
+    with ReplayServer(error_rate=0.5, error_status=429, retry_after=1, seed=1) as server:
+        client = server.client(backoff_factor=0)
+        start = time.perf_counter()
+        instances = client.fetch_json(INSTANCES)
+        elapsed = time.perf_counter() - start
+    assert instances
+    assert server.counts['meta/tiles/product-instances'] == 2
+    assert elapsed >= 0.9
+
+
+def test_gives_up_after_retries():
+    with ReplayServer(error_rate=1.0, error_status=503, seed=0) as server:
+        client = server.client(retries=2, backoff_factor=0)
+        assert client.fetch_json(INSTANCES) is None
+    assert server.counts['meta/tiles/product-instances'] == 3
+
+
+def test_limiter_bills_every_attempt(tmp_path):
+    limiter = RateLimiter('test', rate=1000, burst=1000, state_dir=str(tmp_path))
+    with ReplayServer(error_rate=0.4, error_status=503, seed=3) as server:
+        client = server.client(backoff_factor=0, retries=10, limiter=limiter)
+        for _ in range(10):
+            assert client.fetch_json(INSTANCES)
+    assert limiter.billed() == server.counts['meta/tiles/product-instances'] > 10
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('rasterio')
+
+from baron.replay import encode_png  # noqa: E402
+from baron.wms import WMSMosaic, decode_png  # noqa: E402
+
+PRODUCT = 'C39-0x0302-0'
+BOUNDS = [-106.65, 36.5, -93.5, 25.8]
+
+
+class BrokenTiles(object):
+    """ Tile cache that answers every sub-image of one width with body """
+
+    def __init__(self, width, body):
+        self.width = width
+        self.body = body
+
+    def get(self, key):
+        return self.body if key[3][0] == self.width else None
+
+    def put(self, key, data):
+        pass
+
+
+def test_decode_png_rejects_truncated_images():
+    png = encode_png(32, 32, lambda x: (x, 0, 0, 255))
+    assert decode_png(png).shape == (32, 32, 4)
+    with pytest.raises(ValueError):
+        decode_png(png[:-20])
+    with pytest.raises(ValueError):
+        decode_png(b'<html>Service unavailable</html>')
+
+
+def test_mosaic(replay):
+    mosaic = WMSMosaic(replay.client(), tile_size=256).get_map(
+        PRODUCT, 'Standard-Mercator', [600, 400], BOUNDS)
+    assert mosaic.shape == (400, 600, 4) and mosaic.dtype == np.uint8
+
+
+@pytest.mark.parametrize('body', [
+    b'<html>Service unavailable</html>',
+    encode_png(88, 144, lambda x: (x, 0, 0, 255))[:100],
+    encode_png(10, 10, lambda x: (x, 0, 0, 255)),
+])
+def test_bad_sub_image_returns_none(replay, body):
+    # 600 px split into 256 px tiles leaves an 88 px wide last column.
+    mosaic = WMSMosaic(replay.client(), tile_size=256, cache=BrokenTiles(88, body))
+    assert mosaic.get_map(PRODUCT, 'Standard-Mercator', [600, 400], BOUNDS) is None